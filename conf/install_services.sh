@@ -23,6 +23,8 @@ MY_SYSTEMD_USER_UNIT_DIR=/home/pi/.config/systemd/user/
 mkdir -p "${MY_SYSTEMD_USER_UNIT_DIR}"
 cp -av "${clone_dir}"/etc/timetemp_7segment_clock.service  "${MY_SYSTEMD_USER_UNIT_DIR}"
 cp -av "${clone_dir}"/etc/timetemp_weather_logging.service "${MY_SYSTEMD_USER_UNIT_DIR}"
+# single process alternative to the two units above (not started here)
+cp -av "${clone_dir}"/etc/timetemp_combined.service        "${MY_SYSTEMD_USER_UNIT_DIR}"
 
 systemctl  --user list-unit-files | grep timetemp
 # next command needed even though listed in previous output
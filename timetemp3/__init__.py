@@ -11,6 +11,8 @@ __maintainer__ = "David Crook"
 __email__ = "idcrook@users.noreply.github.com"
 # __status__ = "Prototype", "Development", or "Production"
 
+import os
+
 import Adafruit_BMP.BMP085 as BMP085
 from Adafruit_LED_Backpack import SevenSegment
 
@@ -21,24 +23,75 @@ from timetemp3.constants import (
     DEFAULT_TEMPERATURE_BMP_SENSOR_I2C_ADDRESS,
 )
 
-def initialize_and_get_time_display_handle(i2c_address=DEFAULT_CLOCK_LED_SEGMENT_I2C_ADDRESS):
-    segment = SevenSegment.SevenSegment(address=i2c_address)
+# Object with a get_i2c_device(address, **kwargs) function, used to create
+# every I2C device. None uses Adafruit_GPIO.I2C (real hardware).
+I2C_BACKEND = None
+
+# Environment variable that overrides the configured I2C backend
+I2C_BACKEND_ENVIRONMENT_VARIABLE = 'TIMETEMP_I2C_BACKEND'
+
+# Set by share_i2c_bus(), when several displays and sensors share this process
+SHARED_I2C_BUS = None
+
+
+def configure_i2c_backend(name=None, options=None):
+    # name is "hardware" (default) or "emulator"
+    global I2C_BACKEND
+
+    name = os.getenv(I2C_BACKEND_ENVIRONMENT_VARIABLE, name) or 'hardware'
+    if name == 'emulator':
+        from timetemp3.emulator import EmulatedI2CBus
+
+        I2C_BACKEND = EmulatedI2CBus(**(options or {}))
+    elif name == 'hardware':
+        I2C_BACKEND = None
+    else:
+        raise ValueError('Unknown I2C backend: {0}'.format(name))
+    if SHARED_I2C_BUS is not None:
+        # keep the bus locks, whichever backend they guard
+        SHARED_I2C_BUS.backend = I2C_BACKEND
+        I2C_BACKEND = SHARED_I2C_BUS
+    return I2C_BACKEND
+
+
+def share_i2c_bus():
+    # serialize I2C transactions across every device created from now on
+    global I2C_BACKEND, SHARED_I2C_BUS
+
+    from timetemp3.buses import SharedI2CBus
+
+    if SHARED_I2C_BUS is None:
+        SHARED_I2C_BUS = SharedI2CBus(I2C_BACKEND)
+        I2C_BACKEND = SHARED_I2C_BUS
+    return SHARED_I2C_BUS
+
+
+def _bus_kwargs(busnum):
+    # busnum None is the platform's default I2C bus
+    return {} if busnum is None else {'busnum': busnum}
+
+
+def initialize_and_get_time_display_handle(
+    i2c_address=DEFAULT_CLOCK_LED_SEGMENT_I2C_ADDRESS, busnum=None
+):
+    segment = SevenSegment.SevenSegment(address=i2c_address, i2c=I2C_BACKEND, **_bus_kwargs(busnum))
     # Initialize display. Must be called once before using the display.
     segment.begin()
     return segment
 
 
-def get_temperature_sensor_handle(i2c_address=DEFAULT_TEMPERATURE_BMP_SENSOR_I2C_ADDRESS):
-    bmp = BMP085.BMP085(mode=BMP085.BMP085_HIGHRES, address=i2c_address)
+def get_temperature_sensor_handle(i2c_address=DEFAULT_TEMPERATURE_BMP_SENSOR_I2C_ADDRESS, busnum=None):
+    bmp = BMP085.BMP085(
+        mode=BMP085.BMP085_HIGHRES, address=i2c_address, i2c=I2C_BACKEND, **_bus_kwargs(busnum)
+    )
     return bmp
 
 
 def initialize_and_get_temperature_display_handle(
     i2c_address=DEFAULT_TEMPERATURE_LED_SEGMENT_I2C_ADDRESS,
+    busnum=None,
 ):
-    segment = SevenSegment.SevenSegment(address=i2c_address)
+    segment = SevenSegment.SevenSegment(address=i2c_address, i2c=I2C_BACKEND, **_bus_kwargs(busnum))
     # Initialize display. Must be called once before using the display.
     segment.begin()
     return segment
-
-
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# This file is covered by the LICENSE file in the root of this project.
+
+#  - small HTTP JSON API for clients on the local network
+#    - each route is a function returning a JSON-serializable view
+#    - ETag / If-None-Match answers unchanged views with 304 Not Modified
+#    - bodies are gzipped for clients that accept it, once per version
+
+import json
+import threading
+
+CONTENT_TYPE = 'application/json; charset=utf-8'
+
+# Bodies shorter than this are sent as is; gzip would barely shrink them
+MINIMUM_GZIP_BYTES = 256
+
+
+def _accepts_gzip(accept_encoding):
+    for coding in accept_encoding.split(','):
+        name, _, parameters = coding.strip().partition(';')
+        if name.strip().lower() == 'gzip':
+            return parameters.replace(' ', '') not in ('q=0', 'q=0.0')
+    return False
+
+
+def _etag_matches(if_none_match, etag):
+    for tag in if_none_match.split(','):
+        tag = tag.strip()
+        if tag.startswith('W/'):
+            tag = tag[2:]
+        if tag in (etag, '*'):
+            return True
+    return False
+
+
+class JsonApiServer:
+    """Serves routes ({path: view(query)}) as JSON from a daemon thread.
+
+    query is a dict of the request's query parameters (last value wins).
+    A view raising ValueError answers 400, KeyError 404.
+    """
+
+    def __init__(self, routes, port, address=''):
+        # only loaded when the API is served
+        import gzip
+        import hashlib
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        from urllib.parse import parse_qsl, urlsplit
+
+        self.routes = dict(routes)
+        # (etag, gzipped body) of the last response of each route
+        gzip_cache = {}
+        gzip_lock = threading.Lock()
+
+        def compressed(path, etag, body):
+            with gzip_lock:
+                cached = gzip_cache.get(path)
+                if cached is not None and cached[0] == etag:
+                    return cached[1]
+            gzipped = gzip.compress(body, compresslevel=6, mtime=0)
+            with gzip_lock:
+                gzip_cache[path] = (etag, gzipped)
+            return gzipped
+
+        class JsonApiHandler(BaseHTTPRequestHandler):
+            def do_GET(handler):
+                url = urlsplit(handler.path)
+                view = self.routes.get(url.path)
+                if view is None:
+                    handler.send_error(404)
+                    return
+                try:
+                    content = view(dict(parse_qsl(url.query)))
+                except KeyError as e:
+                    handler.send_error(404, 'Not found: %s' % e)
+                    return
+                except ValueError as e:
+                    handler.send_error(400, str(e))
+                    return
+
+                body = json.dumps(content, separators=(',', ':')).encode('utf-8')
+                etag = '"%s"' % hashlib.blake2b(body, digest_size=12).hexdigest()
+                if _etag_matches(handler.headers.get('If-None-Match', ''), etag):
+                    handler.send_response(304)
+                    handler.send_header('ETag', etag)
+                    handler.end_headers()
+                    return
+
+                encoding = None
+                if len(body) >= MINIMUM_GZIP_BYTES and _accepts_gzip(
+                    handler.headers.get('Accept-Encoding', '')
+                ):
+                    body = compressed(url.path, etag, body)
+                    encoding = 'gzip'
+                handler.send_response(200)
+                handler.send_header('Content-Type', CONTENT_TYPE)
+                handler.send_header('Content-Length', str(len(body)))
+                handler.send_header('ETag', etag)
+                handler.send_header('Cache-Control', 'no-cache')
+                handler.send_header('Vary', 'Accept-Encoding')
+                if encoding:
+                    handler.send_header('Content-Encoding', encoding)
+                handler.end_headers()
+                handler.wfile.write(body)
+
+            def log_message(handler, format, *args):
+                # dashboards poll every few seconds, which would flood the journal
+                pass
+
+        self._server = ThreadingHTTPServer((address, port), JsonApiHandler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name='api_server', daemon=True
+        )
+
+    @property
+    def port(self):
+        return self._server.server_address[1]
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
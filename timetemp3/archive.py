@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# This file is covered by the LICENSE file in the root of this project.
+
+#  - local SQLite archive of every logged row
+#    - one column per logging field, indexed on dt; new fields add columns
+#    - rows are written in batches by a background thread
+#    - a failed write is logged and retried with the next batch
+
+import logging
+import queue
+import sqlite3
+import threading
+import time
+
+ARCHIVE_TABLE = 'logging_data'
+
+# Fields stored as text; dt is an integer (unix time), all others numeric
+TEXT_FIELDS = ('cond', 'cond_desc', 'weather_icon_name')
+
+# Defaults for how many rows / seconds may be pending before a batch is written
+# (rows pending at a power loss are lost)
+DEFAULT_BATCH_ROWS = 12
+DEFAULT_BATCH_SECONDS = 5 * 60
+
+# Rows kept for another try after failed writes; beyond this the oldest go
+MAX_RETAINED_ROWS = 1000
+
+# Queue markers asking the writer to write what it has, or to also stop
+_FLUSH = object()
+_CLOSE = object()
+
+logger = logging.getLogger('weather_logger')
+
+
+def _column_type(field):
+    if field in TEXT_FIELDS:
+        return 'TEXT'
+    if field == 'dt':
+        return 'INTEGER'
+    return 'NUMERIC'
+
+
+class Archive:
+    def __init__(
+        self,
+        path,
+        fields,
+        batch_rows=DEFAULT_BATCH_ROWS,
+        batch_seconds=DEFAULT_BATCH_SECONDS,
+    ):
+        self.path = path
+        self.fields = tuple(fields)
+        if 'dt' not in self.fields:
+            raise ValueError('archive fields must include dt')
+        for field in self.fields:
+            if not field.isidentifier():
+                raise ValueError('invalid archive field name: {0}'.format(field))
+        self.batch_rows = batch_rows
+        self.batch_seconds = batch_seconds
+
+        self._create_schema()
+        self._pending = queue.Queue()
+        self._writer = threading.Thread(target=self._write_batches, name='archive_writer', daemon=True)
+        self._writer.start()
+
+    def _connect(self):
+        connection = sqlite3.connect(self.path)
+        connection.execute('PRAGMA synchronous=NORMAL')
+        return connection
+
+    def _create_schema(self):
+        columns = ', '.join('{0} {1}'.format(field, _column_type(field)) for field in self.fields)
+        connection = self._connect()
+        try:
+            # WAL lets queries run while the writer appends
+            connection.execute('PRAGMA journal_mode=WAL')
+            with connection:
+                connection.execute(
+                    'CREATE TABLE IF NOT EXISTS {0} '
+                    '(id INTEGER PRIMARY KEY, logged_at REAL, {1})'.format(ARCHIVE_TABLE, columns)
+                )
+                connection.execute(
+                    'CREATE INDEX IF NOT EXISTS {0}_dt ON {0} (dt)'.format(ARCHIVE_TABLE)
+                )
+                # an archive made before a field was added gets its column now
+                existing = {
+                    column[1]
+                    for column in connection.execute('PRAGMA table_info({0})'.format(ARCHIVE_TABLE))
+                }
+                for field in self.fields:
+                    if field not in existing:
+                        connection.execute(
+                            'ALTER TABLE {0} ADD COLUMN {1} {2}'.format(
+                                ARCHIVE_TABLE, field, _column_type(field)
+                            )
+                        )
+        finally:
+            connection.close()
+
+    def append(self, row, logged_at=None):
+        # never blocks on disk; the writer thread picks the row up
+        if logged_at is None:
+            logged_at = time.time()
+        self._pending.put((logged_at,) + tuple(row.get(field) for field in self.fields))
+
+    def flush(self):
+        # wait until every row appended so far has been written
+        self._pending.put(_FLUSH)
+        self._pending.join()
+
+    def close(self):
+        self._pending.put(_CLOSE)
+        self._writer.join()
+
+    def _write_batches(self):
+        insert = 'INSERT INTO {0} (logged_at, {1}) VALUES ({2})'.format(
+            ARCHIVE_TABLE,
+            ', '.join(self.fields),
+            ', '.join('?' * (len(self.fields) + 1)),
+        )
+        connection = None
+        # rows whose write failed, tried again with the next batch
+        retained = []
+        closing = False
+        while not closing:
+            batch = retained
+            taken = 0
+            item = self._pending.get()
+            deadline = time.monotonic() + self.batch_seconds
+            while True:
+                taken += 1
+                if item is _CLOSE:
+                    closing = True
+                elif item is not _FLUSH:
+                    batch.append(item)
+                if item is _CLOSE or item is _FLUSH or len(batch) >= self.batch_rows:
+                    break
+                try:
+                    item = self._pending.get(timeout=max(0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+
+            retained = []
+            if batch:
+                try:
+                    if connection is None:
+                        connection = self._connect()
+                    with connection:
+                        connection.executemany(insert, batch)
+                except sqlite3.Error as e:
+                    # e.g. disk full or database locked; the writer carries on
+                    logger.error("Archive write of %d rows failed: %s" % (len(batch), e))
+                    if connection is not None:
+                        connection.close()
+                        connection = None
+                    retained = batch[-MAX_RETAINED_ROWS:]
+                    if len(retained) < len(batch):
+                        logger.warning(
+                            "Archive dropped %d rows" % (len(batch) - len(retained))
+                        )
+            for _ in range(taken):
+                self._pending.task_done()
+        if connection is not None:
+            connection.close()
+
+    def rows_between(self, start_dt, end_dt, fields=None):
+        # rows with start_dt <= dt < end_dt, oldest first, as dicts
+        fields = tuple(fields or self.fields)
+        for field in fields:
+            if field not in self.fields:
+                raise ValueError('unknown archive field: {0}'.format(field))
+        query = 'SELECT {0} FROM {1} WHERE dt >= ? AND dt < ? ORDER BY dt, id'.format(
+            ', '.join(fields), ARCHIVE_TABLE
+        )
+        connection = self._connect()
+        try:
+            cursor = connection.execute(query, (start_dt, end_dt))
+            return [dict(zip(fields, values)) for values in cursor]
+        finally:
+            connection.close()
+
+    def latest(self, count=1):
+        query = 'SELECT {0} FROM {1} ORDER BY dt DESC, id DESC LIMIT ?'.format(
+            ', '.join(self.fields), ARCHIVE_TABLE
+        )
+        connection = self._connect()
+        try:
+            rows = [dict(zip(self.fields, values)) for values in connection.execute(query, (count,))]
+        finally:
+            connection.close()
+        rows.reverse()
+        return rows
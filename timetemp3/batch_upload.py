@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# This file is covered by the LICENSE file in the root of this project.
+
+#  - push several phant rows in one bulk HTTP request
+#    - falls back to posting rows one at a time when the server rejects a batch
+#      (4xx); a failing (5xx) or throttling (429) server is retried later
+
+import json
+import logging
+import time
+
+import requests
+
+from timetemp3.upload_queue import RowRejected
+
+logger = logging.getLogger('weather_logger')
+
+# Defaults for how many rows / seconds worth of rows go into one batch
+DEFAULT_BATCH_ROWS = 12
+DEFAULT_BATCH_SECONDS = 60 * 60
+
+DEFAULT_REQUEST_TIMEOUT = 30
+
+# Rows buffered while the server is failing (without an upload queue, which
+# keeps them on disk instead); beyond this the oldest go
+MAX_PENDING_ROWS = 1000
+
+# Too Many Requests: the batch was fine, the server wants us to slow down
+HTTP_TOO_MANY_REQUESTS = 429
+
+
+def read_phant_input_config(phant_config_json):
+    with open(phant_config_json) as phant_config_file:
+        phant_config = json.loads(phant_config_file.read())
+    return phant_config["inputUrl"], phant_config["privateKey"]
+
+
+class BatchUploader:
+    def __init__(
+        self,
+        input_url,
+        private_key,
+        fields,
+        send_row,
+        batch_rows=DEFAULT_BATCH_ROWS,
+        batch_seconds=DEFAULT_BATCH_SECONDS,
+        timeout=DEFAULT_REQUEST_TIMEOUT,
+    ):
+        self.input_url = input_url
+        self.private_key = private_key
+        self.fields = tuple(fields)
+        # per-row fallback: send_row(row) returns True once accepted, and may
+        # raise RowRejected
+        self.send_row = send_row
+        self.batch_rows = batch_rows
+        self.batch_seconds = batch_seconds
+        self.timeout = timeout
+
+        # keep-alive connection is reused between batches
+        self._session = requests.Session()
+        self._pending = []
+        self._oldest_pending = None
+
+        self.rows_uploaded = 0
+        self.upload_seconds = 0.0
+
+    def add(self, row):
+        # buffer row; returns number of rows uploaded if this filled a batch
+        if not self._pending:
+            self._oldest_pending = time.monotonic()
+        self._pending.append(row)
+        if len(self._pending) > MAX_PENDING_ROWS:
+            dropped = len(self._pending) - MAX_PENDING_ROWS
+            logger.warning("Dropping %d oldest rows not yet uploaded" % dropped)
+            del self._pending[:dropped]
+        if self.is_batch_ready():
+            return self.flush()
+        return 0
+
+    def is_batch_ready(self):
+        if not self._pending:
+            return False
+        if len(self._pending) >= self.batch_rows:
+            return True
+        return time.monotonic() - self._oldest_pending >= self.batch_seconds
+
+    def flush(self):
+        try:
+            sent = self.send_rows(self._pending)
+            # keep whatever was not accepted for the next attempt
+            self._pending = self._pending[sent:]
+        except RowRejected as e:
+            # a refused row would block the rest for good, so drop it
+            logger.error("Row rejected by server (%s); dropped" % e)
+            sent = e.accepted
+            self._pending = self._pending[sent + 1 :]
+        if self._pending:
+            self._oldest_pending = time.monotonic()
+        return sent
+
+    def post_batch(self, rows):
+        # returns the HTTP status code of the bulk request
+        payload = [{field: row.get(field) for field in self.fields} for row in rows]
+        response = self._session.post(
+            self.input_url,
+            json=payload,
+            headers={'Phant-Private-Key': self.private_key},
+            timeout=self.timeout,
+        )
+        return response.status_code
+
+    def send_rows(self, rows):
+        # returns how many rows, from the front, the server accepted
+        if not rows:
+            return 0
+
+        start = time.monotonic()
+        try:
+            status = self.post_batch(rows)
+        except requests.exceptions.RequestException as err:
+            # server unreachable: per-row posting would fail the same way
+            logger.error("Batch upload error: %s" % err)
+            return 0
+
+        if 200 <= status < 300:
+            sent = len(rows)
+        elif status >= 500 or status == HTTP_TOO_MANY_REQUESTS or status < 400:
+            # the server is failing or throttling; a request per row would
+            # only add to its load
+            logger.error("Batch upload failed with HTTP %d; retrying later" % status)
+            return 0
+        else:
+            logger.warning("Batch of %d rows rejected, posting rows one at a time" % len(rows))
+            sent = 0
+            for row in rows:
+                try:
+                    if not self.send_row(row):
+                        break
+                except RowRejected as e:
+                    e.accepted = sent
+                    self.rows_uploaded += sent
+                    raise
+                sent += 1
+
+        elapsed = time.monotonic() - start
+        self.rows_uploaded += sent
+        self.upload_seconds += elapsed
+        if sent:
+            logger.info(
+                "Uploaded %d rows in %.2f s (%.1f rows/s, %.1f rows/s overall)"
+                % (sent, elapsed, sent / max(elapsed, 1e-6), self.rows_per_second())
+            )
+        return sent
+
+    def rows_per_second(self):
+        if not self.upload_seconds:
+            return 0.0
+        return self.rows_uploaded / self.upload_seconds
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# This file is covered by the LICENSE file in the root of this project.
+
+#  - circuit breaker for a remote API
+#    - closed: calls go through; enough failures in a row open the circuit
+#    - open: calls are skipped until an exponentially growing, jittered
+#      backoff has passed
+#    - half-open: a single trial call closes the circuit again, or reopens
+#      it with a longer backoff; a trial that was not attempted reopens it
+#      with the same backoff
+
+import random
+import threading
+import time
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+# Defaults for failures in a row before opening, and the backoff range
+DEFAULT_FAILURE_THRESHOLD = 3
+DEFAULT_BASE_SECONDS = 60
+DEFAULT_MAX_SECONDS = 60 * 60
+# each backoff is spread over +/- this fraction of itself
+DEFAULT_JITTER = 0.25
+
+
+class CircuitBreaker:
+    def __init__(
+        self,
+        name,
+        failure_threshold=DEFAULT_FAILURE_THRESHOLD,
+        base_seconds=DEFAULT_BASE_SECONDS,
+        max_seconds=DEFAULT_MAX_SECONDS,
+        jitter=DEFAULT_JITTER,
+        on_state_change=None,
+        clock=time.monotonic,
+        uniform=random.uniform,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.base_seconds = base_seconds
+        self.max_seconds = max_seconds
+        self.jitter = jitter
+        # called as on_state_change(breaker, old_state, new_state)
+        self.on_state_change = on_state_change
+        self.clock = clock
+        self.uniform = uniform
+
+        self._lock = threading.Lock()
+        self.state = CLOSED
+        self.failures = 0
+        # times opened since the circuit was last closed, for the backoff
+        self.opened_count = 0
+        self.retry_at = None
+
+    def _set_state(self, state):
+        old_state, self.state = self.state, state
+        if old_state != state and self.on_state_change is not None:
+            self.on_state_change(self, old_state, state)
+
+    def backoff_seconds(self):
+        backoff = min(self.max_seconds, self.base_seconds * 2 ** max(0, self.opened_count - 1))
+        return backoff * self.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def retry_in(self):
+        # seconds until the next trial call, 0 unless open
+        if self.state != OPEN:
+            return 0
+        return max(0, self.retry_at - self.clock())
+
+    def allow(self):
+        # True if a call may go ahead now
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN and self.clock() >= self.retry_at:
+                # let one trial call through
+                self._set_state(HALF_OPEN)
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_count = 0
+            self.retry_at = None
+            self._set_state(CLOSED)
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                self.opened_count += 1
+                self.retry_at = self.clock() + self.backoff_seconds()
+                self._set_state(OPEN)
+
+    def record_skipped(self):
+        # the call was allowed but not attempted (e.g. its API is not enabled
+        # yet); a trial slot is handed back, to be offered again after a backoff
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self.retry_at = self.clock() + self.backoff_seconds()
+                self._set_state(OPEN)
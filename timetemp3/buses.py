@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# This file is covered by the LICENSE file in the root of this project.
+
+#  - fan out sensor reads and display writes over several I2C buses
+#    - one single-threaded worker per bus: transfers on a bus run in order,
+#      and a slow conversion on one bus never holds up another
+#    - display groups rotate their own set of sources on their own bus
+#    - shared I2C bus: one lock per bus serializes the transactions of every
+#      display and sensor in the process
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class BusWorkers:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._executors = {}
+
+    def executor(self, busnum):
+        # created on first use
+        with self._lock:
+            executor = self._executors.get(busnum)
+            if executor is None:
+                executor = ThreadPoolExecutor(
+                    max_workers=1, thread_name_prefix='i2c_bus_{0}'.format(busnum)
+                )
+                self._executors[busnum] = executor
+            return executor
+
+    def submit(self, busnum, job, *args):
+        return self.executor(busnum).submit(job, *args)
+
+    def busnums(self):
+        with self._lock:
+            return sorted(self._executors)
+
+    def shutdown(self, wait=False):
+        with self._lock:
+            executors = list(self._executors.values())
+            self._executors.clear()
+        for executor in executors:
+            executor.shutdown(wait=wait)
+
+
+class LockedI2CDevice:
+    """Forwards to an I2C device, holding its bus lock for each transaction."""
+
+    def __init__(self, device, lock):
+        self._device = device
+        self._lock = lock
+
+    def __getattr__(self, name):
+        attribute = getattr(self._device, name)
+        if not callable(attribute):
+            return attribute
+        lock = self._lock
+
+        def locked(*args, **kwargs):
+            with lock:
+                return attribute(*args, **kwargs)
+
+        # cached, so later calls skip __getattr__
+        setattr(self, name, locked)
+        return locked
+
+
+class SharedI2CBus:
+    """I2C backend (pass as the i2c argument of the Adafruit drivers) whose
+    devices take one lock per bus around every transaction.
+
+    backend is the wrapped backend; None is Adafruit_GPIO.I2C (real hardware).
+    Waits between transactions, such as a BMP085 conversion, do not hold the
+    lock.
+    """
+
+    def __init__(self, backend=None):
+        self.backend = backend
+        self._lock = threading.Lock()
+        self._bus_locks = {}
+
+    def _get_backend(self):
+        if self.backend is None:
+            import Adafruit_GPIO.I2C
+
+            return Adafruit_GPIO.I2C
+        return self.backend
+
+    def get_default_bus(self):
+        return self._get_backend().get_default_bus()
+
+    def bus_lock(self, busnum):
+        with self._lock:
+            lock = self._bus_locks.get(busnum)
+            if lock is None:
+                lock = self._bus_locks[busnum] = threading.RLock()
+            return lock
+
+    def get_i2c_device(self, address, busnum=None, **kwargs):
+        if busnum is None:
+            busnum = self.get_default_bus()
+        device = self._get_backend().get_i2c_device(address, busnum=busnum, **kwargs)
+        return LockedI2CDevice(device, self.bus_lock(busnum))
+
+
+class DisplayGroup:
+    __slots__ = ('name', 'busnum', 'segment', 'source_names', 'index')
+
+    def __init__(self, name, busnum, segment, source_names):
+        self.name = name
+        self.busnum = busnum
+        self.segment = segment
+        self.source_names = tuple(source_names)
+        self.index = -1
+
+    def next_source(self, sources):
+        # next enabled source with a reading, in rotation; None if there is none
+        count = len(self.source_names)
+        for step in range(1, count + 1):
+            position = (self.index + step) % count
+            name = self.source_names[position]
+            if name not in sources:
+                continue
+            source = sources[name]
+            if source.enabled and source.reading is not None:
+                self.index = position
+                return source
+        return None
+
+
+def device_group_sources(device_groups):
+    # source declarations for the sensors of config device groups
+    declarations = []
+    for group in device_groups:
+        if 'sensor' not in group:
+            continue
+        declarations.append(
+            {
+                'name': group['name'],
+                'kind': 'bmp085',
+                'glyph': group.get('glyph', 'tickmark'),
+                'logged': group.get('logged', False),
+                'options': {'i2c_address': group['sensor'], 'busnum': group['busnum']},
+            }
+        )
+    return declarations
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# This file is covered by the LICENSE file in the root of this project.
+
+#  - clocks for the weather logger's scheduling
+#    - SystemClock: wall time, and waits that really wait
+#    - VirtualClock: waits advance time instantly, so a replay covers days of
+#      operation in seconds
+
+import time
+
+
+class SystemClock:
+    def time(self):
+        return time.time()
+
+    def monotonic(self):
+        return time.monotonic()
+
+    def wait(self, event, timeout):
+        # like event.wait(timeout): True if the event is set
+        return event.wait(max(0, timeout))
+
+
+class VirtualClock:
+    """Clock whose waits return at once, after moving time forward.
+
+    Once time reaches until (if given), wait() sets the event it was given,
+    which ends a main loop waiting on its exit event.
+    """
+
+    def __init__(self, start, until=None):
+        self.start = start
+        self.now = start
+        self.until = until
+        self.waited_seconds = 0.0
+
+    def time(self):
+        return self.now
+
+    def monotonic(self):
+        return self.now - self.start
+
+    def advance(self, seconds):
+        self.now += max(0, seconds)
+
+    def wait(self, event, timeout):
+        if event.is_set():
+            return True
+        timeout = max(0, timeout)
+        if self.until is not None and self.now + timeout >= self.until:
+            timeout = max(0, self.until - self.now)
+            event.set()
+        self.advance(timeout)
+        self.waited_seconds += timeout
+        return event.is_set()
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# This file is covered by the LICENSE file in the root of this project.
+
+#  - weather figures derived from the in-memory history of logged fields
+#    - pressure tendency, indoor/outdoor delta, heat index, rolling extremes
+#    - NumPy works on zero-copy views of fixed-size rings, so each cycle
+#      costs the same however long the logger has run
+
+import threading
+
+from timetemp3.history import DEFAULT_HISTORY_SECONDS, RingBuffer
+
+# Default span of the pressure tendency (the usual synoptic 3 hours)
+DEFAULT_TENDENCY_SECONDS = 3 * 60 * 60
+# a tendency is only given if a reading this close to its start is kept
+TENDENCY_TOLERANCE_FRACTION = 1 / 6
+
+# Derived fields added to the logged row, in column order
+DERIVED_FIELDS = (
+    'in_pres_tendency',
+    'out_pres_tendency',
+    'in_out_delta',
+    'heat_index',
+    'in_tf_min',
+    'in_tf_max',
+    'out_temp_min',
+    'out_temp_max',
+)
+
+# Logged fields the derived ones are computed from
+INPUT_FIELDS = ('in_tf', 'in_pres', 'out_temp', 'out_pres', 'out_humid')
+
+
+def heat_index(temperature_f, relative_humidity):
+    """NWS heat index in °F, for scalars or NumPy arrays of readings.
+
+    Steadman's simple formula below about 80 °F, otherwise the Rothfusz
+    regression with its low and high humidity adjustments.
+    """
+    import numpy
+
+    t = numpy.asarray(temperature_f, dtype=float)
+    rh = numpy.asarray(relative_humidity, dtype=float)
+
+    simple = 0.5 * (t + 61.0 + (t - 68.0) * 1.2 + rh * 0.094)
+    regression = (
+        -42.379
+        + 2.04901523 * t
+        + 10.14333127 * rh
+        - 0.22475541 * t * rh
+        - 0.00683783 * t * t
+        - 0.05481717 * rh * rh
+        + 0.00122874 * t * t * rh
+        + 0.00085282 * t * rh * rh
+        - 0.00000199 * t * t * rh * rh
+    )
+    dry = (rh < 13) & (t >= 80) & (t <= 112)
+    regression -= numpy.where(
+        dry, (13 - rh) / 4 * numpy.sqrt(numpy.clip(17 - numpy.abs(t - 95), 0, None) / 17), 0
+    )
+    humid = (rh > 85) & (t >= 80) & (t <= 87)
+    regression += numpy.where(humid, (rh - 85) / 10 * ((87 - t) / 5), 0)
+
+    result = numpy.where((simple + t) / 2 < 80, simple, regression)
+    return float(result) if result.ndim == 0 else result
+
+
+class DerivedMetrics:
+    """Keeps a ring per input field and derives DERIVED_FIELDS from them.
+
+    intervals maps each input field to how often it is logged, which sizes
+    its ring. observe() is fed the fields of every logged reading; compute()
+    returns the derived fields (None where the history is too short).
+    """
+
+    def __init__(
+        self,
+        intervals,
+        history_seconds=DEFAULT_HISTORY_SECONDS,
+        tendency_seconds=DEFAULT_TENDENCY_SECONDS,
+    ):
+        import numpy
+
+        self.tendency_seconds = tendency_seconds
+        self.rings = {
+            field: RingBuffer.for_interval(interval, history_seconds)
+            for field, interval in intervals.items()
+        }
+        # views share memory with the rings, so appends show up in them
+        self._timestamps = {
+            field: numpy.frombuffer(ring.timestamps, dtype=numpy.float64)
+            for field, ring in self.rings.items()
+        }
+        self._lock = threading.Lock()
+        self.values = dict.fromkeys(DERIVED_FIELDS)
+
+    def observe(self, fields, timestamp):
+        with self._lock:
+            for field, ring in self.rings.items():
+                value = fields.get(field)
+                if value is not None:
+                    ring.append(value, timestamp)
+
+    def _latest(self, field):
+        ring = self.rings.get(field)
+        latest = ring.latest() if ring is not None else None
+        return None if latest is None else latest[1]
+
+    def _extreme(self, field, which):
+        ring = self.rings.get(field)
+        return getattr(ring, which)() if ring is not None else None
+
+    def tendency(self, field):
+        # change over tendency_seconds, from the kept reading nearest its start
+        ring = self.rings.get(field)
+        if ring is None or not len(ring):
+            return None
+        latest_time, latest_value = ring.latest()
+        start = latest_time - self.tendency_seconds
+        # the first len(ring) slots are filled, in whatever order
+        timestamps = self._timestamps[field][: len(ring)]
+        offsets = abs(timestamps - start)
+        position = int(offsets.argmin())
+        if offsets[position] > self.tendency_seconds * TENDENCY_TOLERANCE_FRACTION:
+            return None
+        return latest_value - ring.values[position]
+
+    def compute(self):
+        with self._lock:
+            in_tf = self._latest('in_tf')
+            out_temp = self._latest('out_temp')
+            out_humid = self._latest('out_humid')
+            values = {
+                'in_pres_tendency': self.tendency('in_pres'),
+                'out_pres_tendency': self.tendency('out_pres'),
+                'in_out_delta': None if None in (in_tf, out_temp) else in_tf - out_temp,
+                'heat_index': None if None in (out_temp, out_humid) else heat_index(out_temp, out_humid),
+                'in_tf_min': self._extreme('in_tf', 'minimum'),
+                'in_tf_max': self._extreme('in_tf', 'maximum'),
+                'out_temp_min': self._extreme('out_temp', 'minimum'),
+                'out_temp_max': self._extreme('out_temp', 'maximum'),
+            }
+        self.values = {
+            field: None if value is None else round(float(value), 2)
+            for field, value in values.items()
+        }
+        return self.values
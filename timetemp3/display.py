@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# This file is covered by the LICENSE file in the root of this project.
+
+import weakref
+
+# Last display buffer written to hardware, per display handle
+_WRITTEN_BUFFERS = weakref.WeakKeyDictionary()
+
+
+def write_display_changes(segment):
+    # Write only the bytes of the display buffer that differ from the last
+    # frame sent to this display. Returns the number of bytes written.
+    buffer = bytes(segment.buffer)
+    previous = _WRITTEN_BUFFERS.get(segment)
+
+    try:
+        if previous is None or len(previous) != len(buffer):
+            segment.write_display()
+            written = len(buffer)
+        else:
+            written = 0
+            for register, (old_value, value) in enumerate(zip(previous, buffer)):
+                if old_value != value:
+                    segment._device.write8(register, value)
+                    written += 1
+    except IOError:
+        # hardware state is unknown after a failed write, so resend it all next time
+        _WRITTEN_BUFFERS.pop(segment, None)
+        raise
+
+    _WRITTEN_BUFFERS[segment] = buffer
+    return written
+
+
+def forget_display_frame(segment):
+    # Call after writing to the display by other means
+    _WRITTEN_BUFFERS.pop(segment, None)
@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# This file is covered by the LICENSE file in the root of this project.
+
+#  - in-process emulation of the I2C devices used by timetemp3
+#    - HT16K33 LED backpack (display RAM and command registers)
+#    - BMP085 pressure/temperature sensor (calibration, control and ADC registers)
+#  - drop-in for the Adafruit_GPIO.I2C module, so the Adafruit drivers and both
+#    daemons run unchanged on a machine without an I2C bus
+
+import abc
+import errno
+import random
+import threading
+import time
+
+from timetemp3.sensor import (
+    compensate_temperature,
+    compensate_pressure,
+)
+from timetemp3.constants import (
+    DEFAULT_CLOCK_LED_SEGMENT_I2C_ADDRESS,
+    DEFAULT_TEMPERATURE_LED_SEGMENT_I2C_ADDRESS,
+    DEFAULT_TEMPERATURE_BMP_SENSOR_I2C_ADDRESS,
+)
+
+# HT16K33 command registers
+HT16K33_DISPLAY_RAM_SIZE = 16
+HT16K33_SYSTEM_SETUP = 0x20
+HT16K33_DISPLAY_SETUP = 0x80
+HT16K33_BRIGHTNESS = 0xE0
+
+# BMP085 registers and commands
+BMP085_CALIBRATION_START = 0xAA
+BMP085_CONTROL = 0xF4
+BMP085_ADC_MSB = 0xF6
+BMP085_READ_TEMPERATURE = 0x2E
+BMP085_READ_PRESSURE = 0x34
+
+# Example calibration from the BMP085 datasheet (AC1 .. MD)
+BMP085_DATASHEET_CALIBRATION = (408, -72, -14383, 32741, 32757, 23153, 6190, 4, -32768, -8711, 2868)
+
+# Maximum conversion times (in seconds) from the datasheet
+BMP085_TEMPERATURE_CONVERSION_SECONDS = 0.0045
+BMP085_PRESSURE_CONVERSION_SECONDS = (0.0045, 0.0075, 0.0135, 0.0255)
+
+
+class EmulatedI2CDevice(abc.ABC):
+    """Register-level device with the same interface as Adafruit_GPIO.I2C.Device.
+
+    Subclasses model a chip by implementing _read_register and _write_register.
+    fault_rate is the chance that any one transaction fails with the
+    "[Errno 121] Remote I/O error" a crowded bus produces.
+    """
+
+    def __init__(self, address, busnum=1, fault_rate=0.0, seed=None):
+        self._address = address
+        self._bus = busnum
+        self.fault_rate = fault_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.reads = 0
+        self.writes = 0
+        self.faults = 0
+
+    def _transaction(self, is_write):
+        if self.fault_rate and self._random.random() < self.fault_rate:
+            self.faults += 1
+            raise OSError(errno.EREMOTEIO, 'Remote I/O error')
+        if is_write:
+            self.writes += 1
+        else:
+            self.reads += 1
+
+    @abc.abstractmethod
+    def _read_register(self, register):
+        """Value (0-255) of register."""
+
+    @abc.abstractmethod
+    def _write_register(self, register, value):
+        """Store value (0-255) in register."""
+
+    def _command(self, command, data):
+        for offset, value in enumerate(data):
+            self._write_register(command + offset, value)
+
+    def writeRaw8(self, value):
+        with self._lock:
+            self._transaction(True)
+            self._command(value & 0xFF, [])
+
+    def write8(self, register, value):
+        with self._lock:
+            self._transaction(True)
+            self._write_register(register, value & 0xFF)
+
+    def write16(self, register, value):
+        with self._lock:
+            self._transaction(True)
+            self._write_register(register, value & 0xFF)
+            self._write_register(register + 1, (value >> 8) & 0xFF)
+
+    def writeList(self, register, data):
+        with self._lock:
+            self._transaction(True)
+            self._command(register, list(data))
+
+    def readList(self, register, length):
+        with self._lock:
+            self._transaction(False)
+            return bytearray(self._read_register(register + i) for i in range(length))
+
+    def readRaw8(self):
+        return self.readU8(0)
+
+    def readU8(self, register):
+        with self._lock:
+            self._transaction(False)
+            return self._read_register(register)
+
+    def readS8(self, register):
+        result = self.readU8(register)
+        return result - 256 if result > 127 else result
+
+    def readU16(self, register, little_endian=True):
+        low, high = self.readList(register, 2)
+        if not little_endian:
+            low, high = high, low
+        return (high << 8) | low
+
+    def readS16(self, register, little_endian=True):
+        result = self.readU16(register, little_endian)
+        return result - 65536 if result > 32767 else result
+
+    def readU16LE(self, register):
+        return self.readU16(register, little_endian=True)
+
+    def readU16BE(self, register):
+        return self.readU16(register, little_endian=False)
+
+    def readS16LE(self, register):
+        return self.readS16(register, little_endian=True)
+
+    def readS16BE(self, register):
+        return self.readS16(register, little_endian=False)
+
+
+class EmulatedHT16K33(EmulatedI2CDevice):
+    def __init__(self, address, **kwargs):
+        super().__init__(address, **kwargs)
+        self.display_ram = bytearray(HT16K33_DISPLAY_RAM_SIZE)
+        self.oscillator_on = False
+        self.display_on = False
+        self.blink = 0
+        self.brightness = 15
+
+    def _read_register(self, register):
+        return self.display_ram[register % HT16K33_DISPLAY_RAM_SIZE]
+
+    def _write_register(self, register, value):
+        self.display_ram[register % HT16K33_DISPLAY_RAM_SIZE] = value
+
+    def _command(self, command, data):
+        if command & 0xF0 == HT16K33_SYSTEM_SETUP:
+            self.oscillator_on = bool(command & 0x01)
+        elif command & 0xF0 == HT16K33_DISPLAY_SETUP:
+            self.display_on = bool(command & 0x01)
+            self.blink = (command >> 1) & 0x03
+        elif command & 0xF0 == HT16K33_BRIGHTNESS:
+            self.brightness = command & 0x0F
+        else:
+            # display RAM write, with auto-incrementing address
+            super()._command(command, data)
+
+
+def _search_raw_value(compensate, target, high):
+    # smallest raw ADC value whose compensated value reaches target
+    low = 0
+    while low < high:
+        middle = (low + high) // 2
+        if compensate(middle) < target:
+            low = middle + 1
+        else:
+            high = middle
+    return low
+
+
+class EmulatedBMP085(EmulatedI2CDevice):
+    """BMP085 whose ADC registers hold raw values that the datasheet
+    compensation turns back into temperature_c and pressure_pa.
+
+    conversion_time_scale stretches the datasheet conversion times; reading
+    the ADC before a conversion finishes returns the previous result, as the
+    real part does.
+    """
+
+    def __init__(
+        self,
+        address,
+        temperature_c=21.0,
+        pressure_pa=101325,
+        conversion_time_scale=1.0,
+        calibration=BMP085_DATASHEET_CALIBRATION,
+        **kwargs
+    ):
+        super().__init__(address, **kwargs)
+        self.temperature_c = temperature_c
+        self.pressure_pa = pressure_pa
+        self.conversion_time_scale = conversion_time_scale
+        self.calibration = tuple(calibration)
+        self.conversions = 0
+
+        self._registers = bytearray(256)
+        for index, value in enumerate(self.calibration):
+            register = BMP085_CALIBRATION_START + 2 * index
+            self._registers[register] = (value >> 8) & 0xFF
+            self._registers[register + 1] = value & 0xFF
+        self._adc = 0
+        self._pending_adc = None
+        self._conversion_done = 0.0
+
+    def _raw_temperature(self):
+        target = int(round(self.temperature_c * 10))
+        return _search_raw_value(
+            lambda raw: compensate_temperature(raw, self.calibration)[0], target, 0xFFFF
+        )
+
+    def _raw_pressure(self, oversampling):
+        _, b5 = compensate_temperature(self._raw_temperature(), self.calibration)
+        return _search_raw_value(
+            lambda raw: compensate_pressure(raw, b5, self.calibration, oversampling),
+            int(round(self.pressure_pa)),
+            (1 << (16 + oversampling)) - 1,
+        )
+
+    def _start_conversion(self, command):
+        self.conversions += 1
+        if command == BMP085_READ_TEMPERATURE:
+            # 16 bit result, left in the MSB and LSB registers
+            self._pending_adc = self._raw_temperature() << 8
+            duration = BMP085_TEMPERATURE_CONVERSION_SECONDS
+        elif command & 0x3F == BMP085_READ_PRESSURE:
+            oversampling = (command >> 6) & 0x03
+            self._pending_adc = self._raw_pressure(oversampling) << (8 - oversampling)
+            duration = BMP085_PRESSURE_CONVERSION_SECONDS[oversampling]
+        else:
+            return
+        self._conversion_done = time.monotonic() + duration * self.conversion_time_scale
+
+    def _read_register(self, register):
+        if BMP085_ADC_MSB <= register <= BMP085_ADC_MSB + 2:
+            if self._pending_adc is not None and time.monotonic() >= self._conversion_done:
+                self._adc = self._pending_adc
+                self._pending_adc = None
+            shift = 8 * (2 - (register - BMP085_ADC_MSB))
+            return (self._adc >> shift) & 0xFF
+        return self._registers[register]
+
+    def _write_register(self, register, value):
+        if register == BMP085_CONTROL:
+            self._start_conversion(value)
+        self._registers[register] = value
+
+
+class EmulatedI2CBus:
+    """Stand-in for the Adafruit_GPIO.I2C module; pass as the i2c argument of
+    the Adafruit drivers. Devices are created on first use by address."""
+
+    def __init__(
+        self,
+        display_addresses=(
+            DEFAULT_CLOCK_LED_SEGMENT_I2C_ADDRESS,
+            DEFAULT_TEMPERATURE_LED_SEGMENT_I2C_ADDRESS,
+        ),
+        sensor_addresses=(DEFAULT_TEMPERATURE_BMP_SENSOR_I2C_ADDRESS,),
+        **device_options
+    ):
+        self.display_addresses = set(display_addresses)
+        self.sensor_addresses = set(sensor_addresses)
+        self.device_options = device_options
+        self.devices = {}
+
+    def get_default_bus(self):
+        return 1
+
+    def get_i2c_device(self, address, busnum=None, **kwargs):
+        if busnum is None:
+            busnum = self.get_default_bus()
+        key = (busnum, address)
+        if key not in self.devices:
+            options = dict(self.device_options)
+            if address in self.sensor_addresses:
+                self.devices[key] = EmulatedBMP085(address, busnum=busnum, **options)
+            elif address in self.display_addresses:
+                # sensor only options do not apply to displays
+                for name in ('temperature_c', 'pressure_pa', 'conversion_time_scale'):
+                    options.pop(name, None)
+                self.devices[key] = EmulatedHT16K33(address, busnum=busnum, **options)
+            else:
+                raise OSError(errno.EREMOTEIO, 'No emulated device at 0x%02x' % address)
+        return self.devices[key]
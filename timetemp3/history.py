@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# This file is covered by the LICENSE file in the root of this project.
+
+#  - fixed-memory history of readings for one temperature location
+#    - values and timestamps live in preallocated array('d') rings
+#    - rolling min, max and mean are O(1) (amortized) per reading
+
+import time
+from array import array
+from collections import deque
+
+# Default amount of history kept per location (in seconds)
+DEFAULT_HISTORY_SECONDS = 24 * 60 * 60
+
+# Recompute the running sum from scratch this often, to cap float drift
+_RESUM_INTERVAL = 4096
+
+
+class RingBuffer:
+    def __init__(self, capacity):
+        if capacity < 1:
+            raise ValueError('capacity must be at least 1')
+        self.capacity = capacity
+        self.values = array('d', bytes(8 * capacity))
+        self.timestamps = array('d', bytes(8 * capacity))
+        # total readings ever appended; the next one goes to _appended % capacity
+        self._appended = 0
+        self._sum = 0.0
+        # monotonic queues of (sequence number, value) for the rolling extremes
+        self._minimums = deque()
+        self._maximums = deque()
+
+    @classmethod
+    def for_interval(cls, interval_seconds, history_seconds=DEFAULT_HISTORY_SECONDS):
+        return cls(max(1, int(history_seconds // interval_seconds)))
+
+    def __len__(self):
+        return min(self._appended, self.capacity)
+
+    def append(self, value, timestamp=None):
+        if timestamp is None:
+            timestamp = time.time()
+        sequence = self._appended
+        position = sequence % self.capacity
+
+        if sequence >= self.capacity:
+            # overwrite the oldest reading
+            self._sum -= self.values[position]
+        self.values[position] = value
+        self.timestamps[position] = timestamp
+        self._sum += value
+        self._appended = sequence + 1
+
+        if self._appended % _RESUM_INTERVAL == 0:
+            self._sum = sum(self.values[: len(self)])
+
+        # older readings that can no longer be the extreme are dropped
+        oldest_kept = self._appended - self.capacity
+        minimums = self._minimums
+        while minimums and minimums[-1][1] >= value:
+            minimums.pop()
+        minimums.append((sequence, value))
+        while minimums[0][0] < oldest_kept:
+            minimums.popleft()
+
+        maximums = self._maximums
+        while maximums and maximums[-1][1] <= value:
+            maximums.pop()
+        maximums.append((sequence, value))
+        while maximums[0][0] < oldest_kept:
+            maximums.popleft()
+
+    def __getitem__(self, index):
+        # 0 is the oldest reading kept, -1 the most recent; returns (timestamp, value)
+        length = len(self)
+        if index < 0:
+            index += length
+        if not 0 <= index < length:
+            raise IndexError('ring buffer index out of range')
+        position = (self._appended - length + index) % self.capacity
+        return self.timestamps[position], self.values[position]
+
+    def latest(self):
+        return self[-1] if self._appended else None
+
+    def minimum(self):
+        return self._minimums[0][1] if self._minimums else None
+
+    def maximum(self):
+        return self._maximums[0][1] if self._maximums else None
+
+    def mean(self):
+        length = len(self)
+        return self._sum / length if length else None
+
+    def ordered(self):
+        # copies of (timestamps, values), oldest first
+        length = len(self)
+        start = (self._appended - length) % self.capacity
+        if start + length <= self.capacity:
+            return (
+                self.timestamps[start : start + length],
+                self.values[start : start + length],
+            )
+        return (
+            self.timestamps[start:] + self.timestamps[: start + length - self.capacity],
+            self.values[start:] + self.values[: start + length - self.capacity],
+        )
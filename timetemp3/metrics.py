@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# This file is covered by the LICENSE file in the root of this project.
+
+#  - in-process metrics in the Prometheus text exposition format
+#    - counters, gauges and histograms, each with optional labels
+#    - optional HTTP endpoint (GET /metrics) served from a daemon thread
+
+import abc
+import threading
+import time
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Latency buckets (in seconds), from a fast I2C read up to a slow network request
+DEFAULT_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if value == float('-inf'):
+        return '-Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (
+        '{0}="{1}"'.format(
+            name, str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+        )
+        for name, value in pairs
+    )
+    return '{' + ','.join(escaped) + '}'
+
+
+class _Metric(abc.ABC):
+    metric_type = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(
+                '{0} takes labels {1}, got {2}'.format(self.name, self.labelnames, tuple(labels))
+            )
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    @abc.abstractmethod
+    def _samples(self):
+        """(suffix, label values, extra labels, value) of every sample; called
+        with the lock held."""
+
+    def render(self):
+        lines = [
+            '# HELP {0} {1}'.format(self.name, self.documentation),
+            '# TYPE {0} {1}'.format(self.name, self.metric_type),
+        ]
+        with self._lock:
+            samples = self._samples()
+        for suffix, key, extra, value in samples:
+            lines.append(
+                '{0}{1}{2} {3}'.format(
+                    self.name, suffix, _format_labels(self.labelnames, key, extra), _format_value(value)
+                )
+            )
+        return '\n'.join(lines)
+
+
+class Counter(_Metric):
+    metric_type = 'counter'
+
+    def inc(self, amount=1, **labels):
+        if amount < 0:
+            raise ValueError('counters only go up')
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def _samples(self):
+        return [('', key, (), value) for key, value in sorted(self._values.items())]
+
+
+class Gauge(_Metric):
+    metric_type = 'gauge'
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(self._key(labels))
+
+    def _samples(self):
+        return [('', key, (), value) for key, value in sorted(self._values.items())]
+
+
+class Histogram(_Metric):
+    metric_type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts = self._values.get(key)
+            if counts is None:
+                # per bucket counts, then +Inf count and sum
+                counts = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+                    break
+            else:
+                counts[len(self.buckets)] += 1
+            counts[-1] += value
+
+    def time(self, **labels):
+        return _Timer(self, labels)
+
+    def count(self, **labels):
+        with self._lock:
+            counts = self._values.get(self._key(labels))
+            return sum(counts[:-1]) if counts else 0
+
+    def _samples(self):
+        samples = []
+        for key, counts in sorted(self._values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                samples.append(('_bucket', key, (('le', _format_value(float(bound))),), cumulative))
+            samples.append(('_count', key, (), cumulative))
+            samples.append(('_sum', key, (), counts[-1]))
+        return samples
+
+
+class _Timer:
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.monotonic()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.monotonic() - self.start, **self.labels)
+        return False
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics = {}
+
+    def _add(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError('duplicate metric: {0}'.format(metric.name))
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._add(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._add(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_LATENCY_BUCKETS):
+        return self._add(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return ''.join(metric.render() + '\n' for metric in metrics)
+
+
+class MetricsServer:
+    """Serves registry.render() at /metrics from a daemon thread."""
+
+    def __init__(self, registry, port, address=''):
+        # only loaded when metrics are served
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        self.registry = registry
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(handler):
+                if handler.path.split('?', 1)[0] != '/metrics':
+                    handler.send_error(404)
+                    return
+                body = registry.render().encode('utf-8')
+                handler.send_response(200)
+                handler.send_header('Content-Type', CONTENT_TYPE)
+                handler.send_header('Content-Length', str(len(body)))
+                handler.end_headers()
+                handler.wfile.write(body)
+
+            def log_message(handler, format, *args):
+                # scrapes every few seconds would flood the journal
+                pass
+
+        self._server = ThreadingHTTPServer((address, port), MetricsHandler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name='metrics_server', daemon=True
+        )
+
+    @property
+    def port(self):
+        return self._server.server_address[1]
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
@@ -15,11 +15,15 @@ from sys import exit
 import timetemp3
 from timetemp3 import constants
 from timetemp3 import (
+    configure_i2c_backend,
     initialize_and_get_time_display_handle,
 )
+from timetemp3.display import write_display_changes
+from timetemp3 import timing
 from timetemp3.time import (
     get_time_digits,
     display_time_digits,
+    seconds_until_next_second,
 )
 
 # Set to 12 or 24 hour mode
@@ -28,8 +32,9 @@ DEFAULT_HOUR_MODE_12_OR_24 = constants.DEFAULT_CLOCK_HOUR_MODE_12_OR_24
 # I2C address of display
 DEFAULT_LED_SEGMENT_I2C_ADDRESS = constants.DEFAULT_CLOCK_LED_SEGMENT_I2C_ADDRESS
 
-# Number of seconds to wait after display is written
-DISPLAY_SLEEP_DURATION = 1 / 4
+# Number of seconds to wait after display is written (the loop itself sleeps
+# until the next second boundary)
+DISPLAY_SLEEP_DURATION = 0
 
 # Counter for errors encountered
 IO_ERROR_COUNT = 0
@@ -37,6 +42,13 @@ IO_ERROR_COUNT = 0
 # These are the variables consumed
 HOUR_MODE_12_OR_24      = DEFAULT_HOUR_MODE_12_OR_24
 LED_SEGMENT_I2C_ADDRESS = DEFAULT_LED_SEGMENT_I2C_ADDRESS
+I2C_BACKEND_NAME        = None
+I2C_EMULATOR_OPTIONS    = None
+TIMING_CONFIG           = None
+
+# Display writes, timed once a "timing" config enables TIMINGS
+TIMINGS = timing.Timings(enabled=False)
+show_time_digits = TIMINGS.wrap('display_time_digits', display_time_digits)
 
 # via https://stackoverflow.com/questions/18499497/how-to-process-sigterm-signal-gracefully
 class GracefulKiller:
@@ -58,11 +70,7 @@ class GracefulKiller:
         self.kill_now = True
 
 
-def main():
-    global IO_ERROR_COUNT
-    global LED_SEGMENT_I2C_ADDRESS
-    global HOUR_MODE_12_OR_24
-
+def get_logger():
     import logging
     logger = logging.getLogger('7_segment_clock')
     VERBOSITY = logging.DEBUG # logging.INFO  # set to DEBUG for more verbose
@@ -85,15 +93,25 @@ def main():
         consoleHandler.setFormatter(formatter)
         logger.addHandler(consoleHandler)
         logger.info('Not running from systemd')
+    return logger
+
+
+def read_config(app_config_json, logger):
+    global LED_SEGMENT_I2C_ADDRESS
+    global HOUR_MODE_12_OR_24
+    global I2C_BACKEND_NAME, I2C_EMULATOR_OPTIONS
+    global TIMING_CONFIG
 
     # read in any config
     try:
-        app_config_json = sys.argv[1]
         # Read in config file
         with open(app_config_json) as config_file:
             config = json.loads(config_file.read())
         LED_SEGMENT_I2C_ADDRESS = config.get('led_disp_i2c_addr', DEFAULT_LED_SEGMENT_I2C_ADDRESS)
         HOUR_MODE_12_OR_24 = config.get('hour_mode', DEFAULT_HOUR_MODE_12_OR_24)
+        I2C_BACKEND_NAME = config.get('i2c_backend')
+        I2C_EMULATOR_OPTIONS = config.get('i2c_emulator')
+        TIMING_CONFIG = config.get('timing')
 
     except:
         logger.info("No app_config.json available. Using hard-coded defaults.")
@@ -101,9 +119,18 @@ def main():
     logger.info("Config: hour_mode: {hm:d}".format(hm = HOUR_MODE_12_OR_24))
     logger.info("Config: led_disp_i2c_addr: 0x{addr:02x} ({addr:d})".format(addr = LED_SEGMENT_I2C_ADDRESS))
 
+
+def run_clock(logger, should_stop, configure_backend=True):
+    # Runs until should_stop() returns True, then blanks the display. Pass
+    # configure_backend=False to keep an I2C backend configured elsewhere in
+    # this process.
+    global IO_ERROR_COUNT
+
     # Initialize LED display
     segment = None
     try:
+        if configure_backend:
+            configure_i2c_backend(I2C_BACKEND_NAME, I2C_EMULATOR_OPTIONS)
         segment = initialize_and_get_time_display_handle(i2c_address=LED_SEGMENT_I2C_ADDRESS)
     except FileNotFoundError as efnf:
         logger.fatal("Unable to find I2C devices: {0}".format(efnf))
@@ -115,40 +142,65 @@ def main():
         logger.info("Using clock display I2C address: 0x%02x" % (segment._device._address,))
 
 
-    def graceful_exit():
+    # Optionally time each display write, with a periodic summary to the log
+    timing_reporter = None
+    if TIMING_CONFIG:
+        TIMINGS.enabled = True
+        summary_minutes = TIMING_CONFIG.get('summary_minutes', timing.DEFAULT_SUMMARY_MINUTES)
+        timing_reporter = timing.TimingReporter(TIMINGS, 60 * summary_minutes, logger)
+        timing_reporter.start()
+
+    def clean_up():
+        if timing_reporter is not None:
+            timing_reporter.stop()
+            timing_reporter.report()
         # Turn off LED
         if segment is not None:
             segment.clear()
-            segment.write_display()
-        exit(0)
+            write_display_changes(segment)
+
+    logger.info("Starting main loop -  Press CTRL+C to exit")
+    previous_clock_digits = None
+    try:
+        while not should_stop():
+            # Update the time on a 4 char, 7-segment display once per second
+            try:
+                now = datetime.datetime.now()
+                clock_digits = get_time_digits(now=now, hour_mode=HOUR_MODE_12_OR_24)
+                # print(clock_digits)
+                if clock_digits != previous_clock_digits:
+                    show_time_digits(
+                        clock_digits,
+                        sleep_duration=DISPLAY_SLEEP_DURATION,
+                        display_handle=segment,
+                    )
+                    previous_clock_digits = clock_digits
+
+                # sleep until the colon next toggles
+                time.sleep(seconds_until_next_second(datetime.datetime.now()))
+
+            # IOError: [Errno 121] Remote I/O error would occasionally surface on Raspian stretch
+            except IOError:
+                IO_ERROR_COUNT += 1
+                logger.warning("Caught {cnt:d} IOErrors".format(cnt=IO_ERROR_COUNT))
+                previous_clock_digits = None
+                time.sleep(2)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        clean_up()
+
+
+def main():
+    logger = get_logger()
+    read_config(sys.argv[1] if len(sys.argv) > 1 else None, logger)
 
     # output current process id
     logger.info("My PID is: %d" % os.getpid())
     killer = GracefulKiller()
 
-    logger.info("Starting main loop -  Press CTRL+C to exit")
-    while not killer.kill_now:
-        # Periodically update the time on a 4 char, 7-segment display
-        try:
-            now = datetime.datetime.now()
-            clock_digits = get_time_digits(now=now, hour_mode=HOUR_MODE_12_OR_24)
-            # print(clock_digits)
-            display_time_digits(
-                clock_digits,
-                sleep_duration=DISPLAY_SLEEP_DURATION,
-                display_handle=segment,
-            )
-
-        except KeyboardInterrupt:
-            graceful_exit()
-
-        # IOError: [Errno 121] Remote I/O error would occasionally surface on Raspian stretch
-        except IOError:
-            IO_ERROR_COUNT += 1
-            logger.warning("Caught {cnt:d} IOErrors".format(cnt=IO_ERROR_COUNT))
-            time.sleep(2)
-
-    graceful_exit()
+    run_clock(logger, lambda: killer.kill_now)
+    exit(0)
 
 
 # added in case script is run directly
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# This file is covered by the LICENSE file in the root of this project.
+
+#  - run the clock and the weather display/logger in one process
+#    - one copy of the Adafruit stack instead of two
+#    - one lock per I2C bus serializes the transactions of both displays and
+#      the sensor, so they no longer collide on /dev/i2c-1
+
+# To run: python3 ./my_combined.py app_config_json phant_config_json [clock_config_json]
+
+import sys
+from threading import Thread
+
+import timetemp3
+
+usage = """
+    script app_config_json phant_config_json [clock_config_json]
+"""
+
+
+def main():
+    if len(sys.argv) < 3:
+        print(usage)
+        sys.exit(1)
+    clock_config_json = sys.argv[3] if len(sys.argv) > 3 else None
+
+    # before any device is created, so every one of them takes the bus lock
+    timetemp3.share_i2c_bus()
+
+    # configures the I2C backend and both weather devices on import
+    from timetemp3 import my_weather_logging
+    from timetemp3 import my_7segment_clock
+
+    clock_logger = my_7segment_clock.get_logger()
+    my_7segment_clock.read_config(clock_config_json, clock_logger)
+
+    # the weather logger owns the signal handlers; the clock stops with it
+    clock = Thread(
+        target=my_7segment_clock.run_clock,
+        args=(clock_logger, my_weather_logging.exit_sentinel.is_set),
+        kwargs={'configure_backend': False},
+        name='clock',
+    )
+    clock.start()
+    try:
+        my_weather_logging.main()
+    finally:
+        my_weather_logging.exit_sentinel.set()
+        clock.join(timeout=5)
+
+
+# added in case script is run directly
+if __name__ == '__main__':
+
+    main()
@@ -12,31 +12,57 @@ import os
 import sys
 import time
 
+# Start of the process, for reporting the time to the first frame
+STARTUP_TIME = time.monotonic()
+
+import bisect
 import json
 
 # import pathlib
 from pprint import pformat
 import signal
-from threading import Event
-import requests  # so can handle exceptions
+from threading import Event, Thread
 
 import timetemp3
 from timetemp3 import constants
 from timetemp3 import (
+    configure_i2c_backend,
     get_temperature_sensor_handle,
     initialize_and_get_temperature_display_handle,
 )
+from timetemp3.display import write_display_changes
 from timetemp3.temperature import (
-    get_temperature_digits_in_fahrenheit,
-    display_temperature_digits,
+    get_temperature_raw_digits_in_fahrenheit,
+    display_temperature_raw_digits,
 )
-
-from phant3.Phant import Phant
-
-# FIXME: Refactor into timetemp3/__init__.py or a new sensor.py
-import nest  # https://github.com/jkoelker/python-nest/
-from pyowm.owm import OWM  # https://github.com/csparpa/pyowm
-from pyowm.commons import exceptions as OwmExceptions
+from timetemp3.sources import build_sources
+from timetemp3.buses import BusWorkers, DisplayGroup, device_group_sources
+from timetemp3.sensor import read_bmp_sample
+from timetemp3.snapshot import (
+    SnapshotBoard,
+    make_snapshot,
+)
+from timetemp3 import archive
+from timetemp3 import metrics
+from timetemp3 import timing
+from timetemp3 import sample_log
+from timetemp3 import upload_queue
+from timetemp3 import response_cache
+from timetemp3 import breaker
+from timetemp3 import derived
+from timetemp3 import api
+from timetemp3 import scheduler
+from timetemp3.clock import SystemClock
+
+# Optional integrations are imported only once enabled, off the display path
+# (see import_phant, import_owm and import_nest)
+requests = None  # so can handle exceptions
+Phant = None
+nest = None  # https://github.com/jkoelker/python-nest/
+OWM = None  # https://github.com/csparpa/pyowm
+OwmExceptions = None
+batch_upload = None
+asyncio = None  # only with the asyncio runtime
 
 usage = """
     script app_config_json phant_config_json
@@ -126,30 +152,26 @@ NEST_REFRESH_INTERVAL = WEBAPI_PERIOD_SECONDS
 # How long to wait (in seconds) between temperature locations, the key wait
 # value for display loop
 ALTERNATE_TEMPERATURE_DISPLAY_SECONDS = 3.3
-ALTERNATE_TEMPERATURE_LOCATIONS = ('sensor', 'outdoor', 'nest')
-UPDATE_LOCATION_INTERVALS = (
-    SENSOR_MEASUREMENT_INTERVAL,
-    OWM_REFRESH_INTERVAL,
-    NEST_REFRESH_INTERVAL,
+
+# Temperature sources used when the config declares none, in display order
+DEFAULT_SOURCES = (
+    {'name': 'sensor', 'kind': 'bmp085', 'interval': SENSOR_MEASUREMENT_INTERVAL},
+    {'name': 'outdoor', 'kind': 'owm', 'interval': OWM_REFRESH_INTERVAL, 'enabled': OWM_API},
+    {'name': 'nest', 'kind': 'nest', 'interval': NEST_REFRESH_INTERVAL, 'enabled': NEST_API},
 )
-UPDATE_PREVIOUS_TIMES = [None] * len(ALTERNATE_TEMPERATURE_LOCATIONS)
 
-# Initalize recordkeeping for updates
-UPDATE_CYCLE_NUMBERS = [-1 for i in range(len(ALTERNATE_TEMPERATURE_LOCATIONS))]
-# Use -1 to represent that update is always requests if not yet initialized
+# Registry of temperature sources, created from config by configure_sources()
+SOURCES = None
 
 BMP_ADDRESS = constants.DEFAULT_TEMPERATURE_BMP_SENSOR_I2C_ADDRESS
 LED_DISPLAY_ADDRESS = constants.DEFAULT_TEMPERATURE_LED_SEGMENT_I2C_ADDRESS
-DISPLAY_SLEEP_DURATION = 1 / 100
+# pause after each display write (a replay sets it to 0)
+DISPLAY_SLEEP_DURATION = constants.DEFAULT_TEMPERATURE_DISPLAY_SLEEP_DURATION
 # VERBOSE_BMP_READINGS = True
 VERBOSE_BMP_READINGS = False
 
-UNINITIALIZED_READING = -100.0
-RECENT_READINGS = {
-    ALTERNATE_TEMPERATURE_LOCATIONS[0]: UNINITIALIZED_READING,
-    ALTERNATE_TEMPERATURE_LOCATIONS[1]: UNINITIALIZED_READING,
-    ALTERNATE_TEMPERATURE_LOCATIONS[2]: UNINITIALIZED_READING,
-}
+# Most recent immutable readings published by each location's fetcher
+SNAPSHOTS = SnapshotBoard()
 
 try:
     app_config_json = sys.argv[1]
@@ -187,6 +209,12 @@ led_display_address = (
     or LED_DISPLAY_ADDRESS
 )
 
+# Select main loop runtime: "loop" (default), "threads" or "asyncio"
+RUNTIME = config.get("runtime", "loop")
+
+# Fixed-size local history of readings, kept per source
+HISTORY_SECONDS = config.get("history_hours", 24) * 60 * 60
+
 owm_secret_key = config["owm"]["secret-key"]
 owm_lat = config["owm"]["lat"]
 owm_lon = config["owm"]["lon"]
@@ -196,6 +224,9 @@ nest_client_secret = config['timetemp_nest']['client_secret']
 # FIXME: more rrobustly form/check path
 nest_access_token_cache_file = 'nest.json'
 
+# Select real I2C hardware or the in-process emulator
+configure_i2c_backend(config.get("i2c_backend"), config.get("i2c_emulator"))
+
 # Create display instance
 segment = initialize_and_get_temperature_display_handle(i2c_address=led_display_address)
 
@@ -210,38 +241,197 @@ if LOGGING:
             SENSOR_MEASUREMENT_INTERVAL
         )
     )
-    # Read in Phant feed config file
-    phant_obj = Phant(jsonPath=phant_config_json)
-    logger.info(
-        'Logging to "{0}" every {1} seconds.'.format(
-            phant_obj.title, LOGGING_PERIOD_SECONDS
-        )
+    logger.info('Logging to phant every {0} seconds.'.format(LOGGING_PERIOD_SECONDS))
+
+logger.info("Logging to phant enabled: %s" % LOGGING)
+
+# Optional sensors and displays on other I2C buses, each bus with its own
+# worker so a slow conversion on one bus never holds up another
+BUS_WORKERS = None
+BUS_JOBS = {}
+DISPLAY_GROUPS = []
+device_groups_config = config.get("device_groups", [])
+
+# Circuit breakers of remote sources, by source name, created by configure_sources()
+BREAKERS = {}
+circuit_breaker_config = config.get("circuit_breaker", {})
+
+# Optional on-disk cache of OWM responses, so restarts reuse a recent one
+OWM_CACHE = None
+owm_cache_config = config.get("owm_cache")
+OWM_CACHE_KEY = 'owm %s,%s' % (owm_lat, owm_lon)
+
+# Optional on-disk store-and-forward queue for phant rows
+UPLOAD_QUEUE = None
+UPLOAD_DRAINER = None
+upload_queue_config = config.get("upload_queue")
+
+# Optional local SQLite archive of every logged row
+ARCHIVE = None
+archive_config = config.get("archive")
+
+# Optional binary log of every sensor sample
+SAMPLE_LOG = None
+sample_log_config = config.get("sample_log")
+
+# Optional figures derived from the local history (needs NumPy), added to
+# the logged row and shown by "derived" sources
+DERIVED = None
+derived_metrics_config = config.get("derived_metrics")
+# logged fields each kind of source feeds into them
+DERIVED_INPUTS = {
+    'bmp085': ('in_tf', 'in_pres'),
+    'owm': ('out_temp', 'out_pres', 'out_humid'),
+}
+
+# Telemetry, optionally served over HTTP for Prometheus
+METRICS = metrics.Registry()
+UPDATE_SECONDS = METRICS.histogram(
+    'timetemp_update_seconds', 'Time taken to update a temperature location', ('source',)
+)
+PHANT_LOG_SECONDS = METRICS.histogram(
+    'timetemp_phant_log_seconds', 'Time taken by phant log requests'
+)
+I2C_WRITES = METRICS.counter(
+    'timetemp_i2c_writes_total', 'Display register writes sent over I2C', ('device',)
+)
+I2C_FAILURES = METRICS.counter(
+    'timetemp_i2c_failures_total', 'I2C transfers that raised IOError', ('device',)
+)
+DISPLAY_LATENESS_SECONDS = METRICS.histogram(
+    'timetemp_display_lateness_seconds',
+    'How late each display frame started against its schedule',
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 3.3),
+)
+ERRORS = METRICS.counter('timetemp_errors_total', 'Errors counted by log_error', ('type',))
+JOB_LATENESS_SECONDS = METRICS.histogram(
+    'timetemp_job_lateness_seconds', 'How late scheduled jobs started', ('job',)
+)
+JOB_OVERRUNS = METRICS.counter(
+    'timetemp_job_overruns_total', 'Periods skipped because a job ran late', ('job',)
+)
+CIRCUIT_OPEN = METRICS.gauge(
+    'timetemp_circuit_open', 'Whether the circuit breaker of a remote source is open', ('source',)
+)
+METRICS_SERVER = None
+metrics_config = config.get("metrics")
+
+# Optional JSON API of the latest readings and their history, for the LAN
+API_SERVER = None
+api_config = config.get("api")
+
+# Optional timing of the hot-path functions, summarized to the log; they are
+# wrapped where defined and timed once start_timing enables TIMINGS
+TIMINGS = timing.Timings(enabled=False)
+TIMING_REPORTER = None
+timing_config = config.get("timing")
+
+# Optional multi-row uploads to phant
+BATCH_UPLOADER = None
+phant_batch_config = config.get("phant_batch")
+
+# Remote APIs are probed in the background (see start_remote_probes), so the
+# display and sensor come up at once. Their sources stay disabled until the
+# probe succeeds.
+OWM_API = False
+NEST_API = False
+
+# Set once the phant server has answered; direct uploads wait for it
+PHANT_ONLINE = Event()
+
+# Clients for the remote APIs, created by their probes
+phant_obj = None
+NAPI = None
+mgr = None
+
+# Wait between probes of a service that is not answering, doubling up to the maximum
+PROBE_RETRY_SECONDS = 5
+PROBE_MAX_RETRY_SECONDS = 5 * 60
+
+# via https://stackoverflow.com/a/46346184/47850
+exit_sentinel = Event()
+
+# Time source and waits of the main loop; a replay swaps in a VirtualClock
+# before calling main()
+CLOCK = SystemClock()
+
+
+def exit_gracefully(signum, frame):
+    logger.warning(
+        "Received signal "
+        + str(signum)
+        + " on line "
+        + str(frame.f_lineno)
+        + " in "
+        + frame.f_code.co_filename
     )
+    exit_sentinel.set()
+
+
+def import_phant():
+    global requests, Phant
+
+    import requests
+    from phant3.Phant import Phant
+
+
+def import_owm():
+    global requests, OWM, OwmExceptions
+
+    import requests
+    from pyowm.owm import OWM
+    from pyowm.commons import exceptions as OwmExceptions
+
+
+def import_nest():
+    global requests, nest
+
+    import requests
+    import nest
+
+
+def probe_phant():
+    global phant_obj
+
+    if phant_obj is None:
+        import_phant()
+        # Read in Phant feed config file
+        phant_obj = Phant(jsonPath=phant_config_json)
+        logger.info('Logging to "{0}"'.format(phant_obj.title))
+
     try:
         logger.info(pformat(phant_obj.stats))
     except json.decoder.JSONDecodeError as je:
         logger.error("Phant API error: %s" % je)
-        LOGGING = False
+        return False
     except requests.exceptions.ConnectionError as ce:
         logger.error("Phant API error: %s" % ce)
-        LOGGING = False
+        return False
 
-logger.info("Logging to phant enabled: %s" % LOGGING)
+    PHANT_ONLINE.set()
+    logger.info("Phant server online")
+    return True
 
-# Initialize 'NAPI' and 'nest_temperature'
-global NAPI
-NAPI = None
-if NEST_API:
-    nest_temperature = 35.0
-    NAPI = nest.Nest(
-        client_id=nest_client_id,
-        client_secret=nest_client_secret,
-        access_token_cache_file=nest_access_token_cache_file,
-    )
+
+def probe_nest():
+    global NEST_API
+
+    global NAPI
+
+    if NAPI is None:
+        import_nest()
+        NAPI = nest.Nest(
+            client_id=nest_client_id,
+            client_secret=nest_client_secret,
+            access_token_cache_file=nest_access_token_cache_file,
+        )
+
+    nest_temperature = None
     try:
         if NAPI.authorization_required:
             logger.error('Authorization required.  Run "python3 ./nest_access.py"')
-            raise SystemExit
+            # retrying will not help
+            return None
 
         for structure in NAPI.structures:
             logger.debug('Structure %s' % structure.name)
@@ -255,87 +445,87 @@ if NEST_API:
     except requests.exceptions.ConnectionError as errec:
         logger.error("Nest API: Error Connecting: %s" % errec)
         logger.warning('-W- Is network down?')
-    finally:
-        # disable API if a network unavailable or error encountered
-        if nest_temperature == 35.0:
-            logger.error("Unknown Nest API Error")
-            NEST_API = False
+        return False
+
+    if nest_temperature is None:
+        logger.error("Unknown Nest API Error")
+        return False
+
+    NEST_API = True
+    for source in SOURCES.of_kind('nest'):
+        source.enabled = True
+    logger.info("Nest API enabled: %s" % NEST_API)
+    return True
+
 
-logger.info("Nest API enabled: %s" % NEST_API)
+def probe_owm():
+    global OWM_API, mgr
+
+    if mgr is None:
+        import_owm()
+        owm = OWM(owm_secret_key)
+        mgr = owm.weather_manager()
 
-if OWM_API:
-    outside_temperature = 42
-    owm = OWM(owm_secret_key)
-    mgr = owm.weather_manager()
     try:
-        one_call = mgr.one_call(owm_lat, owm_lon)
-        currently = one_call.current
+        # a response cached by a previous run saves a request here
+        owm_data = fetch_owm_data_cached()
         s = (
-            currently.status
+            owm_data['cond']
             + " - "
-            + currently.detailed_status
+            + owm_data['cond_desc']
             + " - "
-            + pformat(currently.temperature(unit='fahrenheit'))
+            + pformat(owm_data['out_temp'])
         )
         logger.debug(s)
     except requests.exceptions.ConnectionError as errec:
         logger.error("OWM API: Error Connecting: %s" % errec)
         logger.warning('-W- Is network down?')
+        return False
     except OwmExceptions.APIRequestError as errapi:
         logger.error("OWM API Error: %s" % errapi)
-    finally:
-        # disable API if a network error encountered
-        try:
-            if not currently:
-                logger.error("OWM API down")
-                OWM_API = False
-        except NameError as ne:
-            logger.error("OWM API down: %s" % ne)
-            OWM_API = False
+        return False
 
-logger.info("OWM API enabled: %s" % OWM_API)
+    OWM_API = True
+    for source in SOURCES.of_kind('owm'):
+        source.enabled = True
+    logger.info("OWM API enabled: %s" % OWM_API)
+    return True
 
-ALTERNATE_TEMPERATURE_LOCATION_ENABLES = (True, OWM_API, NEST_API)
-
-# via https://stackoverflow.com/a/46346184/47850
-exit_sentinel = Event()
 
+def run_probe(name, probe):
+    # Call probe() until it returns anything but False, backing off between tries
+    delay = PROBE_RETRY_SECONDS
+    while not exit_sentinel.is_set():
+        try:
+            if probe() is not False:
+                return
+        except Exception:
+            logger.exception("%s probe failed" % name)
+        logger.warning("Retrying %s probe in %d seconds" % (name, delay))
+        if exit_sentinel.wait(delay):
+            return
+        delay = min(2 * delay, PROBE_MAX_RETRY_SECONDS)
 
-def exit_gracefully(signum, frame):
-    logger.warning(
-        "Received signal "
-        + str(signum)
-        + " on line "
-        + str(frame.f_lineno)
-        + " in "
-        + frame.f_code.co_filename
-    )
-    exit_sentinel.set()
 
+def start_remote_probes():
+    probes = []
+    if LOGGING:
+        probes.append(('phant', probe_phant))
+    if SOURCES.of_kind('owm'):
+        probes.append(('OWM API', probe_owm))
+    if SOURCES.of_kind('nest'):
+        probes.append(('Nest API', probe_nest))
 
-def is_location_enabled(location):
-    location_index = ALTERNATE_TEMPERATURE_LOCATIONS.index(location)
-    return ALTERNATE_TEMPERATURE_LOCATION_ENABLES[location_index]
+    for name, probe in probes:
+        Thread(target=run_probe, args=(name, probe), name='probe ' + name, daemon=True).start()
 
 
-def is_time_to_update(start_time, location='sensor'):
-    if not is_location_enabled(location):
-        return False
-
-    if RECENT_READINGS[location] == UNINITIALIZED_READING:
-        return True
-
-    location_index = ALTERNATE_TEMPERATURE_LOCATIONS.index(location)
-    update_interval = UPDATE_LOCATION_INTERVALS[location_index]
-    update_cycle_number = UPDATE_CYCLE_NUMBERS[location_index]
-    # previous_update = UPDATE_PREVIOUS_TIMES[location_index]
-    current_time = time.time()
-    next_update_deadline = start_time + (update_cycle_number + 1) * update_interval
-    # print(location, "time until deadline", next_update_deadline - current_time)
-    if current_time > next_update_deadline:
-        return True
-
-    return False
+def logged_readings_ready():
+    # every logged source has published a reading
+    for source in SOURCES:
+        if source.logged and source.last_update is None:
+            return False
+    return True
 
 
 def is_time_to_upload(start_time):
@@ -344,17 +534,13 @@ def is_time_to_upload(start_time):
         return False
 
     # Check that required data is available
-    location_index_sensor = ALTERNATE_TEMPERATURE_LOCATIONS.index('sensor')
-    location_index_outdoor = ALTERNATE_TEMPERATURE_LOCATIONS.index('outdoor')
-    sensor_not_updated = UPDATE_PREVIOUS_TIMES[location_index_sensor] is None
-    outdoor_not_updated = UPDATE_PREVIOUS_TIMES[location_index_outdoor] is None
-    if sensor_not_updated or outdoor_not_updated:
+    if not logged_readings_ready():
         return False
 
     update_interval = LOGGING_PERIOD_SECONDS
     update_cycle_number = LOGGING_COUNT
     # previous_upload = PREVIOUS_UPLOAD_TIME
-    current_time = time.time()
+    current_time = CLOCK.time()
     next_update_deadline = start_time + (update_cycle_number) * update_interval
     # print("time until next logging", next_update_deadline - current_time)
     if current_time > next_update_deadline:
@@ -364,25 +550,65 @@ def is_time_to_upload(start_time):
 
 
 def update_location(location='sensor'):
-    if location == 'sensor':
-        update_location_sensor()
-    elif location == 'nest':
-        update_location_nest()
-    elif location == 'outdoor':
-        update_location_owm()
+    source = SOURCES[location]
+    circuit = BREAKERS.get(source.name)
+    if circuit is None:
+        with UPDATE_SECONDS.time(source=source.name):
+            source.fetch(source)
+        return
+
+    if not circuit.allow():
+        # a dead endpoint is skipped until its backoff runs out
+        return
+    # remote fetchers log their own errors, and return True once they have
+    # published a reading, False if the request failed (None if not tried)
+    try:
+        with UPDATE_SECONDS.time(source=source.name):
+            succeeded = source.fetch(source)
+    except Exception:
+        circuit.record_failure()
+        raise
+    if succeeded:
+        circuit.record_success()
+    elif succeeded is False:
+        circuit.record_failure()
+    else:
+        # a half-open circuit would otherwise wait on this trial forever
+        circuit.record_skipped()
 
 
-def location_updated(location):
-    location_index = ALTERNATE_TEMPERATURE_LOCATIONS.index(location)
-    current_time = time.time()
-    # if UPDATE_PREVIOUS_TIMES[location_index]:
-    #     print(location, "last updated", current_time -
-    #           UPDATE_PREVIOUS_TIMES[location_index], "seconds ago")
-    UPDATE_PREVIOUS_TIMES[location_index] = current_time
-    UPDATE_CYCLE_NUMBERS[location_index] = UPDATE_CYCLE_NUMBERS[location_index] + 1
+def report_circuit_state(circuit, old_state, new_state):
+    CIRCUIT_OPEN.set(int(new_state == breaker.OPEN), source=circuit.name)
+    if new_state == breaker.OPEN:
+        logger.warning(
+            "%s circuit open after %d failures; next try in %.0f s"
+            % (circuit.name, circuit.failures, circuit.retry_in())
+        )
+    else:
+        logger.info("%s circuit %s" % (circuit.name, new_state.replace('_', '-')))
 
 
-def update_location_nest():
+def publish_reading(source, reading, fields=None, timestamp=None):
+    # only logged sources contribute fields to the phant row
+    if timestamp is None:
+        timestamp = CLOCK.time()
+    snapshot = make_snapshot(
+        source.name, reading, fields if source.logged else None, timestamp
+    )
+    SNAPSHOTS.publish(snapshot)
+    source.updated(reading, snapshot.timestamp)
+    if DERIVED is not None and snapshot.fields:
+        DERIVED.observe(snapshot.fields, snapshot.timestamp)
+
+
+def show_stale_reading(source, reading, timestamp):
+    # on the display only: without fields it adds nothing to the logged row,
+    # and the source stays not ready for logging until a fresh reading
+    SNAPSHOTS.publish(make_snapshot(source.name, reading, None, timestamp))
+    source.reading = reading
+
+
+def update_location_nest(source):
     try:
         if NAPI.authorization_required:
             logger.error(
@@ -410,130 +636,122 @@ def update_location_nest():
         log_error(error_type='NEST API: JSON Decoder')
 
     try:
-        RECENT_READINGS['nest'] = nest_temperature
-        location_updated('nest')
+        publish_reading(source, nest_temperature)
     except UnboundLocalError as e:
         logger.error("NEST API Error: Network down? %s" % e)
-        # FIXME: turn off enable if this happens a bunch
+        return False
+    return True
 
 
-def update_location_owm():
-    global OWM_API
+def fetch_owm_data():
+    one_call = mgr.one_call(owm_lat, owm_lon)
+    currently = one_call.current
 
-    if OWM_API:
-        try:
-            one_call = mgr.one_call(owm_lat, owm_lon)
-            currently = one_call.current
-        except requests.exceptions.HTTPError as e:
-            # Need an 404, 503, 500, 403 etc.
-            status_code = e.response.status_code
-            logger.error("HTTPError: %s %s" % (status_code, e))
-            log_error(error_type='OWM API: HTTPError')
-        except requests.exceptions.ConnectionError as errec:
-            logger.error("OWM API: Error Connecting: %s" % errec)
-            logger.warning('-W- Is network down?')
-            log_error(error_type='OWM API: ConnectionError')
-        except OwmExceptions.APIRequestError as errapi:
-            logger.error("OWM API Error: %s" % errapi)
-            log_error(error_type='OWM API: APIRequestError')
-
-        outside_temperature = 42
-        try:
-            outside_temperature = currently.temperature(unit='fahrenheit')['temp']
-        except UnboundLocalError as e:
-            logger.error("OWM: API Failed: %s" % e)
-            # TODO: add a saturating threshold of number of attempts before turning off
-            # OWM_API = False
-        except:
-            logger.error("OWM: Unexpected error: %s" % sys.exc_info()[0])
-            raise
-
-    if OWM_API:
-        try:
-            # save values for periodic logging
-            LOGGING_DATA['cloudiness'] = currently.clouds
-            LOGGING_DATA['cond'] = currently.status
-            LOGGING_DATA['cond_desc'] = currently.detailed_status
-            LOGGING_DATA['dew_point'] = currently.dewpoint
-            LOGGING_DATA['dt'] = currently.ref_time
-            LOGGING_DATA['out_feels_like'] = currently.temperature(unit='fahrenheit')[
-                'feels_like'
-            ]
-            LOGGING_DATA['out_humid'] = currently.humidity
-            LOGGING_DATA['out_pres'] = currently.pressure['press']
-            LOGGING_DATA['out_temp'] = outside_temperature
-            LOGGING_DATA['uvi'] = currently.uvi
-            LOGGING_DATA['weather_code'] = currently.weather_code
-            LOGGING_DATA['weather_icon_name'] = currently.weather_icon_name
-            wind = currently.wind(unit='miles_hour')
-            LOGGING_DATA['wind_deg'] = wind['deg']
-            LOGGING_DATA['wind_speed'] = wind['speed']
-            RECENT_READINGS['outdoor'] = outside_temperature
-            location_updated('outdoor')
-        except UnboundLocalError as e:
-            logger.error("OWM: API Failed: %s" % e)
-            # TODO: add a saturating threshold of number of attempts before turning off
-            # OWM_API = False
-        except:
-            logger.error("OWM: Unexpected error: %s" % sys.exc_info()[0])
-            raise
+    # save values for periodic logging
+    owm_data = {}
+    owm_data['cloudiness'] = currently.clouds
+    owm_data['cond'] = currently.status
+    owm_data['cond_desc'] = currently.detailed_status
+    owm_data['dew_point'] = currently.dewpoint
+    owm_data['dt'] = currently.ref_time
+    owm_data['out_feels_like'] = currently.temperature(unit='fahrenheit')['feels_like']
+    owm_data['out_humid'] = currently.humidity
+    owm_data['out_pres'] = currently.pressure['press']
+    owm_data['out_temp'] = currently.temperature(unit='fahrenheit')['temp']
+    owm_data['uvi'] = currently.uvi
+    owm_data['weather_code'] = currently.weather_code
+    owm_data['weather_icon_name'] = currently.weather_icon_name
+    wind = currently.wind(unit='miles_hour')
+    owm_data['wind_deg'] = wind['deg']
+    owm_data['wind_speed'] = wind['speed']
+    return owm_data
+
+
+def record_owm_refresh_failure(error):
+    # a background refresh has no fetcher to report it, so the circuit
+    # breakers hear of it here
+    log_error(error_type='OWM API: background refresh failed')
+    for source in SOURCES.of_kind('owm'):
+        if source.name in BREAKERS:
+            BREAKERS[source.name].record_failure()
+
+
+def fetch_owm_data_cached():
+    # used by the probe, so a restart can reuse a recent response
+    if OWM_CACHE is None:
+        return fetch_owm_data()
+    return OWM_CACHE.get(OWM_CACHE_KEY, fetch_owm_data, record_owm_refresh_failure)
+
+
+def refresh_owm_data():
+    # scheduled updates always ask the API (a cache hit would publish a
+    # reading up to a whole TTL late); the cache keeps it for the next start
+    if OWM_CACHE is None:
+        return fetch_owm_data()
+    return OWM_CACHE.refresh(OWM_CACHE_KEY, fetch_owm_data)
+
+
+def update_location_owm(source):
+    if not OWM_API:
+        return
+
+    try:
+        owm_data = refresh_owm_data()
+    except requests.exceptions.HTTPError as e:
+        # Need an 404, 503, 500, 403 etc.
+        status_code = e.response.status_code
+        logger.error("HTTPError: %s %s" % (status_code, e))
+        log_error(error_type='OWM API: HTTPError')
+        return False
+    except requests.exceptions.ConnectionError as errec:
+        logger.error("OWM API: Error Connecting: %s" % errec)
+        logger.warning('-W- Is network down?')
+        log_error(error_type='OWM API: ConnectionError')
+        return False
+    except OwmExceptions.APIRequestError as errapi:
+        logger.error("OWM API Error: %s" % errapi)
+        log_error(error_type='OWM API: APIRequestError')
+        return False
 
+    publish_reading(source, owm_data['out_temp'], owm_data)
+    return True
 
-def log_data():
-    global LOGGING_COUNT, PREVIOUS_UPLOAD_TIME
 
-    cloudiness = LOGGING_DATA['cloudiness']
-    cond = LOGGING_DATA['cond']
-    cond_desc = LOGGING_DATA['cond_desc']
-    dew_point = LOGGING_DATA['dew_point']
-    dt = LOGGING_DATA['dt']
-    in_humid = LOGGING_DATA['in_humid']
-    in_pres = LOGGING_DATA['in_pres']
-    in_tc = LOGGING_DATA['in_tc']
-    in_tf = LOGGING_DATA['in_tf']
-    out_feels_like = LOGGING_DATA['out_feels_like']
-    out_humid = LOGGING_DATA['out_humid']
-    out_pres = LOGGING_DATA['out_pres']
-    out_temp = LOGGING_DATA['out_temp']
-    uvi = LOGGING_DATA['uvi']
-    weather_code = LOGGING_DATA['weather_code']
-    weather_icon_name = LOGGING_DATA['weather_icon_name']
-    wind_deg = LOGGING_DATA['wind_deg']
-    wind_speed = LOGGING_DATA['wind_speed']
+def send_row_to_phant(row):
+    # returns True once the phant server has accepted the row, False if it
+    # may be worth sending again; raises RowRejected if the server refused it
+    if not PHANT_ONLINE.is_set():
+        return False
 
     try:
         # cloudiness cond cond_desc dew_point dt in_humid
         # in_pres in_tc in_tf out_feels_like out_humid out_pres
         # out_temp uvi weather_code weather_icon_name wind_deg
         # wind_speed
-        phant_obj.log(
-            cloudiness,
-            cond,
-            cond_desc,
-            dew_point,
-            dt,
-            in_humid,
-            in_pres,
-            in_tc,
-            in_tf,
-            out_feels_like,
-            out_humid,
-            out_pres,
-            out_temp,
-            uvi,
-            weather_code,
-            weather_icon_name,
-            wind_deg,
-            wind_speed,
-        )
+        with PHANT_LOG_SECONDS.time():
+            phant_obj.log(*[row[field] for field in LOGGING_FIELDS])
 
         logger.info('Wrote a row to "{0}"'.format(phant_obj.title))
         # logger.debug(pformat(phant_obj.stats))
-    except ValueError as errv:
+        return True
+    except json.decoder.JSONDecodeError as errj:
+        # not an answer from phant itself, e.g. a proxy error page
         logger.error('-E- Error logging to {}'.format(phant_obj.title))
         logger.warning('-W- Is phant server down?')
+        logger.error('JSONDecodeError: {}'.format(str(errj)))
+        log_error(error_type='ValueError')
+    except ValueError as errv:
+        # phant answered, and refused the row
+        logger.error('-E- Error logging to {}'.format(phant_obj.title))
         logger.error('ValueError: {}'.format(str(errv)))
         log_error(error_type='ValueError')
+        raise upload_queue.RowRejected(str(errv))
+    except requests.exceptions.HTTPError as errh:
+        status_code = errh.response.status_code if errh.response is not None else None
+        logger.error("HTTPError: %s %s" % (status_code, errh))
+        log_error(error_type='HTTPError')
+        if status_code is not None and 400 <= status_code < 500 and status_code != 429:
+            raise upload_queue.RowRejected(str(errh))
     except requests.exceptions.ConnectionError as errec:
         logger.error("Error Connecting: %s" % errec)
         logger.error('-W- Is network down?')
@@ -546,27 +764,90 @@ def log_data():
         logger.error("Network request Error: %s" % err)
         log_error(error_type='RequestError')
 
+    return False
+
+
+# Sends one row, with the contract of send_row_to_phant; main(uploader=...)
+# replaces it (a replay captures the rows instead)
+ROW_SENDER = send_row_to_phant
+
+
+def upload_row(row):
+    # returns True once the phant server has accepted the row
+    try:
+        return ROW_SENDER(row)
+    except upload_queue.RowRejected:
+        # nothing would retry it anyway
+        return False
+
+
+def log_history_trends():
+    for source in SOURCES:
+        history = source.history
+        if len(history):
+            logger.debug(
+                "%s: last %.1f h min %.1f max %.1f mean %.1f"
+                % (
+                    source.name,
+                    (history[-1][0] - history[0][0]) / 3600.0,
+                    history.minimum(),
+                    history.maximum(),
+                    history.mean(),
+                )
+            )
+
+
+@TIMINGS.timed
+def log_data():
+    global LOGGING_COUNT, PREVIOUS_UPLOAD_TIME
+
+    log_history_trends()
+
+    # assemble row from the newest published readings
+    LOGGING_DATA.update(SNAPSHOTS.merged_fields())
+    if DERIVED is not None:
+        LOGGING_DATA.update(DERIVED.compute())
+    row = {field: LOGGING_DATA[field] for field in LOGGING_FIELDS}
+
+    if ARCHIVE is not None:
+        # the phant stream has a fixed schema, the archive also keeps the
+        # derived fields
+        ARCHIVE.append({field: LOGGING_DATA.get(field) for field in ARCHIVE.fields})
+
+    if UPLOAD_QUEUE is not None:
+        # store first; drainer forwards rows in order once the server answers
+        UPLOAD_QUEUE.append(row)
+        UPLOAD_DRAINER.notify()
+    elif BATCH_UPLOADER is not None:
+        BATCH_UPLOADER.add(row)
+    elif PHANT_ONLINE.is_set():
+        upload_row(row)
+    else:
+        logger.warning("Phant server not reached yet; row not uploaded")
+
     LOGGING_COUNT = LOGGING_COUNT + 1
-    current_time = time.time()
+    current_time = CLOCK.time()
     # if PREVIOUS_UPLOAD_TIME:
     #     print("last uploaded", current_time -
     #           PREVIOUS_UPLOAD_TIME, "seconds ago")
     PREVIOUS_UPLOAD_TIME = current_time
 
 
-def update_location_sensor():
+def update_location_sensor(source):
     try:
-        # Attempt to get sensor readings.
-        temp = bmp.read_temperature()
-        pressure = bmp.read_pressure()
-        altitude = bmp.read_altitude()
-
-    except IOError:
-        # XXX: Handle/report IOErrors?
-        pass
-
-    temp_in_F = (temp * 9.0 / 5.0) + 32.0
-    ambient_pressure = pressure / 100.0
+        # Attempt to get sensor readings, one conversion each of temperature
+        # and pressure
+        sample = read_bmp_sample(source.device)
+    except IOError as e:
+        logger.error("BMP sensor IOError: %s" % e)
+        I2C_FAILURES.inc(device='sensor')
+        log_error(error_type='Sensor IOError')
+        return
+
+    temp = sample.temperature_c
+    temp_in_F = sample.temperature_f
+    ambient_pressure = sample.pressure_hpa
+    altitude = sample.altitude_m
 
     if VERBOSE_BMP_READINGS:
         s = "BMP Sensor" + " "
@@ -577,25 +858,139 @@ def update_location_sensor():
         logger.info(s)
 
     # save values for periodic logging
-    LOGGING_DATA['in_humid'] = 0
-    LOGGING_DATA['in_pres'] = ambient_pressure
-    LOGGING_DATA['in_tf'] = temp_in_F
-    LOGGING_DATA['in_tc'] = temp
+    sensor_data = {}
+    sensor_data['in_humid'] = 0
+    sensor_data['in_pres'] = ambient_pressure
+    sensor_data['in_tf'] = temp_in_F
+    sensor_data['in_tc'] = temp
 
-    RECENT_READINGS['sensor'] = temp_in_F
-    location_updated('sensor')
+    publish_reading(source, temp_in_F, sensor_data)
 
+    if SAMPLE_LOG is not None and source.logged:
+        append_sample(SNAPSHOTS.merged_fields(), source.last_update)
 
-def display_location_temperature(location):
-    temperature_in_F = RECENT_READINGS[location]
-    temperature_digits = get_temperature_digits_in_fahrenheit(
-        temperature_in_F, location
+
+def append_sample(row, timestamp):
+    global SAMPLE_LOG
+
+    try:
+        SAMPLE_LOG.append(row, timestamp)
+    except (OSError, ValueError) as e:
+        # e.g. disk full; the sensor updates must go on regardless
+        logger.error("Sample log disabled after an error: %s" % e)
+        log_error(error_type='Sample log error')
+        sample_log_to_close, SAMPLE_LOG = SAMPLE_LOG, None
+        sample_log_to_close.close()
+
+
+def update_location_derived(source):
+    if DERIVED is None:
+        return
+    value = DERIVED.compute().get(source.options.get("metric", "heat_index"))
+    if value is not None:
+        publish_reading(source, value)
+
+
+@TIMINGS.timed
+def display_location_temperature(location, display_handle=None):
+    snapshot = SNAPSHOTS.latest(location)
+    if snapshot is None:
+        # nothing fetched yet, so leave the previous frame up
+        return
+    temperature_in_F = snapshot.reading
+    temperature_digits = get_temperature_raw_digits_in_fahrenheit(
+        temperature_in_F, SOURCES[location].glyph
     )
     # logger.info(temperature_digits
     try:
-        display_temperature_digits(temperature_digits, display_handle=segment)
+        written = display_temperature_raw_digits(
+            temperature_digits,
+            sleep_duration=DISPLAY_SLEEP_DURATION,
+            display_handle=display_handle or segment,
+        )
+        I2C_WRITES.inc(written, device='display')
     except IOError:
-        pass
+        I2C_FAILURES.inc(device='display')
+
+
+def convert_i2c_address(value):
+    # config addresses are hex strings ("0x77") or plain integers
+    if isinstance(value, str):
+        return convert_json_string_to_hexadecimal_value(value)
+    return value
+
+
+def make_bmp_device(options):
+    # the configured sensor, unless the source names another I2C address or bus
+    address = convert_i2c_address(options.get("i2c_address")) or bmp_address
+    busnum = options.get("busnum")
+    if address == bmp_address and busnum is None:
+        return bmp
+    return get_temperature_sensor_handle(i2c_address=address, busnum=busnum)
+
+
+def configure_sources(fetchers=None):
+    # fetchers ({source name: fetch(source)}) replace the fetchers of those
+    # sources, which then start enabled instead of waiting on a probe
+    global SOURCES
+
+    # defaults for each kind of source; remote ones wait on their probe
+    source_kinds = {
+        'bmp085': {
+            'fetch': TIMINGS.timed(update_location_sensor),
+            'interval': SENSOR_MEASUREMENT_INTERVAL,
+            'glyph': 'tickmark',
+            'logged': True,
+            'make_device': make_bmp_device,
+        },
+        'owm': {
+            'fetch': TIMINGS.timed(update_location_owm),
+            'interval': OWM_REFRESH_INTERVAL,
+            'glyph': 'outdoor_degrees',
+            'logged': True,
+            'remote': True,
+        },
+        'nest': {
+            'fetch': TIMINGS.timed(update_location_nest),
+            'interval': NEST_REFRESH_INTERVAL,
+            'glyph': '°',
+            'remote': True,
+        },
+        'derived': {
+            'fetch': update_location_derived,
+            'interval': SENSOR_MEASUREMENT_INTERVAL,
+            'glyph': '°',
+        },
+    }
+    declarations = list(config.get("sources", DEFAULT_SOURCES))
+    declarations.extend(device_group_sources(device_groups_config))
+    SOURCES = build_sources(declarations, source_kinds, HISTORY_SECONDS)
+    logger.info("Temperature sources: %s" % ", ".join(SOURCES.names()))
+
+    # remote sources back off while their API is failing
+    for source in SOURCES:
+        if source_kinds.get(source.kind, {}).get('remote'):
+            BREAKERS[source.name] = breaker.CircuitBreaker(
+                source.name,
+                failure_threshold=circuit_breaker_config.get(
+                    "failure_threshold", breaker.DEFAULT_FAILURE_THRESHOLD
+                ),
+                base_seconds=circuit_breaker_config.get(
+                    "base_seconds", breaker.DEFAULT_BASE_SECONDS
+                ),
+                max_seconds=circuit_breaker_config.get("max_seconds", breaker.DEFAULT_MAX_SECONDS),
+                on_state_change=report_circuit_state,
+                clock=CLOCK.monotonic,
+            )
+            CIRCUIT_OPEN.set(0, source=source.name)
+
+    for name, fetch in (fetchers or {}).items():
+        if name not in SOURCES:
+            logger.warning("No source %s to take the fetcher for" % name)
+            continue
+        source = SOURCES[name]
+        source.fetch = TIMINGS.timed(fetch)
+        source.enabled = True
 
 
 ERROR_TABLES = {}
@@ -609,13 +1004,509 @@ def log_error(error_type='UnknownError'):
         ERROR_TABLES[error_type] = 1
     else:
         ERROR_TABLES[error_type] = ERROR_TABLES[error_type] + 1
+    ERRORS.inc(type=error_type)
 
     if PRINT_ERROR_TABLES_ON_LOGGING:
         logger.warning("error tables: %s", ERROR_TABLES)
 
 
-def main():
-    global ALTERNATE_TEMPERATURE_LOCATION_ENABLES
+def start_device_groups():
+    global BUS_WORKERS
+
+    bus_sources = [source.name for source in SOURCES if source.busnum is not None]
+    if not device_groups_config and not bus_sources:
+        return
+
+    BUS_WORKERS = BusWorkers()
+    for group in device_groups_config:
+        if 'display' not in group:
+            continue
+        display = initialize_and_get_temperature_display_handle(
+            i2c_address=convert_i2c_address(group['display']), busnum=group['busnum']
+        )
+        DISPLAY_GROUPS.append(
+            DisplayGroup(group['name'], group['busnum'], display, group.get('show', [group['name']]))
+        )
+    logger.info(
+        "Device groups: sources %s, displays %s"
+        % (
+            ", ".join(bus_sources) or "none",
+            ", ".join("%s (bus %d)" % (group.name, group.busnum) for group in DISPLAY_GROUPS)
+            or "none",
+        )
+    )
+
+
+def schedule_device_groups(start_time):
+    # hand due reads and display frames to their bus workers; never blocks
+    if BUS_WORKERS is None:
+        return
+
+    for source in SOURCES:
+        if source.busnum is not None and source.is_due(start_time, CLOCK.time()):
+            submit_background_job(
+                BUS_WORKERS.executor(source.busnum),
+                BUS_JOBS,
+                source.name,
+                update_location,
+                source.name,
+            )
+
+    for group in DISPLAY_GROUPS:
+        key = ('display', group.name)
+        pending = BUS_JOBS.get(key)
+        if pending is not None and not pending.done():
+            # the previous frame is still being written; drop this one
+            continue
+        source = group.next_source(SOURCES)
+        if source is not None:
+            submit_background_job(
+                BUS_WORKERS.executor(group.busnum),
+                BUS_JOBS,
+                key,
+                display_location_temperature,
+                source.name,
+                group.segment,
+            )
+
+
+def clear_display(display_handle):
+    try:
+        display_handle.clear()
+        write_display_changes(display_handle)
+    except IOError:
+        I2C_FAILURES.inc(device='display')
+
+
+def stop_device_groups():
+    if BUS_WORKERS is None:
+        return
+    # queued behind any frame in flight, so each display is left blank
+    for group in DISPLAY_GROUPS:
+        BUS_WORKERS.submit(group.busnum, clear_display, group.segment)
+    BUS_WORKERS.shutdown(wait=False)
+
+
+def start_owm_cache():
+    global OWM_CACHE
+
+    if not owm_cache_config:
+        return
+
+    OWM_CACHE = response_cache.ResponseCache(
+        owm_cache_config.get("path", "owm-cache.json"),
+        ttl_seconds=owm_cache_config.get("ttl_seconds", OWM_REFRESH_INTERVAL),
+        stale_seconds=owm_cache_config.get(
+            "stale_seconds", response_cache.DEFAULT_STALE_SECONDS
+        ),
+        clock=CLOCK.time,
+    )
+    cached = OWM_CACHE.peek(OWM_CACHE_KEY)
+    if cached is None:
+        logger.info("Caching OWM responses in %s" % OWM_CACHE.path)
+        return
+
+    # show the cached outdoor reading right away; the probe refreshes it.
+    # A stale one is only shown, never logged as a new reading
+    owm_data, fetched_at = cached
+    age = CLOCK.time() - fetched_at
+    for source in SOURCES.of_kind('owm'):
+        if age < OWM_CACHE.ttl_seconds:
+            publish_reading(source, owm_data['out_temp'], owm_data, fetched_at)
+        else:
+            show_stale_reading(source, owm_data['out_temp'], fetched_at)
+        source.enabled = True
+    logger.info(
+        "Caching OWM responses in %s (cached reading %.0f s old)" % (OWM_CACHE.path, age)
+    )
+
+
+def start_derived_metrics():
+    global DERIVED
+
+    if not derived_metrics_config:
+        return
+
+    # each field's ring is sized for the fastest logged source feeding it
+    intervals = {}
+    for source in SOURCES:
+        if source.logged:
+            for field in DERIVED_INPUTS.get(source.kind, ()):
+                intervals[field] = min(source.interval, intervals.get(field, source.interval))
+    try:
+        DERIVED = derived.DerivedMetrics(
+            intervals,
+            HISTORY_SECONDS,
+            derived_metrics_config.get("tendency_hours", 3) * 60 * 60,
+        )
+    except ImportError:
+        logger.error(
+            "derived_metrics needs NumPy (pip install timetemp3[numpy]); "
+            "derived metrics disabled"
+        )
+        return
+    logger.info("Deriving %s" % ", ".join(derived.DERIVED_FIELDS))
+
+
+def start_archive():
+    global ARCHIVE
+
+    if not archive_config:
+        return
+
+    fields = LOGGING_FIELDS
+    if DERIVED is not None:
+        fields += derived.DERIVED_FIELDS
+    ARCHIVE = archive.Archive(
+        archive_config.get("path", "weather_archive.sqlite3"),
+        fields,
+        batch_rows=archive_config.get("batch_rows", archive.DEFAULT_BATCH_ROWS),
+        batch_seconds=archive_config.get("batch_seconds", archive.DEFAULT_BATCH_SECONDS),
+    )
+    logger.info("Archiving logged rows to %s" % ARCHIVE.path)
+
+
+def stop_archive():
+    if ARCHIVE is not None:
+        ARCHIVE.close()
+
+
+def start_sample_log():
+    global SAMPLE_LOG
+
+    if not sample_log_config:
+        return
+
+    SAMPLE_LOG = sample_log.SampleLog(
+        sample_log_config.get("directory", "samples"), LOGGING_FIELDS
+    )
+    logger.info("Logging sensor samples to %s" % SAMPLE_LOG.directory)
+
+
+def stop_sample_log():
+    if SAMPLE_LOG is not None:
+        SAMPLE_LOG.close()
+
+
+def start_metrics_server():
+    global METRICS_SERVER
+
+    if not metrics_config:
+        return
+
+    METRICS_SERVER = metrics.MetricsServer(
+        METRICS, metrics_config.get("port", 9105), metrics_config.get("address", "")
+    )
+    METRICS_SERVER.start()
+    logger.info("Serving metrics on port %d" % METRICS_SERVER.port)
+
+
+def stop_metrics_server():
+    if METRICS_SERVER is not None:
+        METRICS_SERVER.stop()
+
+
+def latest_view(query):
+    # newest reading of each source, and the last logged row
+    readings = {}
+    for source in SOURCES:
+        snapshot = SNAPSHOTS.latest(source.name)
+        if snapshot is not None:
+            readings[source.name] = {
+                'reading': snapshot.reading,
+                'time': snapshot.timestamp,
+                'fields': dict(snapshot.fields),
+            }
+    return {'readings': readings, 'logged': dict(LOGGING_DATA)}
+
+
+def history_view(query):
+    # ?source=name (default: all) and ?hours=N (default: all kept)
+    names = [query['source']] if 'source' in query else SOURCES.names()
+    sources = [SOURCES[name] for name in names]
+    hours = float(query.get('hours', HISTORY_SECONDS / 3600))
+    history = {}
+    for source in sources:
+        timestamps, values = source.history.ordered()
+        first = 0
+        if len(timestamps):
+            first = bisect.bisect_left(timestamps, timestamps[-1] - hours * 60 * 60)
+        history[source.name] = {
+            'times': timestamps[first:].tolist(),
+            'readings': values[first:].tolist(),
+        }
+    return history
+
+
+def start_api_server():
+    global API_SERVER
+
+    if not api_config:
+        return
+
+    API_SERVER = api.JsonApiServer(
+        {'/latest': latest_view, '/history': history_view},
+        api_config.get("port", 8080),
+        api_config.get("address", ""),
+    )
+    API_SERVER.start()
+    logger.info("Serving readings API on port %d" % API_SERVER.port)
+
+
+def stop_api_server():
+    if API_SERVER is not None:
+        API_SERVER.stop()
+
+
+def start_timing():
+    global TIMING_REPORTER
+
+    if not timing_config:
+        return
+
+    TIMINGS.enabled = True
+    summary_minutes = timing_config.get("summary_minutes", timing.DEFAULT_SUMMARY_MINUTES)
+    TIMING_REPORTER = timing.TimingReporter(TIMINGS, 60 * summary_minutes, logger)
+    TIMING_REPORTER.start()
+    logger.info("Timing summaries every %s minutes" % summary_minutes)
+
+
+def stop_timing():
+    if TIMING_REPORTER is not None:
+        TIMING_REPORTER.stop()
+        TIMING_REPORTER.report()
+
+
+def start_batch_uploader():
+    global BATCH_UPLOADER, batch_upload
+
+    if not (LOGGING and phant_batch_config):
+        return
+
+    from timetemp3 import batch_upload
+
+    input_url, private_key = batch_upload.read_phant_input_config(phant_config_json)
+    BATCH_UPLOADER = batch_upload.BatchUploader(
+        input_url,
+        private_key,
+        LOGGING_FIELDS,
+        ROW_SENDER,
+        batch_rows=phant_batch_config.get("rows", batch_upload.DEFAULT_BATCH_ROWS),
+        batch_seconds=phant_batch_config.get("seconds", batch_upload.DEFAULT_BATCH_SECONDS),
+    )
+    logger.info(
+        "Uploading to phant in batches of %d rows or %d seconds"
+        % (BATCH_UPLOADER.batch_rows, BATCH_UPLOADER.batch_seconds)
+    )
+
+
+def stop_batch_uploader():
+    if BATCH_UPLOADER is not None and UPLOAD_QUEUE is None:
+        # rows buffered in memory would otherwise be lost
+        BATCH_UPLOADER.flush()
+
+
+def start_upload_queue():
+    global UPLOAD_QUEUE, UPLOAD_DRAINER
+
+    if not (LOGGING and upload_queue_config):
+        return
+
+    batch_options = {}
+    if BATCH_UPLOADER is not None:
+        batch_options['send_rows'] = BATCH_UPLOADER.send_rows
+        batch_options['batch_rows'] = BATCH_UPLOADER.batch_rows
+
+    UPLOAD_QUEUE = upload_queue.UploadQueue(
+        upload_queue_config.get("path", "phant-queue.jsonl"),
+        LOGGING_FIELDS,
+        fsync_rows=upload_queue_config.get("fsync_rows", upload_queue.DEFAULT_FSYNC_ROWS),
+        fsync_seconds=upload_queue_config.get(
+            "fsync_seconds", upload_queue.DEFAULT_FSYNC_SECONDS
+        ),
+    )
+    UPLOAD_DRAINER = upload_queue.QueueDrainer(
+        UPLOAD_QUEUE,
+        ROW_SENDER,
+        rows_per_second=upload_queue_config.get(
+            "drain_rows_per_second", upload_queue.DEFAULT_DRAIN_ROWS_PER_SECOND
+        ),
+        retry_seconds=upload_queue_config.get(
+            "retry_seconds", upload_queue.DEFAULT_DRAIN_RETRY_SECONDS
+        ),
+        **batch_options
+    )
+    logger.info(
+        "Queueing phant rows in %s (%d pending)" % (UPLOAD_QUEUE.path, len(UPLOAD_QUEUE))
+    )
+    UPLOAD_DRAINER.start()
+
+
+def stop_upload_queue():
+    if UPLOAD_QUEUE is not None:
+        UPLOAD_DRAINER.stop()
+        UPLOAD_DRAINER.join(timeout=5)
+        UPLOAD_QUEUE.close()
+
+
+def report_background_job_error(future):
+    if not future.cancelled() and future.exception() is not None:
+        logger.error("Background job failed: %r" % future.exception())
+        log_error(error_type='BackgroundJobError')
+
+
+def submit_background_job(executor, pending_jobs, key, job, *args):
+    # keep at most one job in flight per key, so a hung request never piles up
+    future = pending_jobs.get(key)
+    if future is not None and not future.done():
+        return
+    future = executor.submit(job, *args)
+    future.add_done_callback(report_background_job_error)
+    pending_jobs[key] = future
+
+
+# Tolerated lateness (in seconds) of a display frame before it is reported
+DISPLAY_LATENESS_WARNING_SECONDS = 0.1
+
+
+def report_job_run(job, lateness, missed):
+    JOB_LATENESS_SECONDS.observe(lateness, job=job.name)
+    if job.name == 'display':
+        DISPLAY_LATENESS_SECONDS.observe(lateness)
+        if lateness > DISPLAY_LATENESS_WARNING_SECONDS:
+            logger.warning("Display frame %d late by %.3f s" % (job.runs, lateness))
+    if missed:
+        JOB_OVERRUNS.inc(missed, job=job.name)
+        logger.warning("Job %s overran its period, skipping %d run(s)" % (job.name, missed))
+
+
+async def wait_for_exit(stop_event, delay):
+    # returns True if asked to exit while waiting
+    try:
+        await asyncio.wait_for(stop_event.wait(), timeout=max(0, delay))
+    except asyncio.TimeoutError:
+        return False
+    return True
+
+
+async def update_location_task(source, executor, stop_event):
+    loop = asyncio.get_running_loop()
+    update_interval = source.interval
+    next_update_deadline = loop.time()
+
+    while not stop_event.is_set():
+        if source.enabled:
+            # network and I2C calls block, so keep them off the event loop
+            await loop.run_in_executor(executor, update_location, source.name)
+
+        # skip any deadlines missed while a slow update was in flight
+        next_update_deadline += update_interval
+        if next_update_deadline < loop.time():
+            missed = int((loop.time() - next_update_deadline) // update_interval) + 1
+            next_update_deadline += missed * update_interval
+
+        if await wait_for_exit(stop_event, next_update_deadline - loop.time()):
+            break
+
+
+async def display_rotation_task(display_executor, stop_event):
+    loop = asyncio.get_running_loop()
+    start_time = loop.time()
+    display_cycle_number = -1
+    location_index = -1
+
+    while not stop_event.is_set():
+        display_cycle_number += 1
+        frame_time = start_time + ALTERNATE_TEMPERATURE_DISPLAY_SECONDS * display_cycle_number
+        lateness = loop.time() - frame_time
+        DISPLAY_LATENESS_SECONDS.observe(max(0, lateness))
+        if lateness > DISPLAY_LATENESS_WARNING_SECONDS:
+            logger.warning("Display frame %d late by %.3f s" % (display_cycle_number, lateness))
+
+        # advance to next enabled source, only showing initialized readings
+        location_index, source = SOURCES.next_displayable(location_index)
+        if source is not None:
+            # the I2C write and its pause block, so keep them off the event loop
+            await loop.run_in_executor(
+                display_executor, display_location_temperature, source.name
+            )
+
+        next_frame_time = frame_time + ALTERNATE_TEMPERATURE_DISPLAY_SECONDS
+        if await wait_for_exit(stop_event, next_frame_time - loop.time()):
+            break
+
+
+async def device_group_task(stop_event, start_time):
+    while not stop_event.is_set():
+        schedule_device_groups(start_time)
+        if await wait_for_exit(stop_event, ALTERNATE_TEMPERATURE_DISPLAY_SECONDS):
+            break
+
+
+async def upload_task(executor, stop_event, start_time):
+    loop = asyncio.get_running_loop()
+
+    while LOGGING and not stop_event.is_set():
+        if is_time_to_upload(start_time):
+            await loop.run_in_executor(executor, log_data)
+            delay = start_time + LOGGING_COUNT * LOGGING_PERIOD_SECONDS - CLOCK.time()
+        else:
+            # readings not yet available; check back shortly
+            delay = SENSOR_MEASUREMENT_INTERVAL
+
+        if await wait_for_exit(stop_event, delay):
+            break
+
+
+async def run_asyncio_main_loop(start_time):
+    from concurrent.futures import ThreadPoolExecutor
+
+    loop = asyncio.get_running_loop()
+    stop_event = asyncio.Event()
+
+    def request_exit():
+        logger.warning("Received exit signal")
+        exit_sentinel.set()
+        stop_event.set()
+
+    for sig in ('TERM', 'HUP', 'INT'):
+        loop.add_signal_handler(getattr(signal, 'SIG' + sig), request_exit)
+
+    # one worker per source plus one for the uploader, so a hung request
+    # never holds up another source
+    executor = ThreadPoolExecutor(
+        max_workers=len(SOURCES) + 1,
+        thread_name_prefix='weather_logger',
+    )
+    # frames have their own worker, so they never queue behind a fetch
+    display_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='display')
+    # sources on other buses are updated by their bus workers
+    tasks = [
+        asyncio.create_task(update_location_task(source, executor, stop_event))
+        for source in SOURCES
+        if source.busnum is None
+    ]
+    tasks.append(asyncio.create_task(display_rotation_task(display_executor, stop_event)))
+    if BUS_WORKERS is not None:
+        tasks.append(asyncio.create_task(device_group_task(stop_event, start_time)))
+    tasks.append(asyncio.create_task(upload_task(executor, stop_event, start_time)))
+
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        # do not wait on requests that are still in flight
+        executor.shutdown(wait=False)
+        display_executor.shutdown(wait=True)
+
+
+def main(fetchers=None, uploader=None, remote_probes=True):
+    # fetchers override source fetchers (see configure_sources), uploader
+    # replaces send_row_to_phant, and remote_probes=False leaves the remote
+    # APIs unprobed; a replay uses all three
+    global asyncio, ROW_SENDER
+
+    if uploader is not None:
+        ROW_SENDER = uploader
 
     try:
         logger.info(
@@ -629,52 +1520,130 @@ def main():
         pass
 
     def graceful_exit():
+        stop_upload_queue()
+        stop_batch_uploader()
+        stop_archive()
+        stop_sample_log()
+        stop_metrics_server()
+        stop_api_server()
+        stop_timing()
+        stop_device_groups()
         # Turn off LED
         segment.clear()
-        segment.write_display()
+        write_display_changes(segment)
         sys.exit(0)
 
     # Register signal handler
     for sig in ('TERM', 'HUP', 'INT'):
         signal.signal(getattr(signal, 'SIG' + sig), exit_gracefully)
 
+    start_metrics_server()
+    start_timing()
+    configure_sources(fetchers)
+    # before the OWM cache publishes its first reading
+    start_derived_metrics()
+    start_owm_cache()
+    start_device_groups()
+    start_archive()
+    start_sample_log()
+    start_batch_uploader()
+    start_upload_queue()
+    start_api_server()
+    if remote_probes:
+        start_remote_probes()
+
     # output current process id
     logger.info("Weather logger PID is: %d" % os.getpid())
     logger.info("Starting main loop... Press CTRL+C to exit")
-    number_of_locations = len(ALTERNATE_TEMPERATURE_LOCATIONS)
-    start_time = time.time()
-    display_cycle_number = -1
-
-    while not exit_sentinel.is_set():
-        display_cycle_number += 1
-        current_location_index = display_cycle_number % number_of_locations
-        current_location = ALTERNATE_TEMPERATURE_LOCATIONS[current_location_index]
+    number_of_locations = len(SOURCES)
+    start_time = CLOCK.time()
+
+    # put local readings up without waiting on any remote service
+    for source in SOURCES:
+        if source.enabled and source.busnum is None:
+            update_location(source.name)
+    schedule_device_groups(start_time)
+    location_index, first_source = SOURCES.next_displayable(-1)
+    if first_source is not None:
+        display_location_temperature(first_source.name)
+        logger.info(
+            "First frame displayed %.0f ms after startup"
+            % (1000 * (time.monotonic() - STARTUP_TIME))
+        )
 
-        # skip update if location is not enabled
-        if not is_location_enabled(current_location):
-            continue
+    if RUNTIME == 'asyncio':
+        import asyncio
 
-        if is_time_to_update(start_time, current_location):
-            # logger.debug("Updating %s" % current_location)
-            update_location(current_location)
+        logger.info("Using asyncio runtime")
+        asyncio.run(run_asyncio_main_loop(start_time))
+        graceful_exit()
 
-        display_location_temperature(current_location)
+    background_jobs = None
+    pending_jobs = {}
+    if RUNTIME == 'threads':
+        from concurrent.futures import ThreadPoolExecutor
 
-        if is_time_to_upload(start_time):
-            log_data()
-
-        # Calculate the event net wait interval (pauses here)
-        exit_sentinel.wait(
-            max(
-                0,
-                start_time
-                + ALTERNATE_TEMPERATURE_DISPLAY_SECONDS * display_cycle_number
-                - time.time(),
-            )
+        logger.info("Using background fetcher threads")
+        background_jobs = ThreadPoolExecutor(
+            max_workers=number_of_locations + 1,
+            thread_name_prefix='weather_logger',
         )
-        # FIXME: refactor to delegate this to a common function
-        ALTERNATE_TEMPERATURE_LOCATION_ENABLES = (True, OWM_API, NEST_API)
 
+    def run_job(key, job, *args):
+        if background_jobs:
+            # fetchers publish snapshots, so the display never waits on them
+            submit_background_job(background_jobs, pending_jobs, key, job, *args)
+        else:
+            job(*args)
+
+    def make_update_job(source):
+        def update():
+            if not source.enabled:
+                # look again with the next frame, in case a probe enabled it
+                return ALTERNATE_TEMPERATURE_DISPLAY_SECONDS
+            run_job(source.name, update_location, source.name)
+            circuit = BREAKERS.get(source.name)
+            if circuit is not None and circuit.state == breaker.OPEN:
+                # no point waking up before the backoff is over
+                return circuit.retry_in()
+
+        return update
+
+    def display_frame():
+        nonlocal location_index
+        # advance to next enabled source, only showing initialized readings
+        location_index, source = SOURCES.next_displayable(location_index)
+        schedule_device_groups(start_time)
+        if source is not None:
+            display_location_temperature(source.name)
+
+    def upload():
+        if not logged_readings_ready():
+            # readings not yet available; check back shortly
+            return SENSOR_MEASUREMENT_INTERVAL
+        run_job('upload', log_data)
+
+    jobs = scheduler.DeadlineScheduler(CLOCK, on_run=report_job_run)
+    for source in SOURCES:
+        # sources on other buses are updated by their bus workers
+        if source.busnum is None:
+            deadline = start_time + (source.interval if source.reading is not None else 0)
+            jobs.add('update ' + source.name, source.interval, make_update_job(source), deadline)
+    jobs.add(
+        'display',
+        ALTERNATE_TEMPERATURE_DISPLAY_SECONDS,
+        display_frame,
+        start_time + ALTERNATE_TEMPERATURE_DISPLAY_SECONDS,
+    )
+    if LOGGING:
+        jobs.add('upload', LOGGING_PERIOD_SECONDS, upload, start_time)
+
+    # sleeps until the earliest deadline of all jobs
+    jobs.run(exit_sentinel)
+
+    if background_jobs:
+        # do not wait on requests that are still in flight
+        background_jobs.shutdown(wait=False)
     graceful_exit()
 
 
@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# This file is covered by the LICENSE file in the root of this project.
+
+#  - replay recorded readings through the weather logger's real main loop
+#    - a VirtualClock stands in for wall time, so days pass in seconds
+#    - uploads are captured instead of sent; probes, files and servers are off
+#    - sources without a trace keep their own fetcher (the I2C emulator for
+#      the sensor)
+
+# To run: python3 -m timetemp3.replay app_config_json phant_config_json trace [hours]
+#
+# trace is a JSON lines file, one record per line:
+#   {"time": 1700000000.0, "source": "outdoor", "reading": 41.5, "fields": {...}}
+#   {"time": 1700000300.0, "source": "outdoor", "error": "ConnectionError"}
+# or a sample log directory (see sample_log.py).
+
+import bisect
+import json
+import os
+import sys
+import time
+
+from timetemp3 import sample_log
+from timetemp3.clock import VirtualClock
+
+usage = """
+    script app_config_json phant_config_json trace [hours]
+"""
+
+# Logged fields filled in by each kind of source; a trace record need only
+# carry the reading
+SENSOR_FIELDS = ('in_humid', 'in_pres', 'in_tc', 'in_tf')
+KIND_FIELDS = {
+    'bmp085': ('in_tf', SENSOR_FIELDS),
+    'owm': (
+        'out_temp',
+        (
+            'cloudiness',
+            'cond',
+            'cond_desc',
+            'dew_point',
+            'dt',
+            'out_feels_like',
+            'out_humid',
+            'out_pres',
+            'out_temp',
+            'uvi',
+            'weather_code',
+            'weather_icon_name',
+            'wind_deg',
+            'wind_speed',
+        ),
+    ),
+}
+
+# Config sections that write files, start servers or keep wall-clock timers
+DISABLED_CONFIGS = (
+    'upload_queue_config',
+    'phant_batch_config',
+    'archive_config',
+    'sample_log_config',
+    'metrics_config',
+    'api_config',
+    'timing_config',
+    'owm_cache_config',
+)
+
+
+class Trace:
+    # recorded readings of one source, oldest first
+    def __init__(self, records):
+        self.records = sorted(records, key=lambda record: record['time'])
+        self.times = [record['time'] for record in self.records]
+
+    def __len__(self):
+        return len(self.records)
+
+    def at(self, timestamp):
+        # latest record at or before timestamp, None before the first
+        index = bisect.bisect_right(self.times, timestamp)
+        return self.records[index - 1] if index else None
+
+
+def load_traces(path):
+    # {source name: Trace} from a JSON lines file or a sample log directory
+    if os.path.isdir(path):
+        return traces_from_sample_log(path)
+    records = {}
+    with open(path, encoding='utf-8') as trace_file:
+        for line in trace_file:
+            if line.strip():
+                record = json.loads(line)
+                records.setdefault(record['source'], []).append(record)
+    return {name: Trace(source_records) for name, source_records in records.items()}
+
+
+def traces_from_sample_log(directory, sensor='sensor', outdoor='outdoor'):
+    sensor_records = []
+    outdoor_records = []
+    for path in sample_log.list_segments(directory):
+        for row in sample_log.iter_records(path):
+            fields = {name: value for name, value in row.items() if name != 'logged_at'}
+            if row.get('in_tf') is not None:
+                sensor_records.append(
+                    {'time': row['logged_at'], 'reading': row['in_tf'], 'fields': fields}
+                )
+            if row.get('out_temp') is not None:
+                outdoor_records.append(
+                    {'time': row['logged_at'], 'reading': row['out_temp'], 'fields': fields}
+                )
+    traces = {}
+    if sensor_records:
+        traces[sensor] = Trace(sensor_records)
+    if outdoor_records:
+        traces[outdoor] = Trace(outdoor_records)
+    return traces
+
+
+def make_trace_fetcher(weather, trace):
+    # fetcher with the contract of the real ones: True once a reading is
+    # published, False for a recorded failure, None before the trace starts
+    def fetch(source):
+        record = trace.at(weather.CLOCK.time())
+        if record is None:
+            return None
+        if 'error' in record:
+            weather.log_error(error_type='%s: %s' % (source.name, record['error']))
+            return False
+        reading_field, kind_fields = KIND_FIELDS.get(source.kind, (None, ()))
+        fields = dict.fromkeys(kind_fields)
+        if reading_field is not None:
+            fields[reading_field] = record['reading']
+        if 'in_tf' in fields and fields.get('in_tc') is None:
+            fields['in_tc'] = (record['reading'] - 32) * 5 / 9
+        fields.update(
+            (name, value) for name, value in record.get('fields', {}).items() if name in fields
+        )
+        weather.publish_reading(source, record['reading'], fields)
+        return True
+
+    return fetch
+
+
+def replay(weather, traces, start=None, until=None):
+    """Run weather.main() (the imported weather logger module) over traces
+    in virtual time, from start (default: first record) until (default:
+    last record). Returns a summary dict."""
+    times = [trace.times[0] for trace in traces.values() if len(trace)]
+    times += [trace.times[-1] for trace in traces.values() if len(trace)]
+    if start is None:
+        start = min(times)
+    if until is None:
+        until = max(times)
+
+    clock = VirtualClock(start, until)
+    uploads = []
+
+    def record_upload(row):
+        uploads.append((clock.time(), dict(row)))
+        return True
+
+    # traced sources start enabled, standing in for the network probes
+    fetchers = {name: make_trace_fetcher(weather, trace) for name, trace in traces.items()}
+
+    weather.CLOCK = clock
+    weather.RUNTIME = 'loop'
+    weather.DISPLAY_SLEEP_DURATION = 0
+    for name in DISABLED_CONFIGS:
+        setattr(weather, name, None)
+    weather.PHANT_ONLINE.set()
+
+    wall_start = time.monotonic()
+    try:
+        weather.main(fetchers=fetchers, uploader=record_upload, remote_probes=False)
+    except SystemExit:
+        pass
+    wall_seconds = time.monotonic() - wall_start
+
+    return {
+        'virtual_seconds': clock.time() - start,
+        'wall_seconds': wall_seconds,
+        'uploads': uploads,
+        'updates': {
+            source.name: weather.UPDATE_SECONDS.count(source=source.name)
+            for source in weather.SOURCES
+        },
+        'frames': weather.DISPLAY_LATENESS_SECONDS.count(),
+        'errors': dict(weather.ERROR_TABLES),
+    }
+
+
+def format_summary(summary):
+    lines = [
+        'Replayed %.1f hours in %.2f s'
+        % (summary['virtual_seconds'] / 3600, summary['wall_seconds']),
+        'Uploads: %d' % len(summary['uploads']),
+        'Display frames: %d' % summary['frames'],
+    ]
+    lines.extend(
+        'Updates of %s: %d' % (name, count) for name, count in summary['updates'].items()
+    )
+    lines.extend('Errors %s: %d' % (name, count) for name, count in summary['errors'].items())
+    return '\n'.join(lines)
+
+
+def main():
+    if len(sys.argv) < 4:
+        print(usage)
+        sys.exit(1)
+    traces = load_traces(sys.argv[3])
+    hours = float(sys.argv[4]) if len(sys.argv) > 4 else None
+
+    # the weather logger reads its config from argv, and never touches
+    # hardware during a replay
+    sys.argv = sys.argv[:3]
+    os.environ['TIMETEMP_I2C_BACKEND'] = 'emulator'
+    import logging
+
+    from timetemp3 import my_weather_logging
+
+    my_weather_logging.logger.setLevel(logging.WARNING)
+    my_weather_logging.PRINT_ERROR_TABLES_ON_LOGGING = False
+
+    start = None
+    until = None
+    if hours is not None:
+        start = min(trace.times[0] for trace in traces.values() if len(trace))
+        until = start + hours * 60 * 60
+    print(format_summary(replay(my_weather_logging, traces, start, until)))
+
+
+# added in case script is run directly
+if __name__ == '__main__':
+
+    main()
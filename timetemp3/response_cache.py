@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# This file is covered by the LICENSE file in the root of this project.
+
+#  - on-disk cache of remote API responses, kept across restarts
+#    - entries are fresh for ttl_seconds, then served stale for up to
+#      stale_seconds more while one background refresh runs
+#    - concurrent refreshes of a key share a single request
+
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future
+
+# Defaults for how long a response is fresh, and how long after that it may
+# still be served while it is refreshed
+DEFAULT_TTL_SECONDS = 5 * 60
+DEFAULT_STALE_SECONDS = 60 * 60
+
+logger = logging.getLogger('weather_logger')
+
+
+class ResponseCache:
+    """Persistent cache of JSON-serializable values, keyed by string.
+
+    get(key, fetch) returns a fresh value as is; a stale one is returned at
+    once while fetch() runs in the background; anything older (or missing)
+    waits on fetch(). A failed fetch raises to the callers waiting on it and
+    leaves the cached value in place; a failed background fetch is passed to
+    on_refresh_error(exception), if given, as nobody waits on it.
+    """
+
+    def __init__(
+        self,
+        path,
+        ttl_seconds=DEFAULT_TTL_SECONDS,
+        stale_seconds=DEFAULT_STALE_SECONDS,
+        clock=time.time,
+    ):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.stale_seconds = stale_seconds
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._in_flight = {}
+        self._entries = self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, encoding='utf-8') as cache_file:
+                entries = json.load(cache_file)
+        except (FileNotFoundError, ValueError):
+            # a missing or damaged cache only costs one request
+            return {}
+        return entries if isinstance(entries, dict) else {}
+
+    def _save(self):
+        # caller holds the lock
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as cache_file:
+            json.dump(self._entries, cache_file, separators=(',', ':'))
+            cache_file.flush()
+            os.fsync(cache_file.fileno())
+        os.replace(tmp_path, self.path)
+
+    def peek(self, key):
+        # (value, fetched_at) of an entry that may still be served, else None
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None or self.age(entry) >= self.ttl_seconds + self.stale_seconds:
+            return None
+        return entry['value'], entry['fetched_at']
+
+    def age(self, entry):
+        return self.clock() - entry['fetched_at']
+
+    def get(self, key, fetch, on_refresh_error=None):
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is not None:
+            age = self.age(entry)
+            if age < self.ttl_seconds:
+                return entry['value']
+            if age < self.ttl_seconds + self.stale_seconds:
+                self.refresh_in_background(key, fetch, on_refresh_error)
+                return entry['value']
+        return self.refresh(key, fetch)
+
+    def refresh(self, key, fetch):
+        # fetch() unless a refresh of key is already in flight, then share it
+        with self._lock:
+            future = self._in_flight.get(key)
+            owner = future is None
+            if owner:
+                future = self._in_flight[key] = Future()
+        if not owner:
+            return future.result()
+
+        try:
+            value = fetch()
+            with self._lock:
+                self._entries[key] = {'fetched_at': self.clock(), 'value': value}
+                self._save()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(value)
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+        return value
+
+    def refresh_in_background(self, key, fetch, on_error=None):
+        with self._lock:
+            if key in self._in_flight:
+                return
+
+        def run():
+            try:
+                self.refresh(key, fetch)
+            except Exception as e:
+                # the stale value stays; the next get() tries again
+                logger.warning("Background refresh of %s failed: %r" % (key, e))
+                if on_error is not None:
+                    on_error(e)
+
+        threading.Thread(target=run, name='refresh ' + key, daemon=True).start()
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# This file is covered by the LICENSE file in the root of this project.
+
+#  - append-only binary log of high-rate samples, one segment file per day (UTC)
+#    - a day whose segment has other fields (after a config change) goes on
+#      in a new segment, YYYY-MM-DD.1 and so on
+#    - fixed-width little-endian records: logged_at then one column per field
+#    - text fields are stored as indexes into a per-segment string dictionary
+#    - segments are memory-mapped for reading; with NumPy, zero-copy
+
+import datetime
+import json
+import math
+import mmap
+import os
+import struct
+import threading
+
+SEGMENT_MAGIC = b'TTSL'
+SEGMENT_SUFFIX = '.samples'
+STRINGS_SUFFIX = '.strings'
+
+# Fields stored through the string dictionary
+TEXT_FIELDS = ('cond', 'cond_desc', 'weather_icon_name')
+
+# Dictionary index used for a missing text value (numeric fields use NaN)
+MISSING_STRING_INDEX = 0xFFFF
+
+
+def _segment_name(timestamp):
+    return datetime.datetime.fromtimestamp(timestamp, datetime.timezone.utc).strftime('%Y-%m-%d')
+
+
+def _record_layout(fields, text_fields):
+    # returns (struct format, numpy dtype description)
+    struct_format = '<d'
+    dtype = [('logged_at', '<f8')]
+    for field in fields:
+        if field in text_fields:
+            struct_format += 'H'
+            dtype.append((field, '<u2'))
+        else:
+            struct_format += 'd'
+            dtype.append((field, '<f8'))
+    return struct_format, dtype
+
+
+def _segment_sort_key(name):
+    # '2020-01-01' before '2020-01-01.1' before '2020-01-01.10'
+    date, _, number = name.partition('.')
+    return date, int(number or 0)
+
+
+def _truncate_torn_line(path):
+    # drop a last line torn by a crash mid-write, so new lines start clean
+    with open(path, 'rb+') as text_file:
+        content = text_file.read()
+        if content and not content.endswith(b'\n'):
+            text_file.truncate(content.rfind(b'\n') + 1)
+
+
+def _read_header(segment_file):
+    magic, header_length = struct.unpack('<4sI', segment_file.read(8))
+    if magic != SEGMENT_MAGIC:
+        raise ValueError('not a sample segment: {0}'.format(segment_file.name))
+    schema = json.loads(segment_file.read(header_length - 8).decode('utf-8'))
+    return header_length, schema
+
+
+class SampleLog:
+    def __init__(self, directory, fields, text_fields=TEXT_FIELDS):
+        self.directory = directory
+        self.fields = tuple(fields)
+        self.text_fields = tuple(field for field in self.fields if field in text_fields)
+        self._struct = struct.Struct(_record_layout(self.fields, self.text_fields)[0])
+        self._lock = threading.Lock()
+        self._segment = None
+        self._segment_file = None
+        self._strings_file = None
+        self._strings = {}
+        self.segment_path = None
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _open_segment(self, date):
+        self._close_segment()
+        number = 0
+        while True:
+            name = date if not number else '{0}.{1}'.format(date, number)
+            base = os.path.join(self.directory, name)
+            segment_path = base + SEGMENT_SUFFIX
+            if not os.path.exists(segment_path) or os.path.getsize(segment_path) == 0:
+                self._create_segment(segment_path)
+                break
+            with open(segment_path, 'rb') as segment_file:
+                header_length, schema = _read_header(segment_file)
+            if tuple(schema['fields']) == self.fields:
+                # drop a record torn by a crash mid-write
+                size = os.path.getsize(segment_path)
+                torn = (size - header_length) % self._struct.size
+                if torn:
+                    os.truncate(segment_path, size - torn)
+                break
+            number += 1
+
+        self._strings = {}
+        strings_path = base + STRINGS_SUFFIX
+        if os.path.exists(strings_path):
+            _truncate_torn_line(strings_path)
+            self._strings = {value: index for index, value in enumerate(read_strings(strings_path))}
+        self._segment_file = open(segment_path, 'ab')
+        self._strings_file = open(strings_path, 'a', encoding='utf-8')
+        self._segment = date
+        self.segment_path = segment_path
+
+    def _create_segment(self, segment_path):
+        schema = json.dumps({'fields': self.fields, 'text_fields': self.text_fields}).encode('utf-8')
+        # pad so records start 8-byte aligned
+        header_length = 8 + len(schema)
+        header_length += -header_length % 8
+        schema = schema.ljust(header_length - 8, b' ')
+        with open(segment_path, 'wb') as segment_file:
+            segment_file.write(struct.pack('<4sI', SEGMENT_MAGIC, header_length) + schema)
+
+    def _close_segment(self):
+        for open_file in (self._segment_file, self._strings_file):
+            if open_file is not None:
+                open_file.close()
+        self._segment_file = None
+        self._strings_file = None
+        self._segment = None
+
+    def _string_index(self, value):
+        if value is None:
+            return MISSING_STRING_INDEX
+        value = str(value)
+        index = self._strings.get(value)
+        if index is None:
+            index = len(self._strings)
+            if index >= MISSING_STRING_INDEX:
+                raise ValueError('string dictionary is full')
+            self._strings_file.write(json.dumps(value) + '\n')
+            self._strings_file.flush()
+            self._strings[value] = index
+        return index
+
+    def append(self, row, timestamp):
+        with self._lock:
+            name = _segment_name(timestamp)
+            if name != self._segment:
+                self._open_segment(name)
+
+            values = [timestamp]
+            for field in self.fields:
+                value = row.get(field)
+                if field in self.text_fields:
+                    values.append(self._string_index(value))
+                else:
+                    values.append(math.nan if value is None else float(value))
+            self._segment_file.write(self._struct.pack(*values))
+            self._segment_file.flush()
+
+    def close(self):
+        with self._lock:
+            self._close_segment()
+
+
+def read_strings(strings_path):
+    with open(strings_path, encoding='utf-8') as strings_file:
+        return [json.loads(line) for line in strings_file if line.endswith('\n')]
+
+
+def list_segments(directory, start_date=None, end_date=None):
+    # segment paths with start_date <= date <= end_date ('YYYY-MM-DD'), oldest first
+    names = sorted(
+        (
+            name[: -len(SEGMENT_SUFFIX)]
+            for name in os.listdir(directory)
+            if name.endswith(SEGMENT_SUFFIX)
+        ),
+        key=_segment_sort_key,
+    )
+    return [
+        os.path.join(directory, name + SEGMENT_SUFFIX)
+        for name in names
+        if (start_date is None or name[:10] >= start_date)
+        and (end_date is None or name[:10] <= end_date)
+    ]
+
+
+def read_segment(segment_path):
+    # zero-copy NumPy structured array backed by a read-only memory map
+    try:
+        import numpy
+    except ImportError as e:
+        raise ImportError(
+            'reading sample segments as arrays needs NumPy: pip install timetemp3[numpy]'
+        ) from e
+
+    with open(segment_path, 'rb') as segment_file:
+        header_length, schema = _read_header(segment_file)
+    dtype = numpy.dtype(_record_layout(schema['fields'], schema['text_fields'])[1])
+    count = (os.path.getsize(segment_path) - header_length) // dtype.itemsize
+    if count == 0:
+        return numpy.zeros(0, dtype=dtype)
+    return numpy.memmap(segment_path, dtype=dtype, mode='r', offset=header_length, shape=(count,))
+
+
+def read_segments(directory, start_date=None, end_date=None):
+    return [read_segment(path) for path in list_segments(directory, start_date, end_date)]
+
+
+def iter_records(segment_path):
+    # pure Python reader, yields dicts with text fields decoded
+    with open(segment_path, 'rb') as segment_file:
+        header_length, schema = _read_header(segment_file)
+        fields = schema['fields']
+        text_fields = schema['text_fields']
+        record = struct.Struct(_record_layout(fields, text_fields)[0])
+        strings_path = segment_path[: -len(SEGMENT_SUFFIX)] + STRINGS_SUFFIX
+        strings = read_strings(strings_path) if os.path.exists(strings_path) else []
+
+        size = os.path.getsize(segment_path)
+        count = (size - header_length) // record.size
+        if count == 0:
+            return
+        with mmap.mmap(segment_file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            end = header_length + count * record.size
+            for values in record.iter_unpack(mapped[header_length:end]):
+                result = {'logged_at': values[0]}
+                for field, value in zip(fields, values[1:]):
+                    if field in text_fields:
+                        value = None if value == MISSING_STRING_INDEX else strings[value]
+                    elif math.isnan(value):
+                        value = None
+                    result[field] = value
+                yield result
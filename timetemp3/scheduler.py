@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# This file is covered by the LICENSE file in the root of this project.
+
+#  - deadline scheduler for periodic jobs
+#    - next deadline of every job in one heap; the loop sleeps until the
+#      earliest one, so each job runs on its own period
+#    - lateness and overruns (periods missed while a job ran late) are counted
+#    - a job that raises is logged and runs again on its next period
+
+import heapq
+import itertools
+import logging
+
+from timetemp3.clock import SystemClock
+
+# Shortest wait before a job runs again, so one asking to run at once (or a
+# hair from now, after rounding) cannot spin
+MINIMUM_DELAY_SECONDS = 0.001
+
+logger = logging.getLogger('weather_logger')
+
+
+class Job:
+    __slots__ = (
+        'name',
+        'period',
+        'function',
+        'deadline',
+        'runs',
+        'failures',
+        'overruns',
+        'missed_periods',
+        'max_lateness',
+    )
+
+    def __init__(self, name, period, function, deadline):
+        self.name = name
+        self.period = period
+        # returns None to run again one period after this deadline, or the
+        # number of seconds from now until it should run next
+        self.function = function
+        self.deadline = deadline
+        self.runs = 0
+        self.failures = 0
+        self.overruns = 0
+        self.missed_periods = 0
+        self.max_lateness = 0.0
+
+    def __repr__(self):
+        return 'Job(%r, period=%r, deadline=%r)' % (self.name, self.period, self.deadline)
+
+
+class DeadlineScheduler:
+    """Runs jobs at their deadlines, earliest first.
+
+    clock provides time() and wait(event, timeout) (see timetemp3.clock).
+    on_run(job, lateness, missed) is called after each run, with how late it
+    started and how many periods it skipped to catch up.
+    """
+
+    def __init__(self, clock=None, on_run=None):
+        self.clock = clock or SystemClock()
+        self.on_run = on_run
+        self._heap = []
+        self._jobs = {}
+        self._sequence = itertools.count()
+
+    def add(self, name, period, function, deadline=None):
+        if name in self._jobs:
+            raise ValueError('duplicate job: {0}'.format(name))
+        if deadline is None:
+            deadline = self.clock.time()
+        job = Job(name, period, function, deadline)
+        self._jobs[name] = job
+        self._push(job)
+        return job
+
+    def __getitem__(self, name):
+        return self._jobs[name]
+
+    def __iter__(self):
+        return iter(self._jobs.values())
+
+    def _push(self, job):
+        # the sequence number keeps equal deadlines in the order they were set
+        heapq.heappush(self._heap, (job.deadline, next(self._sequence), job))
+
+    def next_deadline(self):
+        return self._heap[0][0] if self._heap else None
+
+    def run_due(self):
+        # run every job whose deadline has passed; returns how many ran
+        now = self.clock.time()
+        ran = 0
+        while self._heap and self._heap[0][0] <= now:
+            _, _, job = heapq.heappop(self._heap)
+            self._run(job)
+            ran += 1
+        return ran
+
+    def _run(self, job):
+        started = self.clock.time()
+        lateness = max(0.0, started - job.deadline)
+        try:
+            delay = job.function()
+        except Exception:
+            # one failed run must not take every other job down with it
+            logger.exception("Job %s failed" % job.name)
+            job.failures += 1
+            delay = None
+        job.runs += 1
+        job.max_lateness = max(job.max_lateness, lateness)
+
+        finished = self.clock.time()
+        missed = 0
+        if delay is not None:
+            job.deadline = finished + max(delay, MINIMUM_DELAY_SECONDS)
+        else:
+            job.deadline += job.period
+            if job.deadline <= finished:
+                # overran: skip the periods already gone, keeping the phase
+                missed = int((finished - job.deadline) // job.period) + 1
+                job.deadline += missed * job.period
+                job.overruns += 1
+                job.missed_periods += missed
+        self._push(job)
+
+        if self.on_run is not None:
+            self.on_run(job, lateness, missed)
+
+    def run(self, stop_event):
+        # run jobs until stop_event is set, sleeping until each next deadline
+        while not stop_event.is_set():
+            deadline = self.next_deadline()
+            if deadline is None:
+                return
+            if self.clock.wait(stop_event, deadline - self.clock.time()):
+                return
+            self.run_due()
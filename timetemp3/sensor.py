@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# This file is covered by the LICENSE file in the root of this project.
+
+#  - sample the BMP085 with a single temperature and a single pressure conversion
+#    - all derived values (°C, °F, hPa, altitude) come from those two raw readings
+
+from collections import namedtuple
+
+# Standard pressure at sea level (in Pa) used for altitude
+SEALEVEL_PRESSURE_PA = 101325.0
+
+SensorSample = namedtuple(
+    'SensorSample',
+    ('temperature_c', 'temperature_f', 'pressure_pa', 'pressure_hpa', 'altitude_m'),
+)
+
+
+def compensate_temperature(raw_temperature, calibration):
+    # section 3.5 of the BMP085 datasheet; returns (tenths of degrees C, B5)
+    ac1, ac2, ac3, ac4, ac5, ac6, b1, b2, mb, mc, md = calibration
+    x1 = ((raw_temperature - ac6) * ac5) >> 15
+    x2 = (mc << 11) // (x1 + md)
+    b5 = x1 + x2
+    return (b5 + 8) >> 4, b5
+
+
+def compensate_pressure(raw_pressure, b5, calibration, oversampling):
+    # section 3.5 of the BMP085 datasheet; returns pressure in Pa
+    ac1, ac2, ac3, ac4, ac5, ac6, b1, b2, mb, mc, md = calibration
+    b6 = b5 - 4000
+    x1 = (b2 * (b6 * b6) >> 12) >> 11
+    x2 = (ac2 * b6) >> 11
+    x3 = x1 + x2
+    b3 = (((ac1 * 4 + x3) << oversampling) + 2) // 4
+    x1 = (ac3 * b6) >> 13
+    x2 = (b1 * ((b6 * b6) >> 12)) >> 16
+    x3 = ((x1 + x2) + 2) >> 2
+    b4 = (ac4 * (x3 + 32768)) >> 15
+    b7 = (raw_pressure - b3) * (50000 >> oversampling)
+    if b7 < 0x80000000:
+        p = (b7 * 2) // b4
+    else:
+        p = (b7 // b4) * 2
+    x1 = (p >> 8) * (p >> 8)
+    x1 = (x1 * 3038) >> 16
+    x2 = (-7357 * p) >> 16
+    return p + ((x1 + x2 + 3791) >> 4)
+
+
+def pressure_to_altitude(pressure_pa, sealevel_pa=SEALEVEL_PRESSURE_PA):
+    # section 3.6 of the BMP085 datasheet
+    return 44330.0 * (1.0 - pow(pressure_pa / sealevel_pa, (1.0 / 5.255)))
+
+
+def get_bmp_calibration(bmp):
+    return (
+        bmp.cal_AC1,
+        bmp.cal_AC2,
+        bmp.cal_AC3,
+        bmp.cal_AC4,
+        bmp.cal_AC5,
+        bmp.cal_AC6,
+        bmp.cal_B1,
+        bmp.cal_B2,
+        bmp.cal_MB,
+        bmp.cal_MC,
+        bmp.cal_MD,
+    )
+
+
+def read_bmp_sample(bmp):
+    # The Adafruit read_temperature(), read_pressure() and read_altitude() each
+    # start their own conversions; one of each is all the values need.
+    raw_temperature = bmp.read_raw_temp()
+    raw_pressure = bmp.read_raw_pressure()
+
+    calibration = get_bmp_calibration(bmp)
+    temperature_tenths, b5 = compensate_temperature(raw_temperature, calibration)
+    pressure_pa = compensate_pressure(raw_pressure, b5, calibration, bmp._mode)
+
+    temperature_c = temperature_tenths / 10.0
+    return SensorSample(
+        temperature_c=temperature_c,
+        temperature_f=(temperature_c * 9.0 / 5.0) + 32.0,
+        pressure_pa=pressure_pa,
+        pressure_hpa=pressure_pa / 100.0,
+        altitude_m=pressure_to_altitude(float(pressure_pa)),
+    )
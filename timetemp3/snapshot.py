@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# This file is covered by the LICENSE file in the root of this project.
+
+import time
+from collections import namedtuple
+from types import MappingProxyType
+
+# Immutable record of the most recent readings from one temperature location
+Snapshot = namedtuple('Snapshot', ('location', 'reading', 'fields', 'timestamp'))
+
+
+def make_snapshot(location, reading, fields=None, timestamp=None):
+    if timestamp is None:
+        timestamp = time.time()
+    # copy so later changes by the fetcher cannot leak into a published snapshot
+    frozen_fields = MappingProxyType(dict(fields or {}))
+    return Snapshot(location, reading, frozen_fields, timestamp)
+
+
+class SnapshotBoard:
+    """Latest-value store shared between fetcher threads and readers.
+
+    Publishing rebinds a single dict entry to a new immutable snapshot, which
+    is atomic, so neither side takes a lock and readers never wait on a fetch.
+    """
+
+    def __init__(self):
+        self._latest = {}
+
+    def publish(self, snapshot):
+        self._latest[snapshot.location] = snapshot
+
+    def latest(self, location):
+        return self._latest.get(location)
+
+    def merged_fields(self):
+        fields = {}
+        for snapshot in list(self._latest.values()):
+            fields.update(snapshot.fields)
+        return fields
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# This file is covered by the LICENSE file in the root of this project.
+
+#  - registry of temperature sources (local sensors and remote feeds)
+#    - each source carries its own interval, enable state, fetcher and glyph
+#    - lookups by name are a dict access, however many sources there are
+
+import time
+
+from timetemp3.history import DEFAULT_HISTORY_SECONDS, RingBuffer
+
+
+class Source:
+    __slots__ = (
+        'name',
+        'kind',
+        'fetch',
+        'interval',
+        'glyph',
+        'enabled',
+        'logged',
+        'device',
+        'options',
+        'cycle_number',
+        'last_update',
+        'reading',
+        'history',
+    )
+
+    def __init__(
+        self,
+        name,
+        kind,
+        fetch,
+        interval,
+        glyph='tickmark',
+        enabled=True,
+        logged=False,
+        device=None,
+        options=None,
+        history_seconds=DEFAULT_HISTORY_SECONDS,
+    ):
+        self.name = name
+        self.kind = kind
+        # called as fetch(source); publishes its reading through updated()
+        self.fetch = fetch
+        self.interval = interval
+        self.glyph = glyph
+        self.enabled = enabled
+        # logged sources must have a reading before rows are uploaded
+        self.logged = logged
+        self.device = device
+        self.options = options or {}
+        # -1 until the first reading, so an update is due right away
+        self.cycle_number = -1
+        self.last_update = None
+        self.reading = None
+        self.history = RingBuffer.for_interval(interval, history_seconds)
+
+    def __repr__(self):
+        return 'Source(%r, %r, interval=%r, enabled=%r)' % (
+            self.name,
+            self.kind,
+            self.interval,
+            self.enabled,
+        )
+
+    @property
+    def busnum(self):
+        # sources on another I2C bus are updated by that bus's worker
+        return self.options.get('busnum')
+
+    def is_due(self, start_time, now=None):
+        if not self.enabled:
+            return False
+        if self.reading is None:
+            return True
+        if now is None:
+            now = time.time()
+        return now > start_time + (self.cycle_number + 1) * self.interval
+
+    def updated(self, reading, timestamp=None):
+        if timestamp is None:
+            timestamp = time.time()
+        self.reading = reading
+        self.last_update = timestamp
+        self.cycle_number += 1
+        self.history.append(reading, timestamp)
+
+
+class SourceRegistry:
+    def __init__(self, sources=()):
+        self._sources = []
+        self._by_name = {}
+        for source in sources:
+            self.register(source)
+
+    def register(self, source):
+        if source.name in self._by_name:
+            raise ValueError('duplicate source name: {0}'.format(source.name))
+        self._sources.append(source)
+        self._by_name[source.name] = source
+        return source
+
+    def __getitem__(self, name):
+        return self._by_name[name]
+
+    def __contains__(self, name):
+        return name in self._by_name
+
+    def __iter__(self):
+        return iter(self._sources)
+
+    def __len__(self):
+        return len(self._sources)
+
+    def at(self, index):
+        # sources in registration (display rotation) order
+        return self._sources[index]
+
+    def of_kind(self, kind):
+        return [source for source in self._sources if source.kind == kind]
+
+    def names(self):
+        return [source.name for source in self._sources]
+
+    def next_displayable(self, index):
+        # (index, source) of the first enabled source with a reading after
+        # position index, wrapping around; (index, None) if there is none
+        count = len(self._sources)
+        for step in range(1, count + 1):
+            position = (index + step) % count
+            source = self._sources[position]
+            if source.enabled and source.reading is not None:
+                return position, source
+        return index, None
+
+
+def build_sources(declarations, kinds, history_seconds=DEFAULT_HISTORY_SECONDS):
+    """Create a SourceRegistry from config declarations (a list of dicts with
+    name, kind and optional interval, glyph, enabled, logged and options).
+
+    kinds maps each kind to its defaults: fetch, interval, glyph, logged,
+    remote (remote sources start disabled) and make_device(options).
+    Declarations with "enabled": false are left out. Sources of one kind
+    log the same fields, so only one of each kind may be logged.
+    """
+    registry = SourceRegistry()
+    # kind -> name of the source whose fields go into the logged row
+    logged_kinds = {}
+    for declaration in declarations:
+        if not declaration.get('enabled', True):
+            continue
+        kind = declaration['kind']
+        if kind not in kinds:
+            raise ValueError('unknown source kind: {0}'.format(kind))
+        defaults = kinds[kind]
+        options = declaration.get('options', {})
+        make_device = defaults.get('make_device')
+        name = declaration.get('name', kind)
+        logged = declaration.get('logged', defaults.get('logged', False))
+        if logged:
+            if kind in logged_kinds:
+                raise ValueError(
+                    'sources {0} and {1} would both log the {2} fields; '
+                    'set "logged": false on one'.format(logged_kinds[kind], name, kind)
+                )
+            logged_kinds[kind] = name
+        registry.register(
+            Source(
+                name,
+                kind,
+                defaults['fetch'],
+                declaration.get('interval', defaults['interval']),
+                glyph=declaration.get('glyph', defaults.get('glyph', 'tickmark')),
+                enabled=not defaults.get('remote', False),
+                logged=logged,
+                device=make_device(options) if make_device else None,
+                options=options,
+                history_seconds=history_seconds,
+            )
+        )
+    return registry
@@ -8,6 +8,7 @@ import time
 from Adafruit_LED_Backpack import SevenSegment
 
 import timetemp3
+from timetemp3.display import write_display_changes
 from timetemp3.constants import (
     DIGIT_1,
     DIGIT_2,
@@ -31,8 +32,11 @@ TEMPERATURE_RAW_DIGIT_VALUES = {
 
 
 def _lookup_where_temperature_digit(where):
+    # where is a location name, or the name of a glyph above
     raw_value = 0x0
-    if where == 'outdoor':
+    if where in TEMPERATURE_RAW_DIGIT_VALUES:
+        raw_value = TEMPERATURE_RAW_DIGIT_VALUES[where]
+    elif where == 'outdoor':
         raw_value = TEMPERATURE_RAW_DIGIT_VALUES['outdoor_degrees']
     elif where == 'nest':
         raw_value = TEMPERATURE_RAW_DIGIT_VALUES['°']
@@ -41,11 +45,20 @@ def _lookup_where_temperature_digit(where):
     return raw_value
 
 
-def get_temperature_digits_in_fahrenheit(temperature, where):
-    digits = [None] * 5
+# Range covered by the precomputed digit tables, in tenths of a degree
+TEMPERATURE_TABLE_MIN_TENTHS = -995
+TEMPERATURE_TABLE_MAX_TENTHS = 1999
+
+# Raw segments for a blank display (no temperature available)
+BLANK_RAW_DIGITS = (0x00, 0x00, 0x00, 0x00, False)
+
+# Precomputed digits per location glyph, keyed by (tenths, whole degrees)
+_TEMPERATURE_DIGIT_TABLES = {}
+_TEMPERATURE_RAW_DIGIT_TABLES = {}
 
-    if temperature is None:
-        return digits
+
+def _compute_temperature_digits_in_fahrenheit(temperature, where_raw_value):
+    digits = [None] * 5
 
     # these are mostly constant
     digits[DIGIT_4] = 'F'
@@ -58,7 +71,7 @@ def get_temperature_digits_in_fahrenheit(temperature, where):
     elif round(temperature * 10.0) > 95.0:  # 10 to 99 degrees : "##°F"
         digits[DIGIT_1] = int(round(temperature) / 10)  # Tens
         digits[DIGIT_2] = int(round(temperature) % 10)  # Ones
-        digits[DIGIT_3] = _lookup_where_temperature_digit(where)
+        digits[DIGIT_3] = where_raw_value
     elif round(temperature * 10.0) > -5.0:  # -0 to 9 degrees    : "_#°F"
         rounded = int(round(temperature))
         if rounded == 10:
@@ -67,11 +80,11 @@ def get_temperature_digits_in_fahrenheit(temperature, where):
             digits[DIGIT_1] = ' '  # Tens
 
         digits[DIGIT_2] = int(round(temperature) % 10)  # Ones
-        digits[DIGIT_3] = _lookup_where_temperature_digit(where)
+        digits[DIGIT_3] = where_raw_value
     elif round(temperature * 10.0) >= -95.0:  # -9 to 0 degrees : "-#°F"
         digits[DIGIT_1] = '-'
         digits[DIGIT_2] = int(round(abs(temperature)) % 10)  # Ones
-        digits[DIGIT_3] = _lookup_where_temperature_digit(where)
+        digits[DIGIT_3] = where_raw_value
     elif round(temperature * 10.0) >= -995.0:  # -99 to -10 degrees : "-##F"
         digits[DIGIT_1] = '-'  # Tens
         digits[DIGIT_2] = int(round(abs(temperature)) / 10)  # Tens
@@ -86,6 +99,79 @@ def get_temperature_digits_in_fahrenheit(temperature, where):
     return digits
 
 
+def _convert_to_raw_digits(digits):
+    raw_digits = [SevenSegment.DIGIT_VALUES.get(str(digit).upper(), 0x00) for digit in digits[:4]]
+    # location glyph is already a raw segment value
+    if isinstance(digits[DIGIT_3], int):
+        raw_digits[DIGIT_3] = digits[DIGIT_3]
+    raw_digits.append(bool(digits[DIGIT_COLON]))
+    return tuple(raw_digits)
+
+
+def _temperature_table_key(temperature):
+    # The layout is chosen on the tenths of a degree, the digits on whole
+    # degrees; both are needed to tell apart e.g. 0.54 (shows 1) and 0.46
+    return (round(temperature * 10.0), round(temperature))
+
+
+def _build_temperature_digit_tables(where_raw_value):
+    digit_table = {}
+    raw_digit_table = {}
+    for tenths in range(TEMPERATURE_TABLE_MIN_TENTHS, TEMPERATURE_TABLE_MAX_TENTHS + 1):
+        # whole degrees can round either way only near a half degree
+        for offset in (-0.04, 0.0, 0.04):
+            temperature = tenths / 10.0 + offset
+            key = _temperature_table_key(temperature)
+            if key[0] != tenths or key in digit_table:
+                continue
+            digits = _compute_temperature_digits_in_fahrenheit(temperature, where_raw_value)
+            digit_table[key] = tuple(digits)
+            raw_digit_table[key] = _convert_to_raw_digits(digits)
+
+    _TEMPERATURE_DIGIT_TABLES[where_raw_value] = digit_table
+    _TEMPERATURE_RAW_DIGIT_TABLES[where_raw_value] = raw_digit_table
+
+
+def _lookup_temperature_digits(tables, temperature, where):
+    where_raw_value = _lookup_where_temperature_digit(where)
+    table = tables.get(where_raw_value)
+    if table is None:
+        # built on first use of each location glyph
+        _build_temperature_digit_tables(where_raw_value)
+        table = tables[where_raw_value]
+
+    # None outside of the displayable range
+    return table.get(_temperature_table_key(temperature))
+
+
+def get_temperature_digits_in_fahrenheit(temperature, where):
+    if temperature is None:
+        return [None] * 5
+
+    digits = _lookup_temperature_digits(_TEMPERATURE_DIGIT_TABLES, temperature, where)
+    if digits is None:
+        digits = _compute_temperature_digits_in_fahrenheit(
+            temperature, _lookup_where_temperature_digit(where)
+        )
+    return list(digits)
+
+
+def get_temperature_raw_digits_in_fahrenheit(temperature, where):
+    # Same as get_temperature_digits_in_fahrenheit() but as raw segment values
+    # (DIGIT_1 .. DIGIT_4, then the colon flag) ready to write to the display
+    if temperature is None:
+        return BLANK_RAW_DIGITS
+
+    raw_digits = _lookup_temperature_digits(_TEMPERATURE_RAW_DIGIT_TABLES, temperature, where)
+    if raw_digits is None:
+        raw_digits = _convert_to_raw_digits(
+            _compute_temperature_digits_in_fahrenheit(
+                temperature, _lookup_where_temperature_digit(where)
+            )
+        )
+    return raw_digits
+
+
 def display_temperature_digits(
     temperature_digits,
     sleep_duration=DEFAULT_TEMPERATURE_DISPLAY_SLEEP_DURATION,
@@ -106,9 +192,33 @@ def display_temperature_digits(
         segment.set_digit(DIGIT_4, temperature_digits[DIGIT_4])
         segment.set_colon(temperature_digits[DIGIT_COLON])
 
-        # Write the display buffer to the hardware.  This must be called to
-        # update the actual display LEDs.
-        segment.write_display()
+        # Write the display buffer to the hardware.  Only bytes that changed
+        # since the previous frame go out on the I2C bus.
+        write_display_changes(segment)
+
+        # sleep_duration should be less than 1 second to prevent colon jittering
+        time.sleep(sleep_duration)
+
+
+def display_temperature_raw_digits(
+    raw_digits,
+    sleep_duration=DEFAULT_TEMPERATURE_DISPLAY_SLEEP_DURATION,
+    display_handle=None,
+):
+    segment = display_handle
+
+    if segment:
+        segment.set_digit_raw(DIGIT_1, raw_digits[DIGIT_1])
+        segment.set_digit_raw(DIGIT_2, raw_digits[DIGIT_2])
+        segment.set_digit_raw(DIGIT_3, raw_digits[DIGIT_3])
+        segment.set_digit_raw(DIGIT_4, raw_digits[DIGIT_4])
+        segment.set_colon(raw_digits[DIGIT_COLON])
+
+        # Write the display buffer to the hardware.  Only bytes that changed
+        # since the previous frame go out on the I2C bus.
+        written = write_display_changes(segment)
 
         # sleep_duration should be less than 1 second to prevent colon jittering
         time.sleep(sleep_duration)
+        return written
+    return 0
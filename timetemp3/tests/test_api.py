@@ -0,0 +1,82 @@
+import gzip
+import json
+import urllib.error
+import urllib.request
+from unittest import TestCase
+
+from timetemp3.api import CONTENT_TYPE, JsonApiServer, _accepts_gzip, _etag_matches
+
+
+class TestJsonApiServer(TestCase):
+
+    def setUp(self):
+        self.readings = {'sensor': 70.5}
+
+        def latest(query):
+            return self.readings
+
+        def history(query):
+            hours = float(query.get('hours', 24))
+            return {'hours': hours, 'readings': [70.0 + i / 100 for i in range(200)]}
+
+        def source(query):
+            return {'reading': self.readings[query['name']]}
+
+        self.server = JsonApiServer(
+            {'/latest': latest, '/history': history, '/source': source}, 0, '127.0.0.1'
+        )
+        self.server.start()
+        self.url = 'http://127.0.0.1:%d' % self.server.port
+
+    def tearDown(self):
+        self.server.stop()
+
+    def get(self, path, headers=None):
+        request = urllib.request.Request(self.url + path, headers=headers or {})
+        try:
+            with urllib.request.urlopen(request) as response:
+                return response.status, response.headers, response.read()
+        except urllib.error.HTTPError as e:
+            return e.code, e.headers, e.read()
+
+    def test_json_and_etag(self):
+        status, headers, body = self.get('/latest')
+        self.assertEqual(status, 200)
+        self.assertEqual(headers['Content-Type'], CONTENT_TYPE)
+        self.assertEqual(json.loads(body), {'sensor': 70.5})
+        etag = headers['ETag']
+
+        status, headers, body = self.get('/latest', {'If-None-Match': etag})
+        self.assertEqual((status, body), (304, b''))
+
+        self.readings['sensor'] = 71.0
+        status, headers, body = self.get('/latest', {'If-None-Match': etag})
+        self.assertEqual(status, 200)
+        self.assertNotEqual(headers['ETag'], etag)
+
+    def test_gzip(self):
+        status, headers, body = self.get('/history?hours=3', {'Accept-Encoding': 'gzip'})
+        self.assertEqual(headers['Content-Encoding'], 'gzip')
+        self.assertEqual(json.loads(gzip.decompress(body))['hours'], 3.0)
+
+        status, headers, plain = self.get('/history?hours=3')
+        self.assertIsNone(headers['Content-Encoding'])
+        self.assertEqual(gzip.decompress(body), plain)
+
+        # too small to be worth compressing
+        status, headers, body = self.get('/latest', {'Accept-Encoding': 'gzip'})
+        self.assertIsNone(headers['Content-Encoding'])
+
+    def test_errors(self):
+        self.assertEqual(self.get('/other')[0], 404)
+        self.assertEqual(self.get('/source?name=attic')[0], 404)
+        self.assertEqual(self.get('/history?hours=many')[0], 400)
+        self.assertEqual(self.get('/source?name=sensor')[0], 200)
+
+    def test_header_parsing(self):
+        self.assertTrue(_accepts_gzip('deflate, gzip;q=0.8'))
+        self.assertFalse(_accepts_gzip('gzip;q=0, deflate'))
+        self.assertFalse(_accepts_gzip(''))
+        self.assertTrue(_etag_matches('"a", W/"b"', '"b"'))
+        self.assertTrue(_etag_matches('*', '"b"'))
+        self.assertFalse(_etag_matches('"a"', '"b"'))
@@ -0,0 +1,79 @@
+import os
+import sqlite3
+import tempfile
+from unittest import TestCase
+
+from timetemp3.archive import Archive
+
+FIELDS = ('cond', 'dt', 'in_tf', 'weather_code')
+
+
+class TestArchive(TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, 'archive.sqlite3')
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_rows_between(self):
+        archive = Archive(self.path, FIELDS, batch_rows=2, batch_seconds=3600)
+        for dt in (300, 0, 600, 900):
+            archive.append({'cond': 'Clear', 'dt': dt, 'in_tf': 70.5, 'weather_code': 800})
+        archive.flush()
+
+        rows = archive.rows_between(0, 900)
+        self.assertEqual([row['dt'] for row in rows], [0, 300, 600])
+        self.assertEqual(rows[0], {'cond': 'Clear', 'dt': 0, 'in_tf': 70.5, 'weather_code': 800})
+        self.assertEqual(archive.rows_between(300, 600, fields=('in_tf',)), [{'in_tf': 70.5}])
+        archive.close()
+
+    def test_close_writes_partial_batch(self):
+        archive = Archive(self.path, FIELDS, batch_rows=100, batch_seconds=3600)
+        archive.append({'dt': 1, 'in_tf': 68.0})
+        archive.close()
+
+        reopened = Archive(self.path, FIELDS)
+        self.assertEqual(reopened.latest(), [{'cond': None, 'dt': 1, 'in_tf': 68.0, 'weather_code': None}])
+        reopened.close()
+
+    def test_new_field_adds_column(self):
+        archive = Archive(self.path, FIELDS)
+        archive.append({'dt': 1, 'in_tf': 68.0})
+        archive.close()
+
+        reopened = Archive(self.path, FIELDS + ('heat_index',))
+        reopened.append({'dt': 2, 'in_tf': 69.0, 'heat_index': 70.1})
+        reopened.flush()
+        self.assertEqual(
+            reopened.rows_between(0, 3, fields=('dt', 'heat_index')),
+            [{'dt': 1, 'heat_index': None}, {'dt': 2, 'heat_index': 70.1}],
+        )
+        reopened.close()
+
+    def test_failed_write_is_retried(self):
+        archive = Archive(self.path, FIELDS, batch_rows=1)
+        connection = sqlite3.connect(self.path)
+        connection.execute('ALTER TABLE logging_data RENAME TO moved')
+        connection.close()
+
+        with self.assertLogs('weather_logger', 'ERROR'):
+            archive.append({'dt': 1, 'in_tf': 68.0})
+            # returns although the write failed
+            archive.flush()
+        self.assertTrue(archive._writer.is_alive())
+
+        connection = sqlite3.connect(self.path)
+        connection.execute('ALTER TABLE moved RENAME TO logging_data')
+        connection.close()
+        archive.append({'dt': 2, 'in_tf': 69.0})
+        archive.flush()
+        self.assertEqual([row['dt'] for row in archive.latest(5)], [1, 2])
+        archive.close()
+
+    def test_unknown_field_rejected(self):
+        archive = Archive(self.path, FIELDS)
+        with self.assertRaises(ValueError):
+            archive.rows_between(0, 1, fields=('dt; DROP TABLE logging_data',))
+        archive.close()
@@ -0,0 +1,91 @@
+from unittest import TestCase, mock
+
+import requests
+
+from timetemp3 import batch_upload
+from timetemp3.batch_upload import BatchUploader
+from timetemp3.upload_queue import RowRejected
+
+FIELDS = ('dt', 'in_tf')
+
+
+class TestBatchUploader(TestCase):
+
+    def make_uploader(self, send_row=None, batch_rows=3):
+        self.rows_sent_singly = []
+
+        def default_send_row(row):
+            self.rows_sent_singly.append(row['dt'])
+            return True
+
+        uploader = BatchUploader(
+            'https://phant.example.com/input/PUBLIC_KEY',
+            'PRIVATE_KEY',
+            FIELDS,
+            send_row or default_send_row,
+            batch_rows=batch_rows,
+            batch_seconds=3600,
+        )
+        uploader._session = mock.Mock()
+        return uploader
+
+    def test_batch_posted_once_full(self):
+        uploader = self.make_uploader()
+        uploader._session.post.return_value = mock.Mock(status_code=200)
+        self.assertEqual(uploader.add({'dt': 1, 'in_tf': 70.0}), 0)
+        self.assertEqual(uploader.add({'dt': 2, 'in_tf': 71.0}), 0)
+        self.assertEqual(uploader.add({'dt': 3, 'in_tf': 72.0}), 3)
+
+        uploader._session.post.assert_called_once()
+        payload = uploader._session.post.call_args.kwargs['json']
+        self.assertEqual([row['dt'] for row in payload], [1, 2, 3])
+        self.assertEqual(self.rows_sent_singly, [])
+        self.assertEqual(uploader.rows_uploaded, 3)
+
+    def test_rejected_batch_falls_back_to_single_rows(self):
+        uploader = self.make_uploader()
+        uploader._session.post.return_value = mock.Mock(status_code=400)
+        sent = uploader.send_rows([{'dt': 1}, {'dt': 2}])
+        self.assertEqual(sent, 2)
+        self.assertEqual(self.rows_sent_singly, [1, 2])
+
+    def test_fallback_stops_at_first_failed_row(self):
+        uploader = self.make_uploader(send_row=lambda row: row['dt'] < 2)
+        uploader._session.post.return_value = mock.Mock(status_code=400)
+        self.assertEqual(uploader.send_rows([{'dt': 1}, {'dt': 2}, {'dt': 3}]), 1)
+
+    def test_unreachable_server_keeps_rows_pending(self):
+        uploader = self.make_uploader(batch_rows=2)
+        uploader._session.post.side_effect = requests.exceptions.ConnectionError('down')
+        uploader.add({'dt': 1})
+        self.assertEqual(uploader.add({'dt': 2}), 0)
+        self.assertEqual(self.rows_sent_singly, [])
+        self.assertEqual(len(uploader._pending), 2)
+
+    def test_refused_row_is_dropped_from_pending(self):
+        def send_row(row):
+            if row['dt'] == 2:
+                raise RowRejected('bad value')
+            return True
+
+        uploader = self.make_uploader(send_row=send_row)
+        uploader._session.post.return_value = mock.Mock(status_code=400)
+        uploader.add({'dt': 1})
+        uploader.add({'dt': 2})
+        self.assertEqual(uploader.add({'dt': 3}), 1)
+        self.assertEqual(uploader._pending, [{'dt': 3}])
+
+    def test_failing_server_is_not_sent_single_rows(self):
+        uploader = self.make_uploader(batch_rows=2)
+        for status in (500, 503, 429):
+            uploader._session.post.return_value = mock.Mock(status_code=status)
+            self.assertEqual(uploader.send_rows([{'dt': 1}, {'dt': 2}]), 0)
+        self.assertEqual(self.rows_sent_singly, [])
+
+    def test_pending_rows_are_capped(self):
+        uploader = self.make_uploader(batch_rows=10)
+        uploader._session.post.return_value = mock.Mock(status_code=503)
+        with mock.patch.object(batch_upload, 'MAX_PENDING_ROWS', 4):
+            for dt in range(1, 13):
+                uploader.add({'dt': dt})
+        self.assertEqual([row['dt'] for row in uploader._pending], [9, 10, 11, 12])
@@ -0,0 +1,97 @@
+from unittest import TestCase
+
+from timetemp3.breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+
+
+class FakeClock:
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def no_jitter(low, high):
+    return (low + high) / 2
+
+
+class TestCircuitBreaker(TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.changes = []
+        self.breaker = CircuitBreaker(
+            'outdoor',
+            failure_threshold=3,
+            base_seconds=60,
+            max_seconds=200,
+            on_state_change=lambda breaker, old, new: self.changes.append((old, new)),
+            clock=self.clock,
+            uniform=no_jitter,
+        )
+
+    def fail(self, times=1):
+        for _ in range(times):
+            self.assertTrue(self.breaker.allow())
+            self.breaker.record_failure()
+
+    def test_opens_after_threshold(self):
+        self.fail(2)
+        self.assertEqual(self.breaker.state, CLOSED)
+        self.fail()
+        self.assertEqual(self.breaker.state, OPEN)
+        self.assertFalse(self.breaker.allow())
+        self.assertEqual(self.breaker.retry_in(), 60)
+
+    def test_success_resets_failures(self):
+        self.fail(2)
+        self.breaker.record_success()
+        self.fail(2)
+        self.assertEqual(self.breaker.state, CLOSED)
+
+    def test_half_open_allows_one_trial(self):
+        self.fail(3)
+        self.clock.now += 60
+        self.assertTrue(self.breaker.allow())
+        self.assertEqual(self.breaker.state, HALF_OPEN)
+        self.assertFalse(self.breaker.allow())
+        self.breaker.record_success()
+        self.assertEqual(self.breaker.state, CLOSED)
+        self.assertEqual(self.changes, [(CLOSED, OPEN), (OPEN, HALF_OPEN), (HALF_OPEN, CLOSED)])
+
+    def test_skipped_trial_reopens(self):
+        self.fail(3)
+        self.clock.now += 60
+        self.assertTrue(self.breaker.allow())
+        self.breaker.record_skipped()
+        self.assertEqual(self.breaker.state, OPEN)
+        # not a failure: the backoff does not grow
+        self.assertEqual(self.breaker.retry_in(), 60)
+        self.clock.now += 60
+        self.assertTrue(self.breaker.allow())
+        self.breaker.record_success()
+        self.assertEqual(self.breaker.state, CLOSED)
+
+    def test_skipped_call_while_closed(self):
+        self.fail(2)
+        self.breaker.record_skipped()
+        self.assertEqual(self.breaker.state, CLOSED)
+        self.assertEqual(self.breaker.failures, 2)
+
+    def test_backoff_doubles_up_to_maximum(self):
+        self.fail(3)
+        backoffs = [self.breaker.retry_in()]
+        for _ in range(3):
+            self.clock.now += self.breaker.retry_in()
+            self.fail()
+            backoffs.append(self.breaker.retry_in())
+        self.assertEqual(backoffs, [60, 120, 200, 200])
+
+    def test_jitter_spreads_backoff(self):
+        breaker = CircuitBreaker('nest', failure_threshold=1, base_seconds=100, jitter=0.25)
+        backoffs = set()
+        for _ in range(20):
+            breaker.opened_count = 1
+            backoffs.add(breaker.backoff_seconds())
+        self.assertGreater(len(backoffs), 1)
+        self.assertTrue(all(75 <= backoff <= 125 for backoff in backoffs))
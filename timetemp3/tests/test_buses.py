@@ -0,0 +1,146 @@
+import threading
+import time
+from unittest import TestCase
+
+from Adafruit_LED_Backpack import SevenSegment
+
+import timetemp3
+from timetemp3.buses import BusWorkers, DisplayGroup, SharedI2CBus, device_group_sources
+from timetemp3.emulator import EmulatedI2CBus
+from timetemp3.sources import Source, SourceRegistry
+
+
+def fetch_nothing(source):
+    pass
+
+
+class TestBusWorkers(TestCase):
+
+    def setUp(self):
+        self.workers = BusWorkers()
+
+    def tearDown(self):
+        self.workers.shutdown(wait=True)
+
+    def test_one_worker_per_bus(self):
+        self.assertIs(self.workers.executor(1), self.workers.executor(1))
+        self.assertIsNot(self.workers.executor(1), self.workers.executor(3))
+        self.assertEqual(self.workers.busnums(), [1, 3])
+
+    def test_jobs_on_a_bus_run_in_order(self):
+        order = []
+        futures = [self.workers.submit(1, order.append, n) for n in range(20)]
+        for future in futures:
+            future.result(timeout=5)
+        self.assertEqual(order, list(range(20)))
+
+    def test_slow_bus_does_not_delay_another(self):
+        release = threading.Event()
+        self.workers.submit(1, release.wait, 5)
+        started = time.monotonic()
+        self.workers.submit(3, time.sleep, 0).result(timeout=5)
+        self.assertLess(time.monotonic() - started, 1)
+        release.set()
+
+
+class OverlapDetectingDevice:
+    # records whether two transactions were ever in flight at once
+    def __init__(self, state):
+        self.state = state
+
+    def write8(self, register, value):
+        with self.state['lock']:
+            self.state['active'] += 1
+            self.state['overlapped'] |= self.state['active'] > 1
+        time.sleep(0.0005)
+        with self.state['lock']:
+            self.state['active'] -= 1
+
+
+class OverlapDetectingBus:
+    def __init__(self):
+        self.state = {'lock': threading.Lock(), 'active': 0, 'overlapped': False}
+
+    def get_default_bus(self):
+        return 1
+
+    def get_i2c_device(self, address, busnum=None):
+        return OverlapDetectingDevice(self.state)
+
+
+class TestSharedI2CBus(TestCase):
+
+    def test_transactions_on_a_bus_do_not_overlap(self):
+        backend = OverlapDetectingBus()
+        bus = SharedI2CBus(backend)
+        devices = [bus.get_i2c_device(address) for address in (0x70, 0x71)]
+
+        def hammer(device):
+            for register in range(50):
+                device.write8(register, 0)
+
+        threads = [threading.Thread(target=hammer, args=(device,)) for device in devices]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertFalse(backend.state['overlapped'])
+
+    def test_locks_per_bus(self):
+        bus = SharedI2CBus(EmulatedI2CBus())
+        self.assertIs(bus.bus_lock(1), bus.bus_lock(1))
+        self.assertIsNot(bus.bus_lock(1), bus.bus_lock(3))
+
+    def test_drives_adafruit_display(self):
+        emulated = EmulatedI2CBus()
+        segment = SevenSegment.SevenSegment(address=0x70, i2c=SharedI2CBus(emulated))
+        segment.begin()
+        segment.set_digit(0, 8)
+        segment.write_display()
+        self.assertEqual(segment._device._address, 0x70)
+        self.assertEqual(emulated.devices[(1, 0x70)].display_ram[0], 0x7F)
+
+    def test_survives_backend_reconfiguration(self):
+        try:
+            shared = timetemp3.share_i2c_bus()
+            lock = shared.bus_lock(1)
+            self.assertIs(timetemp3.configure_i2c_backend('emulator'), shared)
+            self.assertIsInstance(shared.backend, EmulatedI2CBus)
+            self.assertIs(shared.bus_lock(1), lock)
+        finally:
+            timetemp3.SHARED_I2C_BUS = None
+            timetemp3.configure_i2c_backend('hardware')
+
+
+class TestDisplayGroup(TestCase):
+
+    def test_rotates_over_shown_sources(self):
+        sources = SourceRegistry(
+            Source(name, 'bmp085', fetch_nothing, 15) for name in ('den', 'outdoor', 'attic')
+        )
+        group = DisplayGroup('den', 3, None, ['den', 'missing', 'outdoor'])
+        self.assertIsNone(group.next_source(sources))
+        sources['den'].updated(68.0)
+        sources['outdoor'].updated(40.0)
+        sources['attic'].updated(80.0)
+        names = [group.next_source(sources).name for _ in range(3)]
+        self.assertEqual(names, ['den', 'outdoor', 'den'])
+        sources['outdoor'].enabled = False
+        self.assertEqual(group.next_source(sources).name, 'den')
+
+
+class TestDeviceGroupSources(TestCase):
+
+    def test_sensor_declarations(self):
+        declarations = device_group_sources(
+            [
+                {'name': 'den', 'busnum': 3, 'display': '0x71', 'sensor': '0x77'},
+                {'name': 'hall', 'busnum': 4, 'display': '0x70'},
+            ]
+        )
+        self.assertEqual(len(declarations), 1)
+        self.assertEqual(declarations[0]['name'], 'den')
+        self.assertEqual(declarations[0]['options'], {'i2c_address': '0x77', 'busnum': 3})
+        self.assertFalse(declarations[0]['logged'])
+        source = Source('den', 'bmp085', fetch_nothing, 15, options=declarations[0]['options'])
+        self.assertEqual(source.busnum, 3)
@@ -0,0 +1,67 @@
+from unittest import TestCase
+
+import numpy
+
+from timetemp3.derived import DERIVED_FIELDS, DerivedMetrics, heat_index
+
+HOUR = 60 * 60
+
+
+class TestHeatIndex(TestCase):
+
+    def test_matches_nws_table(self):
+        # values from the NWS heat index chart
+        self.assertAlmostEqual(heat_index(90, 50), 95, delta=1)
+        self.assertAlmostEqual(heat_index(100, 40), 109, delta=1)
+        self.assertAlmostEqual(heat_index(84, 90), 98, delta=1)
+
+    def test_mild_weather_is_close_to_temperature(self):
+        self.assertAlmostEqual(heat_index(70, 50), 69.05)
+
+    def test_arrays(self):
+        result = heat_index(numpy.array([70.0, 90.0, 100.0]), numpy.array([50.0, 50.0, 40.0]))
+        self.assertEqual(result.shape, (3,))
+        self.assertAlmostEqual(result[1], heat_index(90, 50))
+
+
+class TestDerivedMetrics(TestCase):
+
+    def setUp(self):
+        self.metrics = DerivedMetrics(
+            {'in_tf': 60, 'in_pres': 60, 'out_temp': 300, 'out_pres': 300, 'out_humid': 300},
+            history_seconds=6 * HOUR,
+        )
+
+    def test_empty(self):
+        self.assertEqual(self.metrics.compute(), dict.fromkeys(DERIVED_FIELDS))
+
+    def test_pressure_tendency_over_wrapped_ring(self):
+        # 8 hours of a steady fall of 1 hPa an hour, more than the ring holds
+        for minute in range(8 * 60):
+            self.metrics.observe({'in_pres': 1015 - minute / 60, 'in_tf': 70}, minute * 60)
+        values = self.metrics.compute()
+        self.assertAlmostEqual(values['in_pres_tendency'], -3.0, places=2)
+        self.assertIsNone(values['out_pres_tendency'])
+
+    def test_tendency_needs_enough_history(self):
+        for minute in range(60):
+            self.metrics.observe({'in_pres': 1015.0}, minute * 60)
+        self.assertIsNone(self.metrics.compute()['in_pres_tendency'])
+
+    def test_delta_heat_index_and_extremes(self):
+        self.metrics.observe({'in_tf': 72.0, 'in_pres': 1010.0}, 0)
+        self.metrics.observe({'out_temp': 90.0, 'out_humid': 50, 'out_pres': None}, 10)
+        self.metrics.observe({'in_tf': 68.0}, 60)
+        self.metrics.observe({'in_tf': 70.0}, 120)
+        values = self.metrics.compute()
+        self.assertEqual(values['in_out_delta'], -20.0)
+        self.assertAlmostEqual(values['heat_index'], 95, delta=1)
+        self.assertEqual((values['in_tf_min'], values['in_tf_max']), (68.0, 72.0))
+        self.assertEqual((values['out_temp_min'], values['out_temp_max']), (90.0, 90.0))
+
+    def test_missing_input_field(self):
+        metrics = DerivedMetrics({'in_tf': 60})
+        metrics.observe({'in_tf': 70.0, 'out_temp': 50.0}, 0)
+        values = metrics.compute()
+        self.assertIsNone(values['in_out_delta'])
+        self.assertEqual(values['in_tf_max'], 70.0)
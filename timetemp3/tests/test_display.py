@@ -0,0 +1,54 @@
+from unittest import TestCase, mock
+
+from Adafruit_LED_Backpack import SevenSegment
+
+from timetemp3.display import write_display_changes
+from timetemp3.temperature import display_temperature_digits
+
+
+def make_segment():
+    i2c = mock.Mock()
+    segment = SevenSegment.SevenSegment(address=0x71, i2c=i2c)
+    return segment, i2c.get_i2c_device.return_value
+
+
+class TestWriteDisplayChanges(TestCase):
+
+    def test_first_frame_written_in_full(self):
+        segment, device = make_segment()
+        self.assertEqual(write_display_changes(segment), 16)
+        self.assertEqual(device.write8.call_count, 16)
+
+    def test_unchanged_frame_skips_bus(self):
+        segment, device = make_segment()
+        write_display_changes(segment)
+        device.write8.reset_mock()
+        self.assertEqual(write_display_changes(segment), 0)
+        device.write8.assert_not_called()
+
+    def test_only_changed_bytes_written(self):
+        segment, device = make_segment()
+        write_display_changes(segment)
+        device.write8.reset_mock()
+        segment.set_colon(True)
+        self.assertEqual(write_display_changes(segment), 1)
+        device.write8.assert_called_once_with(4, 0x02)
+
+    def test_failed_write_resends_full_frame(self):
+        segment, device = make_segment()
+        write_display_changes(segment)
+        segment.set_digit(0, 7)
+        device.write8.side_effect = IOError(121, 'Remote I/O error')
+        with self.assertRaises(IOError):
+            write_display_changes(segment)
+        device.write8.side_effect = None
+        device.write8.reset_mock()
+        self.assertEqual(write_display_changes(segment), 16)
+
+    def test_repeated_temperature_frame_written_once(self):
+        segment, device = make_segment()
+        digits = [6, 8, 0x63, 'F', False]
+        display_temperature_digits(digits, sleep_duration=0, display_handle=segment)
+        device.write8.reset_mock()
+        display_temperature_digits(digits, sleep_duration=0, display_handle=segment)
+        device.write8.assert_not_called()
@@ -0,0 +1,88 @@
+from unittest import TestCase
+
+import Adafruit_BMP.BMP085 as BMP085
+from Adafruit_LED_Backpack import SevenSegment
+
+from timetemp3.emulator import EmulatedI2CBus, EmulatedI2CDevice
+
+
+class TestEmulatedI2CDevice(TestCase):
+
+    def test_subclasses_must_implement_registers(self):
+        class ReadOnlyDevice(EmulatedI2CDevice):
+            def _read_register(self, register):
+                return 0
+
+        with self.assertRaises(TypeError):
+            EmulatedI2CDevice(0x40)
+        with self.assertRaises(TypeError):
+            ReadOnlyDevice(0x40)
+
+    def test_register_file(self):
+        class RegisterFile(EmulatedI2CDevice):
+            def __init__(self, address, **options):
+                super().__init__(address, **options)
+                self.registers = bytearray(256)
+
+            def _read_register(self, register):
+                return self.registers[register & 0xFF]
+
+            def _write_register(self, register, value):
+                self.registers[register & 0xFF] = value
+
+        device = RegisterFile(0x40)
+        device.write16(0x10, 0xBEEF)
+        self.assertEqual(device.readU16LE(0x10), 0xBEEF)
+        self.assertEqual(device.readS16BE(0x10), -4162)
+        self.assertEqual((device.reads, device.writes), (2, 1))
+
+
+class TestEmulatedHT16K33(TestCase):
+
+    def test_display_ram_follows_driver(self):
+        bus = EmulatedI2CBus()
+        segment = SevenSegment.SevenSegment(address=0x71, i2c=bus)
+        segment.begin()
+        segment.set_digit(0, 8)
+        segment.set_colon(True)
+        segment.write_display()
+
+        device = bus.devices[(1, 0x71)]
+        self.assertTrue(device.oscillator_on)
+        self.assertTrue(device.display_on)
+        self.assertEqual(device.brightness, 15)
+        self.assertEqual(device.display_ram[0], 0x7F)
+        self.assertEqual(device.display_ram[4], 0x02)
+
+    def test_injected_faults(self):
+        bus = EmulatedI2CBus(fault_rate=1.0)
+        segment = SevenSegment.SevenSegment(address=0x70, i2c=bus)
+        with self.assertRaises(IOError):
+            segment.write_display()
+        self.assertEqual(bus.devices[(1, 0x70)].faults, 1)
+
+    def test_missing_device(self):
+        bus = EmulatedI2CBus()
+        with self.assertRaises(OSError):
+            bus.get_i2c_device(0x42)
+
+
+class TestEmulatedBMP085(TestCase):
+
+    def test_driver_reads_configured_conditions(self):
+        bus = EmulatedI2CBus(temperature_c=23.4, pressure_pa=98765)
+        for mode in (BMP085.BMP085_ULTRALOWPOWER, BMP085.BMP085_HIGHRES):
+            bmp = BMP085.BMP085(mode=mode, i2c=bus)
+            self.assertAlmostEqual(bmp.read_temperature(), 23.4)
+            # low oversampling modes resolve a few Pa at best
+            self.assertAlmostEqual(bmp.read_pressure(), 98765, delta=5)
+
+    def test_slow_conversion_returns_stale_result(self):
+        bus = EmulatedI2CBus(temperature_c=20.0, conversion_time_scale=0.0)
+        bmp = BMP085.BMP085(i2c=bus)
+        self.assertAlmostEqual(bmp.read_temperature(), 20.0)
+
+        device = bus.devices[(1, 0x77)]
+        device.temperature_c = 30.0
+        device.conversion_time_scale = 1000.0
+        self.assertAlmostEqual(bmp.read_temperature(), 20.0)
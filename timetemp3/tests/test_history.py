@@ -0,0 +1,42 @@
+import random
+from unittest import TestCase
+
+from timetemp3.history import RingBuffer
+
+
+class TestRingBuffer(TestCase):
+
+    def test_empty(self):
+        history = RingBuffer(4)
+        self.assertEqual(len(history), 0)
+        self.assertIsNone(history.latest())
+        self.assertIsNone(history.minimum())
+        self.assertIsNone(history.maximum())
+        self.assertIsNone(history.mean())
+
+    def test_wraps_to_newest_readings(self):
+        history = RingBuffer(3)
+        for timestamp, value in enumerate([5.0, 1.0, 9.0, 4.0, 6.0]):
+            history.append(value, timestamp)
+        self.assertEqual(len(history), 3)
+        self.assertEqual(history[0], (2.0, 9.0))
+        self.assertEqual(history[-1], (4.0, 6.0))
+        self.assertEqual(list(history.ordered()[1]), [9.0, 4.0, 6.0])
+        self.assertEqual(list(history.ordered()[0]), [2.0, 3.0, 4.0])
+
+    def test_rolling_statistics_match_window(self):
+        generator = random.Random(1)
+        history = RingBuffer(50)
+        values = []
+        for timestamp in range(500):
+            value = generator.uniform(-20.0, 110.0)
+            values.append(value)
+            history.append(value, timestamp)
+            window = values[-50:]
+            self.assertEqual(history.minimum(), min(window))
+            self.assertEqual(history.maximum(), max(window))
+            self.assertAlmostEqual(history.mean(), sum(window) / len(window))
+
+    def test_capacity_from_interval(self):
+        history = RingBuffer.for_interval(15, history_seconds=24 * 60 * 60)
+        self.assertEqual(history.capacity, 5760)
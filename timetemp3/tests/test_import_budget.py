@@ -0,0 +1,39 @@
+from unittest import TestCase
+
+from weather_subprocess import run_weather_script
+
+# Budgets for importing the weather logger (generous, so they hold on a slow CI
+# runner; a Pi Zero is several times slower than both)
+IMPORT_TIME_BUDGET_SECONDS = 0.5
+MAX_RSS_BUDGET_KIB = 64 * 1024
+
+# Integrations that must not be imported until they are enabled
+LAZY_MODULES = ('pyowm', 'nest', 'phant3', 'requests', 'systemd', 'asyncio', 'http.server', 'numpy')
+
+IMPORT_SCRIPT = '''
+import resource
+import timetemp3.my_weather_logging
+print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+'''
+
+
+def parse_importtime(stderr):
+    # {module: cumulative seconds} from python -X importtime output
+    cumulative = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or '[us]' in line:
+            continue
+        _, total, name = line[len('import time:') :].split('|')
+        cumulative[name.strip()] = int(total) / 1e6
+    return cumulative
+
+
+class TestImportBudget(TestCase):
+
+    def test_weather_logger_import_cost(self):
+        result = run_weather_script(IMPORT_SCRIPT, python_options=('-X', 'importtime'))
+        cumulative = parse_importtime(result.stderr)
+        for module in LAZY_MODULES:
+            self.assertNotIn(module, cumulative, '%s imported at startup' % module)
+        self.assertLess(cumulative['timetemp3.my_weather_logging'], IMPORT_TIME_BUDGET_SECONDS)
+        self.assertLess(int(result.stdout.split()[-1]), MAX_RSS_BUDGET_KIB)
@@ -0,0 +1,84 @@
+import urllib.error
+import urllib.request
+from unittest import TestCase
+
+from timetemp3.metrics import CONTENT_TYPE, MetricsServer, Registry, _Metric
+
+
+class TestMetrics(TestCase):
+
+    def test_counter_and_gauge(self):
+        registry = Registry()
+        errors = registry.counter('errors_total', 'Errors', ('type',))
+        errors.inc(type='Timeout')
+        errors.inc(2, type='Timeout')
+        temperature = registry.gauge('temperature', 'Temperature')
+        temperature.set(70.5)
+
+        self.assertEqual(errors.value(type='Timeout'), 3)
+        self.assertEqual(
+            registry.render(),
+            '# HELP errors_total Errors\n'
+            '# TYPE errors_total counter\n'
+            'errors_total{type="Timeout"} 3\n'
+            '# HELP temperature Temperature\n'
+            '# TYPE temperature gauge\n'
+            'temperature 70.5\n',
+        )
+
+    def test_histogram_buckets_are_cumulative(self):
+        registry = Registry()
+        latency = registry.histogram('latency_seconds', 'Latency', ('source',), buckets=(0.1, 1))
+        for value in (0.05, 0.5, 0.5, 5):
+            latency.observe(value, source='sensor')
+
+        self.assertEqual(latency.count(source='sensor'), 4)
+        lines = registry.render().splitlines()
+        self.assertEqual(
+            lines[2:],
+            [
+                'latency_seconds_bucket{source="sensor",le="0.1"} 1',
+                'latency_seconds_bucket{source="sensor",le="1.0"} 3',
+                'latency_seconds_bucket{source="sensor",le="+Inf"} 4',
+                'latency_seconds_count{source="sensor"} 4',
+                'latency_seconds_sum{source="sensor"} 6.05',
+            ],
+        )
+
+    def test_labels_must_match(self):
+        registry = Registry()
+        errors = registry.counter('errors_total', 'Errors', ('type',))
+        with self.assertRaises(ValueError):
+            errors.inc(source='sensor')
+        with self.assertRaises(ValueError):
+            registry.counter('errors_total', 'Errors again')
+
+    def test_label_values_are_escaped(self):
+        registry = Registry()
+        errors = registry.counter('errors_total', 'Errors', ('type',))
+        errors.inc(type='say "hi"\n')
+        self.assertIn('errors_total{type="say \\"hi\\"\\n"} 1', registry.render())
+
+    def test_server(self):
+        registry = Registry()
+        registry.counter('errors_total', 'Errors').inc()
+        server = MetricsServer(registry, 0, '127.0.0.1')
+        server.start()
+        try:
+            url = 'http://127.0.0.1:%d' % server.port
+            with urllib.request.urlopen(url + '/metrics') as response:
+                self.assertEqual(response.headers['Content-Type'], CONTENT_TYPE)
+                self.assertIn('errors_total 1', response.read().decode('utf-8'))
+            with self.assertRaises(urllib.error.HTTPError):
+                urllib.request.urlopen(url + '/other')
+        finally:
+            server.stop()
+
+    def test_metric_types_must_list_samples(self):
+        class Unfinished(_Metric):
+            metric_type = 'untyped'
+
+        with self.assertRaises(TypeError):
+            _Metric('m', 'doc')
+        with self.assertRaises(TypeError):
+            Unfinished('m', 'doc')
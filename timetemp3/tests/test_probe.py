@@ -0,0 +1,155 @@
+from unittest import TestCase
+
+from weather_subprocess import last_json_line, run_weather_script
+
+# Drives run_probe with fake probes and an exit_sentinel that records each
+# backoff instead of sleeping through it
+PROBE_SCRIPT = '''
+import json
+import types
+
+import requests
+
+from timetemp3 import my_weather_logging as weather
+
+
+class RecordingSentinel:
+    def __init__(self, stop_after=100):
+        self.waits = []
+        self.stop_after = stop_after
+
+    def is_set(self):
+        return len(self.waits) >= self.stop_after
+
+    def wait(self, timeout):
+        self.waits.append(timeout)
+        return self.is_set()
+
+
+def run(outcome, stop_after=100):
+    calls = []
+
+    def probe():
+        calls.append(len(calls))
+        return outcome(len(calls))
+
+    weather.exit_sentinel = RecordingSentinel(stop_after)
+    weather.run_probe("fake", probe)
+    return {"calls": len(calls), "waits": weather.exit_sentinel.waits}
+
+
+def fail_twice(attempt):
+    if attempt <= 2:
+        raise RuntimeError("not yet")
+    return True
+
+
+results = {
+    "always_failing": run(lambda attempt: False, stop_after=10),
+    "exit_while_waiting": run(lambda attempt: False, stop_after=2),
+    "raising_then_ok": run(fail_twice),
+    "not_retryable": run(lambda attempt: None),
+}
+
+weather.configure_sources()
+weather.LOGGING_DATA.update(dict.fromkeys(weather.LOGGING_FIELDS, 1))
+
+# OWM: the first request fails, the second enables the outdoor source
+owm_attempts = []
+
+
+def fetch_owm_data_cached():
+    owm_attempts.append(1)
+    if len(owm_attempts) == 1:
+        raise requests.exceptions.ConnectionError("down")
+    return {"cond": "Clear", "cond_desc": "clear sky", "out_temp": 40.0}
+
+
+weather.requests = requests
+weather.OwmExceptions = types.SimpleNamespace(APIRequestError=type("APIRequestError", (Exception,), {}))
+weather.mgr = object()
+weather.fetch_owm_data_cached = fetch_owm_data_cached
+outdoor = weather.SOURCES.of_kind("owm")[0]
+enabled_before = outdoor.enabled
+weather.exit_sentinel = RecordingSentinel()
+weather.run_probe("OWM API", weather.probe_owm)
+results["owm"] = {
+    "enabled_before": enabled_before,
+    "enabled_after": outdoor.enabled,
+    "owm_api": weather.OWM_API,
+    "waits": weather.exit_sentinel.waits,
+}
+
+
+# phant: rows logged before the server answers are dropped, not queued
+class FakePhant:
+    title = "fake"
+
+    def __init__(self):
+        self.stats_calls = 0
+        self.rows = []
+
+    @property
+    def stats(self):
+        self.stats_calls += 1
+        if self.stats_calls == 1:
+            raise json.decoder.JSONDecodeError("no stats", "", 0)
+        return {}
+
+    def log(self, *values):
+        self.rows.append(values)
+
+
+weather.phant_obj = FakePhant()
+weather.log_data()
+rows_while_pending = len(weather.phant_obj.rows)
+weather.exit_sentinel = RecordingSentinel()
+weather.run_probe("phant", weather.probe_phant)
+online = weather.PHANT_ONLINE.is_set()
+weather.log_data()
+results["phant"] = {
+    "rows_while_pending": rows_while_pending,
+    "online": online,
+    "rows_after": len(weather.phant_obj.rows),
+    "waits": weather.exit_sentinel.waits,
+}
+
+print(json.dumps(results))
+'''
+
+
+class TestRunProbe(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.results = last_json_line(run_weather_script(PROBE_SCRIPT))
+
+    def test_backoff_doubles_up_to_maximum(self):
+        self.assertEqual(
+            self.results['always_failing'],
+            {'calls': 10, 'waits': [5, 10, 20, 40, 80, 160, 300, 300, 300, 300]},
+        )
+
+    def test_exit_while_waiting(self):
+        self.assertEqual(self.results['exit_while_waiting'], {'calls': 2, 'waits': [5, 10]})
+
+    def test_exceptions_are_retried_until_success(self):
+        self.assertEqual(self.results['raising_then_ok'], {'calls': 3, 'waits': [5, 10]})
+
+    def test_none_is_not_retried(self):
+        self.assertEqual(self.results['not_retryable'], {'calls': 1, 'waits': []})
+
+    def test_owm_source_enabled_on_success(self):
+        owm = self.results['owm']
+        self.assertFalse(owm['enabled_before'])
+        self.assertTrue(owm['enabled_after'])
+        self.assertTrue(owm['owm_api'])
+        self.assertEqual(owm['waits'], [5])
+
+    def test_rows_dropped_while_phant_pending(self):
+        phant = self.results['phant']
+        self.assertEqual(phant['rows_while_pending'], 0)
+        self.assertTrue(phant['online'])
+        self.assertEqual(phant['waits'], [5])
+        # only the row assembled after the server answered goes up
+        self.assertEqual(phant['rows_after'], 1)
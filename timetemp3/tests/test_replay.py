@@ -0,0 +1,93 @@
+import json
+import os
+import tempfile
+from threading import Event
+from unittest import TestCase
+
+from timetemp3.clock import VirtualClock
+from timetemp3.replay import Trace, load_traces
+from weather_subprocess import run_python, write_config
+
+START = 1700000000.0
+
+
+def write_trace(path, hours, outdoor_errors=()):
+    with open(path, 'w') as trace_file:
+        for offset in range(0, hours * 3600, 15):
+            record = {'time': START + offset, 'source': 'sensor', 'reading': 68.0}
+            trace_file.write(json.dumps(record) + '\n')
+        for offset in range(0, hours * 3600, 300):
+            record = {'time': START + offset, 'source': 'outdoor', 'reading': 40.0}
+            if offset in outdoor_errors:
+                record = {'time': START + offset, 'source': 'outdoor', 'error': 'ConnectionError'}
+            trace_file.write(json.dumps(record) + '\n')
+
+
+class TestVirtualClock(TestCase):
+
+    def test_wait_advances_time(self):
+        clock = VirtualClock(START)
+        event = Event()
+        self.assertFalse(clock.wait(event, 3.3))
+        self.assertEqual(clock.time(), START + 3.3)
+        self.assertAlmostEqual(clock.monotonic(), 3.3)
+        self.assertFalse(clock.wait(event, -1))
+        self.assertEqual(clock.time(), START + 3.3)
+
+    def test_wait_sets_event_at_end(self):
+        clock = VirtualClock(START, until=START + 10)
+        event = Event()
+        self.assertFalse(clock.wait(event, 6))
+        self.assertTrue(clock.wait(event, 6))
+        self.assertEqual(clock.time(), START + 10)
+        self.assertTrue(event.is_set())
+
+
+class TestTrace(TestCase):
+
+    def test_at(self):
+        trace = Trace([{'time': 20, 'reading': 2}, {'time': 10, 'reading': 1}])
+        self.assertIsNone(trace.at(9))
+        self.assertEqual(trace.at(10)['reading'], 1)
+        self.assertEqual(trace.at(19.9)['reading'], 1)
+        self.assertEqual(trace.at(100)['reading'], 2)
+
+    def test_load_traces(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'trace.jsonl')
+            write_trace(path, 1)
+            traces = load_traces(path)
+        self.assertEqual(len(traces['sensor']), 240)
+        self.assertEqual(len(traces['outdoor']), 12)
+
+
+class TestReplay(TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.config_path = write_config(self.tmpdir.name)
+        self.trace_path = os.path.join(self.tmpdir.name, 'trace.jsonl')
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def replay(self, hours):
+        arguments = ['-m', 'timetemp3.replay', self.config_path, 'phant.json']
+        result = run_python(arguments + [self.trace_path, str(hours)], self.tmpdir.name, timeout=120)
+        return result.stdout
+
+    def test_schedule_over_six_hours(self):
+        write_trace(self.trace_path, 6)
+        summary = self.replay(6)
+        self.assertIn('Replayed 6.0 hours', summary)
+        # one row every 5 minutes, one sensor sample every 15 seconds
+        self.assertIn('Uploads: 72', summary)
+        self.assertIn('Updates of sensor: 1440', summary)
+
+    def test_failing_api_opens_circuit(self):
+        write_trace(self.trace_path, 2, outdoor_errors=range(1800, 7200, 300))
+        summary = self.replay(2)
+        # three failures open the circuit; later tries wait out the backoff
+        errors = int(summary.split('Errors outdoor: ConnectionError: ')[1].split()[0])
+        self.assertLess(errors, 18)
+        self.assertGreaterEqual(errors, 3)
@@ -0,0 +1,147 @@
+import os
+import tempfile
+import threading
+from unittest import TestCase
+
+from timetemp3.response_cache import ResponseCache
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class CountingFetch:
+    def __init__(self, value='fresh'):
+        self.value = value
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return self.value
+
+
+class TestResponseCache(TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, 'cache.json')
+        self.clock = FakeClock()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def make_cache(self):
+        return ResponseCache(self.path, ttl_seconds=300, stale_seconds=3600, clock=self.clock)
+
+    def test_fresh_entry_is_reused_across_restarts(self):
+        fetch = CountingFetch({'out_temp': 41.5})
+        self.assertEqual(self.make_cache().get('owm', fetch), {'out_temp': 41.5})
+        self.clock.now += 299
+        cache = self.make_cache()
+        self.assertEqual(cache.peek('owm'), ({'out_temp': 41.5}, 1000.0))
+        self.assertEqual(cache.get('owm', fetch), {'out_temp': 41.5})
+        self.assertEqual(fetch.calls, 1)
+
+    def test_stale_entry_served_while_refreshing(self):
+        cache = self.make_cache()
+        cache.get('owm', CountingFetch('old'))
+        self.clock.now += 600
+
+        release = threading.Event()
+        refreshed = threading.Event()
+
+        def slow_fetch():
+            release.wait(5)
+            refreshed.set()
+            return 'new'
+
+        self.assertEqual(cache.get('owm', slow_fetch), 'old')
+        release.set()
+        self.assertTrue(refreshed.wait(5))
+        for _ in range(100):
+            if cache.peek('owm')[0] == 'new':
+                break
+            threading.Event().wait(0.01)
+        self.assertEqual(cache.get('owm', CountingFetch()), 'new')
+
+    def test_expired_entry_waits_on_fetch(self):
+        cache = self.make_cache()
+        cache.get('owm', CountingFetch('old'))
+        self.clock.now += 300 + 3600
+        self.assertIsNone(cache.peek('owm'))
+        self.assertEqual(cache.get('owm', CountingFetch('new')), 'new')
+
+    def test_concurrent_refreshes_share_one_request(self):
+        cache = self.make_cache()
+        started = threading.Event()
+        release = threading.Event()
+        calls = []
+
+        def slow_fetch():
+            calls.append(1)
+            started.set()
+            release.wait(5)
+            return 'value'
+
+        results = []
+        first = threading.Thread(target=lambda: results.append(cache.get('owm', slow_fetch)))
+        first.start()
+        self.assertTrue(started.wait(5))
+        second = threading.Thread(target=lambda: results.append(cache.get('owm', slow_fetch)))
+        second.start()
+        release.set()
+        first.join(5)
+        second.join(5)
+        self.assertEqual(results, ['value', 'value'])
+        self.assertEqual(len(calls), 1)
+
+    def test_failed_fetch_keeps_cached_value(self):
+        cache = self.make_cache()
+        cache.get('owm', CountingFetch('old'))
+        self.clock.now += 300 + 3600
+
+        def failing_fetch():
+            raise ConnectionError('down')
+
+        with self.assertRaises(ConnectionError):
+            cache.get('owm', failing_fetch)
+        self.clock.now -= 3600
+        self.assertEqual(cache.peek('owm')[0], 'old')
+
+    def test_failed_background_refresh_is_reported(self):
+        cache = self.make_cache()
+        cache.get('owm', CountingFetch('old'))
+        self.clock.now += 600
+        errors = []
+        reported = threading.Event()
+
+        def on_refresh_error(error):
+            errors.append(error)
+            reported.set()
+
+        def failing_fetch():
+            raise ConnectionError('down')
+
+        self.assertEqual(cache.get('owm', failing_fetch, on_refresh_error), 'old')
+        self.assertTrue(reported.wait(5))
+        self.assertIsInstance(errors[0], ConnectionError)
+
+    def test_refresh_fetches_even_when_fresh(self):
+        # scheduled updates refresh every cycle, however long the TTL
+        cache = self.make_cache()
+        fetch = CountingFetch()
+        for cycle in range(4):
+            self.clock.now = 1000.0 + 300 * cycle
+            cache.refresh('owm', fetch)
+            self.clock.now += 2
+        self.assertEqual(fetch.calls, 4)
+        self.assertEqual(cache.peek('owm'), ('fresh', 1900.0))
+
+    def test_damaged_file_starts_empty(self):
+        with open(self.path, 'w') as cache_file:
+            cache_file.write('{not json')
+        self.assertIsNone(self.make_cache().peek('owm'))
@@ -0,0 +1,77 @@
+from unittest import TestCase
+
+from weather_subprocess import last_json_line, run_weather_script
+
+# Runs the asyncio runtime for a moment, on a clock far from wall time so
+# any deadline taken from time.time() instead of CLOCK shows up
+ASYNCIO_SCRIPT = '''
+import asyncio
+import json
+import os
+import signal
+import threading
+import time
+
+from timetemp3 import my_weather_logging as weather
+
+
+class OffsetClock(weather.SystemClock):
+    def time(self):
+        return time.time() + 1e6
+
+
+uploads = []
+frame_threads = set()
+display = weather.display_location_temperature
+
+
+def display_location_temperature(location, display_handle=None):
+    frame_threads.add(threading.current_thread().name)
+    display(location, display_handle)
+
+
+# main() imports asyncio into the module only for this runtime
+weather.asyncio = asyncio
+weather.CLOCK = OffsetClock()
+weather.ALTERNATE_TEMPERATURE_DISPLAY_SECONDS = 0.1
+weather.LOGGING_PERIOD_SECONDS = 0.3
+# how soon the uploader looks again while readings are missing
+weather.SENSOR_MEASUREMENT_INTERVAL = 0.1
+# no outdoor source; its fields go up empty
+weather.LOGGING_DATA.update(dict.fromkeys(weather.LOGGING_FIELDS))
+weather.DISPLAY_SLEEP_DURATION = 0
+weather.display_location_temperature = display_location_temperature
+weather.upload_row = lambda row: uploads.append(row) or True
+weather.start_remote_probes = lambda: None
+weather.PHANT_ONLINE.set()
+weather.configure_sources()
+
+threading.Timer(1.5, os.kill, (os.getpid(), signal.SIGINT)).start()
+asyncio.run(weather.run_asyncio_main_loop(weather.CLOCK.time()))
+print(json.dumps({
+    "uploads": len(uploads),
+    "updates": weather.UPDATE_SECONDS.count(source="sensor"),
+    "frames": weather.DISPLAY_LATENESS_SECONDS.count(),
+    "frame_threads": sorted(frame_threads),
+}))
+'''
+
+
+class TestAsyncioRuntime(TestCase):
+
+    def test_tasks_run_on_their_periods(self):
+        summary = last_json_line(
+            run_weather_script(
+                ASYNCIO_SCRIPT,
+                sources=[{'name': 'sensor', 'kind': 'bmp085', 'interval': 0.2}],
+                runtime='asyncio',
+            )
+        )
+
+        # about 5 uploads, 7 sensor updates and 15 frames in 1.5 s
+        self.assertGreaterEqual(summary['uploads'], 3)
+        self.assertGreaterEqual(summary['updates'], 4)
+        self.assertGreaterEqual(summary['frames'], 8)
+        # frames are written from the display worker, not the event loop
+        self.assertEqual(len(summary['frame_threads']), 1)
+        self.assertTrue(summary['frame_threads'][0].startswith('display'))
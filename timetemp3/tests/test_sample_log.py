@@ -0,0 +1,123 @@
+import os
+import tempfile
+from unittest import TestCase
+
+from timetemp3.sample_log import (
+    SampleLog,
+    iter_records,
+    list_segments,
+    read_segment,
+    read_segments,
+    read_strings,
+)
+
+FIELDS = ('cond', 'dt', 'in_tf', 'weather_icon_name')
+
+# 2020-01-01T23:59:50Z and ten seconds later
+LAST_SECONDS_OF_DAY = 1577923190.0
+FIRST_SECOND_OF_DAY = 1577923200.0
+
+
+class TestSampleLog(TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.directory = self.tmpdir.name
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_segments_split_by_day(self):
+        log = SampleLog(self.directory, FIELDS)
+        log.append({'cond': 'Clear', 'dt': 1, 'in_tf': 70.5}, LAST_SECONDS_OF_DAY)
+        log.append({'cond': 'Rain', 'dt': 2, 'in_tf': 70.0}, FIRST_SECOND_OF_DAY)
+        log.close()
+
+        segments = list_segments(self.directory)
+        self.assertEqual(
+            [os.path.basename(path) for path in segments],
+            ['2020-01-01.samples', '2020-01-02.samples'],
+        )
+        self.assertEqual(list_segments(self.directory, start_date='2020-01-02'), segments[1:])
+
+    def test_records_round_trip(self):
+        log = SampleLog(self.directory, FIELDS)
+        log.append({'cond': 'Clear', 'dt': 1, 'in_tf': 70.5, 'weather_icon_name': '01d'}, LAST_SECONDS_OF_DAY)
+        log.append({'cond': 'Clear', 'dt': 2, 'in_tf': 71.0}, LAST_SECONDS_OF_DAY + 1)
+        log.close()
+
+        records = list(iter_records(list_segments(self.directory)[0]))
+        self.assertEqual(
+            records,
+            [
+                {'logged_at': LAST_SECONDS_OF_DAY, 'cond': 'Clear', 'dt': 1.0, 'in_tf': 70.5, 'weather_icon_name': '01d'},
+                {'logged_at': LAST_SECONDS_OF_DAY + 1, 'cond': 'Clear', 'dt': 2.0, 'in_tf': 71.0, 'weather_icon_name': None},
+            ],
+        )
+
+    def test_numpy_reader(self):
+        log = SampleLog(self.directory, FIELDS)
+        for second in range(5):
+            log.append({'cond': 'Clear', 'dt': second, 'in_tf': 60.0 + second}, LAST_SECONDS_OF_DAY + second)
+        log.close()
+
+        samples = read_segment(list_segments(self.directory)[0])
+        self.assertEqual(len(samples), 5)
+        self.assertEqual(list(samples['in_tf']), [60.0, 61.0, 62.0, 63.0, 64.0])
+        self.assertEqual(set(samples['cond']), {0})
+        self.assertEqual(len(read_segments(self.directory, end_date='2019-12-31')), 0)
+
+    def test_reopen_drops_torn_record_and_keeps_dictionary(self):
+        log = SampleLog(self.directory, FIELDS)
+        log.append({'cond': 'Clear', 'in_tf': 70.0}, LAST_SECONDS_OF_DAY)
+        log.close()
+        segment = list_segments(self.directory)[0]
+        with open(segment, 'ab') as segment_file:
+            segment_file.write(b'\x00\x01\x02')
+
+        log = SampleLog(self.directory, FIELDS)
+        log.append({'cond': 'Snow', 'in_tf': 30.0}, LAST_SECONDS_OF_DAY + 1)
+        log.append({'cond': 'Clear', 'in_tf': 31.0}, LAST_SECONDS_OF_DAY + 2)
+        log.close()
+
+        self.assertEqual(
+            [(record['cond'], record['in_tf']) for record in iter_records(segment)],
+            [('Clear', 70.0), ('Snow', 30.0), ('Clear', 31.0)],
+        )
+
+    def test_changed_fields_roll_over_to_new_segment(self):
+        log = SampleLog(self.directory, FIELDS)
+        log.append({'in_tf': 70.0}, LAST_SECONDS_OF_DAY)
+        log.close()
+
+        log = SampleLog(self.directory, ('in_tf',))
+        log.append({'in_tf': 71.0}, LAST_SECONDS_OF_DAY + 1)
+        log.close()
+        log = SampleLog(self.directory, ('in_tf',))
+        log.append({'in_tf': 72.0}, LAST_SECONDS_OF_DAY + 2)
+        log.close()
+
+        segments = list_segments(self.directory, start_date='2020-01-01', end_date='2020-01-01')
+        self.assertEqual(
+            [os.path.basename(path) for path in segments],
+            ['2020-01-01.samples', '2020-01-01.1.samples'],
+        )
+        self.assertEqual([record['in_tf'] for record in iter_records(segments[1])], [71.0, 72.0])
+
+    def test_reopen_drops_torn_string(self):
+        log = SampleLog(self.directory, FIELDS)
+        log.append({'cond': 'Clear'}, LAST_SECONDS_OF_DAY)
+        log.close()
+        strings_path = list_segments(self.directory)[0].replace('.samples', '.strings')
+        with open(strings_path, 'a', encoding='utf-8') as strings_file:
+            strings_file.write('"Ra')
+
+        log = SampleLog(self.directory, FIELDS)
+        log.append({'cond': 'Snow'}, LAST_SECONDS_OF_DAY + 1)
+        log.close()
+
+        self.assertEqual(read_strings(strings_path), ['Clear', 'Snow'])
+        self.assertEqual(
+            [record['cond'] for record in iter_records(list_segments(self.directory)[0])],
+            ['Clear', 'Snow'],
+        )
@@ -0,0 +1,87 @@
+from threading import Event
+from unittest import TestCase
+
+from timetemp3.clock import VirtualClock
+from timetemp3.scheduler import DeadlineScheduler
+
+
+class TestDeadlineScheduler(TestCase):
+
+    def setUp(self):
+        self.clock = VirtualClock(0.0, until=60.0)
+        self.runs = []
+        self.reports = []
+        self.scheduler = DeadlineScheduler(
+            self.clock, on_run=lambda job, lateness, missed: self.reports.append((job.name, missed))
+        )
+
+    def recorder(self, name, delay=None):
+        def run():
+            self.runs.append((name, self.clock.time()))
+            return delay
+
+        return run
+
+    def test_jobs_run_on_their_own_periods(self):
+        self.scheduler.add('sensor', 15, self.recorder('sensor'))
+        self.scheduler.add('display', 3.3, self.recorder('display'), deadline=3.3)
+        self.scheduler.run(Event())
+        sensor_times = [time for name, time in self.runs if name == 'sensor']
+        self.assertEqual(sensor_times, [0.0, 15.0, 30.0, 45.0])
+        display_times = [time for name, time in self.runs if name == 'display']
+        self.assertEqual(len(display_times), 18)
+        self.assertAlmostEqual(display_times[-1], 3.3 * 18)
+
+    def test_sleeps_until_earliest_deadline(self):
+        self.scheduler.add('upload', 300, self.recorder('upload'), deadline=50)
+        self.scheduler.run(Event())
+        # one wake up, straight to the deadline
+        self.assertEqual(self.runs, [('upload', 50)])
+
+    def test_equal_deadlines_run_in_order_added(self):
+        self.scheduler.add('update', 10, self.recorder('update'))
+        self.scheduler.add('display', 10, self.recorder('display'))
+        self.scheduler.run_due()
+        self.assertEqual([name for name, _ in self.runs], ['update', 'display'])
+
+    def test_returned_delay_reschedules(self):
+        self.scheduler.add('upload', 300, self.recorder('upload', delay=20))
+        self.scheduler.run(Event())
+        self.assertEqual([time for _, time in self.runs], [0, 20, 40])
+
+    def test_overrun_skips_missed_periods(self):
+        def slow():
+            self.clock.advance(25)
+
+        job = self.scheduler.add('slow', 10, slow)
+        self.scheduler.run_due()
+        self.assertEqual(job.overruns, 1)
+        self.assertEqual(job.missed_periods, 2)
+        self.assertEqual(job.deadline, 30)
+        self.assertEqual(self.reports, [('slow', 2)])
+
+    def test_lateness_is_recorded(self):
+        job = self.scheduler.add('late', 10, lambda: None, deadline=0)
+        self.clock.advance(2)
+        self.scheduler.run_due()
+        self.assertEqual(job.max_lateness, 2)
+        self.assertEqual(job.deadline, 10)
+
+    def test_failing_job_is_rescheduled(self):
+        def fail():
+            self.runs.append(('fail', self.clock.time()))
+            raise TimeoutError('read timed out')
+
+        self.scheduler.add('fail', 20, fail)
+        self.scheduler.add('display', 15, self.recorder('display'))
+        with self.assertLogs('weather_logger', 'ERROR'):
+            self.scheduler.run(Event())
+        self.assertEqual([time for name, time in self.runs if name == 'fail'], [0, 20, 40])
+        self.assertEqual([time for name, time in self.runs if name == 'display'], [0, 15, 30, 45])
+        self.assertEqual(self.scheduler['fail'].failures, 3)
+        self.assertEqual(self.reports.count(('fail', 0)), 3)
+
+    def test_duplicate_name(self):
+        self.scheduler.add('sensor', 15, lambda: None)
+        with self.assertRaises(ValueError):
+            self.scheduler.add('sensor', 15, lambda: None)
@@ -0,0 +1,34 @@
+from unittest import TestCase
+
+import Adafruit_BMP.BMP085 as BMP085
+
+from timetemp3 import sensor
+from timetemp3.emulator import EmulatedI2CBus, BMP085_DATASHEET_CALIBRATION
+
+
+class TestBmpSample(TestCase):
+
+    def test_datasheet_example(self):
+        # section 3.5 of the datasheet: UT=27898, UP=23843 (oss 0)
+        tenths, b5 = sensor.compensate_temperature(27898, BMP085_DATASHEET_CALIBRATION)
+        self.assertEqual(tenths, 150)
+        pressure = sensor.compensate_pressure(23843, b5, BMP085_DATASHEET_CALIBRATION, 0)
+        self.assertEqual(pressure, 69964)
+
+    def test_sample_matches_adafruit_driver(self):
+        bus = EmulatedI2CBus(temperature_c=22.3, pressure_pa=100123, conversion_time_scale=0)
+        bmp = BMP085.BMP085(mode=BMP085.BMP085_HIGHRES, i2c=bus)
+        sample = sensor.read_bmp_sample(bmp)
+
+        self.assertEqual(sample.temperature_c, bmp.read_temperature())
+        self.assertEqual(sample.pressure_pa, bmp.read_pressure())
+        self.assertAlmostEqual(sample.altitude_m, bmp.read_altitude())
+        self.assertAlmostEqual(sample.temperature_f, 22.3 * 9.0 / 5.0 + 32.0)
+        self.assertAlmostEqual(sample.pressure_hpa, 1001.23)
+
+    def test_single_conversion_of_each(self):
+        bus = EmulatedI2CBus(conversion_time_scale=0)
+        bmp = BMP085.BMP085(i2c=bus)
+        device = bus.devices[(1, 0x77)]
+        sensor.read_bmp_sample(bmp)
+        self.assertEqual(device.conversions, 2)
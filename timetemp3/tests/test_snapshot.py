@@ -0,0 +1,42 @@
+from unittest import TestCase
+
+from timetemp3.snapshot import SnapshotBoard, make_snapshot
+
+
+class TestSnapshot(TestCase):
+
+    def test_fields_are_a_frozen_copy(self):
+        fields = {'in_tf': 70.0}
+        snapshot = make_snapshot('sensor', 70.0, fields, 100.0)
+        fields['in_tf'] = 71.0
+        self.assertEqual(snapshot.fields['in_tf'], 70.0)
+        with self.assertRaises(TypeError):
+            snapshot.fields['in_tf'] = 72.0
+        with self.assertRaises(AttributeError):
+            snapshot.reading = 72.0
+
+    def test_defaults(self):
+        snapshot = make_snapshot('nest', 68.0)
+        self.assertEqual(dict(snapshot.fields), {})
+        self.assertIsInstance(snapshot.timestamp, float)
+
+
+class TestSnapshotBoard(TestCase):
+
+    def test_latest_replaces_previous(self):
+        board = SnapshotBoard()
+        self.assertIsNone(board.latest('sensor'))
+        board.publish(make_snapshot('sensor', 70.0, timestamp=1.0))
+        board.publish(make_snapshot('sensor', 71.0, timestamp=2.0))
+        self.assertEqual(board.latest('sensor').reading, 71.0)
+        self.assertIsNone(board.latest('outdoor'))
+
+    def test_merged_fields(self):
+        board = SnapshotBoard()
+        board.publish(make_snapshot('sensor', 70.0, {'in_tf': 70.0, 'dt': 1}))
+        board.publish(make_snapshot('outdoor', 40.0, {'out_temp': 40.0, 'dt': 2}))
+        board.publish(make_snapshot('nest', 68.0))
+        # a newer sensor snapshot replaces its fields, not the others'
+        board.publish(make_snapshot('sensor', 71.0, {'in_tf': 71.0, 'dt': 3}))
+        # on a shared field, locations published first give way to later ones
+        self.assertEqual(board.merged_fields(), {'in_tf': 71.0, 'dt': 2, 'out_temp': 40.0})
@@ -0,0 +1,108 @@
+from unittest import TestCase
+
+from timetemp3.sources import Source, SourceRegistry, build_sources
+
+
+def fetch_nothing(source):
+    pass
+
+
+KINDS = {
+    'bmp085': {'fetch': fetch_nothing, 'interval': 15, 'glyph': 'tickmark', 'logged': True},
+    'owm': {'fetch': fetch_nothing, 'interval': 300, 'glyph': 'outdoor_degrees', 'remote': True},
+}
+
+
+class TestSource(TestCase):
+
+    def test_slots(self):
+        source = Source('sensor', 'bmp085', fetch_nothing, 15)
+        with self.assertRaises(AttributeError):
+            source.unknown = 1
+
+    def test_is_due(self):
+        source = Source('sensor', 'bmp085', fetch_nothing, 15)
+        self.assertTrue(source.is_due(start_time=0, now=0))
+        source.updated(70.0, timestamp=1)
+        self.assertFalse(source.is_due(start_time=0, now=15))
+        self.assertTrue(source.is_due(start_time=0, now=15.1))
+        source.enabled = False
+        self.assertFalse(source.is_due(start_time=0, now=100))
+
+    def test_updated_records_history(self):
+        source = Source('sensor', 'bmp085', fetch_nothing, 15, history_seconds=30)
+        for timestamp, reading in enumerate((70.0, 71.0, 72.0)):
+            source.updated(reading, timestamp)
+        self.assertEqual(source.reading, 72.0)
+        self.assertEqual(source.last_update, 2)
+        self.assertEqual(source.cycle_number, 2)
+        self.assertEqual(len(source.history), 2)
+        self.assertEqual(source.history.minimum(), 71.0)
+
+
+class TestSourceRegistry(TestCase):
+
+    def test_lookup_and_order(self):
+        registry = SourceRegistry(
+            [Source('sensor', 'bmp085', fetch_nothing, 15), Source('outdoor', 'owm', fetch_nothing, 300)]
+        )
+        self.assertEqual(registry.names(), ['sensor', 'outdoor'])
+        self.assertIs(registry['outdoor'], registry.at(1))
+        self.assertIn('sensor', registry)
+        self.assertEqual([source.name for source in registry.of_kind('owm')], ['outdoor'])
+        with self.assertRaises(ValueError):
+            registry.register(Source('sensor', 'bmp085', fetch_nothing, 15))
+
+    def test_next_displayable(self):
+        registry = SourceRegistry(
+            Source(name, 'bmp085', fetch_nothing, 15) for name in ('a', 'b', 'c')
+        )
+        self.assertEqual(registry.next_displayable(-1), (-1, None))
+        registry['a'].updated(1.0)
+        registry['c'].updated(3.0)
+        registry['c'].enabled = False
+        index, source = registry.next_displayable(-1)
+        self.assertEqual((index, source.name), (0, 'a'))
+        registry['c'].enabled = True
+        index, source = registry.next_displayable(index)
+        self.assertEqual((index, source.name), (2, 'c'))
+        index, source = registry.next_displayable(index)
+        self.assertEqual((index, source.name), (0, 'a'))
+
+
+class TestBuildSources(TestCase):
+
+    def test_defaults_and_overrides(self):
+        registry = build_sources(
+            [
+                {'name': 'sensor', 'kind': 'bmp085'},
+                {'name': 'attic', 'kind': 'bmp085', 'interval': 60, 'logged': False},
+                {'name': 'outdoor', 'kind': 'owm'},
+                {'name': 'nest', 'kind': 'owm', 'enabled': False},
+            ],
+            KINDS,
+        )
+        self.assertEqual(registry.names(), ['sensor', 'attic', 'outdoor'])
+        self.assertEqual(registry['sensor'].interval, 15)
+        self.assertTrue(registry['sensor'].logged)
+        self.assertEqual(registry['attic'].interval, 60)
+        self.assertFalse(registry['attic'].logged)
+        # remote sources wait for their probe
+        self.assertFalse(registry['outdoor'].enabled)
+        self.assertEqual(registry['outdoor'].glyph, 'outdoor_degrees')
+
+    def test_unknown_kind(self):
+        with self.assertRaises(ValueError):
+            build_sources([{'name': 'x', 'kind': 'thermocouple'}], KINDS)
+
+    def test_one_logged_source_per_kind(self):
+        with self.assertRaises(ValueError):
+            build_sources(
+                [{'name': 'sensor', 'kind': 'bmp085'}, {'name': 'attic', 'kind': 'bmp085'}], KINDS
+            )
+
+    def test_make_device(self):
+        kinds = dict(KINDS)
+        kinds['bmp085'] = dict(KINDS['bmp085'], make_device=lambda options: options['address'])
+        registry = build_sources([{'kind': 'bmp085', 'options': {'address': 0x76}}], kinds)
+        self.assertEqual(registry['bmp085'].device, 0x76)
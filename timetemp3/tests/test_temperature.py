@@ -86,4 +86,41 @@ class TestTemperatureDigits(TestCase):
 
     def test_invalid_input_None(self):
         digits = temperature.get_temperature_digits_in_fahrenheit(None, 'outdoor')
-        self.assertEqual(digits, [None] * 5)
\ No newline at end of file
+        self.assertEqual(digits, [None] * 5)
+
+
+class TestTemperatureDigitTable(TestCase):
+
+    def test_table_matches_computed_digits(self):
+        for where in ('sensor', 'outdoor', 'nest'):
+            where_raw_value = temperature._lookup_where_temperature_digit(where)
+            for hundredths in range(-10000, 20000):
+                value = hundredths / 100.0
+                expected = temperature._compute_temperature_digits_in_fahrenheit(
+                    value, where_raw_value
+                )
+                digits = temperature.get_temperature_digits_in_fahrenheit(value, where)
+                self.assertEqual(digits, expected, value)
+
+    def test_raw_digits_in_range(self):
+        raw_digits = temperature.get_temperature_raw_digits_in_fahrenheit(68.0, 'nest')
+        # '6' '8' '°' 'F'
+        self.assertEqual(raw_digits, (0x7D, 0x7F, DEGREES_SYMBOL_ENCODING, 0x71, False))
+
+    def test_raw_digits_three_digit(self):
+        raw_digits = temperature.get_temperature_raw_digits_in_fahrenheit(101.0, 'outdoor')
+        # '1' '0' '1' 'F'
+        self.assertEqual(raw_digits, (0x06, 0x3F, 0x06, 0x71, False))
+
+    def test_raw_digits_single_digit(self):
+        raw_digits = temperature.get_temperature_raw_digits_in_fahrenheit(-0.1, 'sensor')
+        # ' ' '0' tick 'F'
+        self.assertEqual(raw_digits, (0x00, 0x3F, TICKMARK_SYMBOL_ENCODING, 0x71, False))
+
+    def test_raw_digits_out_of_range(self):
+        raw_digits = temperature.get_temperature_raw_digits_in_fahrenheit(-100.0, 'outdoor')
+        self.assertEqual(raw_digits, (0x79, 0x79, 0x79, 0x79, True))
+
+    def test_raw_digits_invalid_input_None(self):
+        raw_digits = temperature.get_temperature_raw_digits_in_fahrenheit(None, 'outdoor')
+        self.assertEqual(raw_digits, temperature.BLANK_RAW_DIGITS)
@@ -0,0 +1,21 @@
+import datetime
+from unittest import TestCase
+
+from timetemp3 import time as clock_time
+from timetemp3.constants import DIGIT_COLON
+
+
+class TestClockRendering(TestCase):
+
+    def test_sleep_reaches_next_second(self):
+        now = datetime.datetime(2022, 1, 1, 12, 30, 15, 250000)
+        delay = clock_time.seconds_until_next_second(now)
+        woken = now + datetime.timedelta(seconds=delay)
+        self.assertEqual(woken.second, 16)
+        self.assertLess(woken.microsecond, 10000)
+
+    def test_digits_only_change_with_colon_within_minute(self):
+        first = clock_time.get_time_digits(datetime.datetime(2022, 1, 1, 12, 30, 15))
+        second = clock_time.get_time_digits(datetime.datetime(2022, 1, 1, 12, 30, 16))
+        self.assertEqual(first[:DIGIT_COLON], second[:DIGIT_COLON])
+        self.assertNotEqual(first[DIGIT_COLON], second[DIGIT_COLON])
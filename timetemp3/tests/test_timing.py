@@ -0,0 +1,110 @@
+import random
+from unittest import TestCase
+
+from timetemp3.timing import LatencySketch, Timings, format_summary
+from weather_subprocess import last_json_line, run_weather_script
+
+# Starts timing only after the sources are built, then updates the sensor
+# and shows a frame
+WEATHER_SCRIPT = '''
+import json
+
+from timetemp3 import my_weather_logging as weather
+
+weather.DISPLAY_SLEEP_DURATION = 0
+weather.configure_sources()
+weather.start_timing()
+weather.update_location("sensor")
+weather.update_location("sensor")
+weather.display_location_temperature("sensor")
+weather.TIMING_REPORTER.stop()
+summary = weather.TIMINGS.summary()
+print(json.dumps({name: stats["count"] for name, stats in summary.items() if stats["count"]}))
+'''
+
+
+class TestLatencySketch(TestCase):
+
+    def test_quantiles_within_relative_accuracy(self):
+        rng = random.Random(1)
+        values = sorted(rng.lognormvariate(-5, 1.5) for _ in range(10000))
+        sketch = LatencySketch(relative_accuracy=0.02)
+        for value in values:
+            sketch.add(value)
+
+        for q in (0.5, 0.95, 0.99):
+            expected = values[int(q * (len(values) - 1))]
+            self.assertAlmostEqual(sketch.quantile(q), expected, delta=0.021 * expected)
+        self.assertEqual(sketch.max, values[-1])
+        self.assertEqual(sketch.count, len(values))
+
+    def test_memory_is_fixed(self):
+        sketch = LatencySketch()
+        buckets = len(sketch.buckets)
+        for value in (0, 1e-9, 0.5, 1e6):
+            sketch.add(value)
+        self.assertEqual(len(sketch.buckets), buckets)
+        self.assertEqual(sketch.quantile(1.0), 1e6)
+        self.assertEqual(sketch.quantile(0.0), sketch.min_seconds)
+
+    def test_empty_and_clear(self):
+        sketch = LatencySketch()
+        self.assertIsNone(sketch.quantile(0.5))
+        sketch.add(0.1)
+        sketch.clear()
+        self.assertEqual(sketch.count, 0)
+        self.assertIsNone(sketch.quantile(0.5))
+
+
+class TestTimings(TestCase):
+
+    def test_wrap_records_calls_and_exceptions(self):
+        timings = Timings()
+
+        def fail():
+            raise IOError('bus error')
+
+        add = timings.wrap('add', lambda a, b: a + b)
+        fail = timings.wrap('fail', fail)
+        self.assertEqual(add(1, 2), 3)
+        with self.assertRaises(IOError):
+            fail()
+
+        summary = timings.summary(reset=True)
+        self.assertEqual(summary['add']['count'], 1)
+        self.assertEqual(summary['fail']['count'], 1)
+        self.assertEqual(timings.summary()['add']['count'], 0)
+
+    def test_wrapped_functions_timed_once_enabled(self):
+        timings = Timings(enabled=False)
+
+        @timings.timed
+        def add(a, b):
+            return a + b
+
+        self.assertEqual(add(1, 2), 3)
+        self.assertEqual(timings.summary()['add']['count'], 0)
+        timings.enabled = True
+        add(1, 2)
+        self.assertEqual(timings.summary()['add']['count'], 1)
+        self.assertEqual(add.__name__, 'add')
+
+    def test_format_summary(self):
+        timings = Timings()
+        timings.record('log_data', 0.25)
+        timings.sketch('idle')
+        lines = format_summary(timings.summary())
+        self.assertEqual(len(lines), 1)
+        self.assertTrue(lines[0].startswith('log_data: n=1 p50='))
+        self.assertTrue(lines[0].endswith('max=250.00ms'))
+
+
+class TestWeatherLoggerTiming(TestCase):
+
+    def test_fetchers_timed_whenever_timing_starts(self):
+        counts = last_json_line(
+            run_weather_script(WEATHER_SCRIPT, timing={'summary_minutes': 60})
+        )
+        self.assertEqual(
+            counts, {'display_location_temperature': 1, 'update_location_sensor': 2}
+        )
@@ -0,0 +1,134 @@
+import json
+import os
+import tempfile
+import threading
+from unittest import TestCase
+
+from timetemp3.upload_queue import QueueDrainer, RowRejected, UploadQueue
+
+FIELDS = ('dt', 'in_tf', 'cond')
+
+
+class TestUploadQueue(TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, 'queue.jsonl')
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_rows_replayed_in_order(self):
+        queue = UploadQueue(self.path, FIELDS)
+        for dt in range(3):
+            queue.append({'dt': dt, 'in_tf': 70.0 + dt, 'cond': 'Clear'})
+        rows = queue.peek(5)
+        self.assertEqual([row['dt'] for _, row in rows], [0, 1, 2])
+        self.assertEqual(len(queue), 3)
+        queue.close()
+
+    def test_ack_consumes_head(self):
+        queue = UploadQueue(self.path, FIELDS)
+        queue.append({'dt': 1})
+        queue.append({'dt': 2})
+        offset, row = queue.peek(1)[0]
+        self.assertEqual(row, {'dt': 1, 'in_tf': None, 'cond': None})
+        queue.ack(offset)
+        self.assertEqual(queue.peek(1)[0][1]['dt'], 2)
+        queue.close()
+
+    def test_drained_queue_is_compacted(self):
+        queue = UploadQueue(self.path, FIELDS)
+        queue.append({'dt': 1})
+        offset, _ = queue.peek(1)[0]
+        queue.ack(offset)
+        self.assertTrue(queue.is_empty())
+        self.assertEqual(os.path.getsize(self.path), 0)
+        queue.append({'dt': 2})
+        self.assertEqual(queue.peek(1)[0][1]['dt'], 2)
+        queue.close()
+
+    def test_backlog_survives_restart(self):
+        queue = UploadQueue(self.path, FIELDS)
+        for dt in range(3):
+            queue.append({'dt': dt})
+        queue.ack(queue.peek(1)[0][0])
+        queue.close()
+
+        reopened = UploadQueue(self.path, FIELDS)
+        self.assertEqual([row['dt'] for _, row in reopened.peek(5)], [1, 2])
+        reopened.close()
+
+    def test_torn_row_is_not_replayed(self):
+        queue = UploadQueue(self.path, FIELDS)
+        queue.append({'dt': 1})
+        queue.close()
+        with open(self.path, 'a') as queue_file:
+            queue_file.write('{"dt":2,"in_')
+
+        reopened = UploadQueue(self.path, FIELDS)
+        self.assertEqual([row['dt'] for _, row in reopened.peek(5)], [1])
+        reopened.close()
+
+
+class TestQueueDrainer(TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.queue = UploadQueue(os.path.join(self.tmpdir.name, 'queue.jsonl'), FIELDS)
+
+    def tearDown(self):
+        self.queue.close()
+        self.tmpdir.cleanup()
+
+    def test_drainer_retries_until_server_answers(self):
+        sent = []
+        attempts = []
+        done = threading.Event()
+
+        def send_row(row):
+            attempts.append(row['dt'])
+            if len(attempts) == 1:
+                return False  # server down on first try
+            sent.append(row['dt'])
+            if len(sent) == 3:
+                done.set()
+            return True
+
+        for dt in range(3):
+            self.queue.append({'dt': dt})
+        drainer = QueueDrainer(self.queue, send_row, rows_per_second=0, retry_seconds=0.01)
+        drainer.start()
+        self.assertTrue(done.wait(5))
+        drainer.stop()
+        drainer.join(5)
+
+        self.assertEqual(sent, [0, 1, 2])
+        self.assertEqual(attempts[0], 0)
+        self.assertTrue(self.queue.is_empty())
+
+    def test_refused_row_is_set_aside(self):
+        sent = []
+        done = threading.Event()
+
+        def send_row(row):
+            if row['dt'] == 1:
+                raise RowRejected('bad value')
+            sent.append(row['dt'])
+            if len(sent) == 2:
+                done.set()
+            return True
+
+        for dt in range(3):
+            self.queue.append({'dt': dt})
+        drainer = QueueDrainer(self.queue, send_row, rows_per_second=0, retry_seconds=60)
+        drainer.start()
+        self.assertTrue(done.wait(5))
+        drainer.stop()
+        drainer.join(5)
+
+        self.assertEqual(sent, [0, 2])
+        self.assertTrue(self.queue.is_empty())
+        with open(self.queue.rejected_path, encoding='utf-8') as rejected_file:
+            record = json.loads(rejected_file.readline())
+        self.assertEqual((record['reason'], record['row']['dt']), ('bad value', 1))
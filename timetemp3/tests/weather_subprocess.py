@@ -0,0 +1,69 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+# The weather logger reads its config from argv when it is imported, so tests
+# of the module run it in a fresh interpreter, from a directory holding
+# config.json
+
+CONFIG = {
+    'i2c_addresses': {'i2c_led': '0x70', 'bmp085': '0x77'},
+    'owm': {'secret-key': 'abcd', 'lat': 45.0, 'lon': -100.0},
+    'timetemp_nest': {'client_id': 'id', 'client_secret': 'secret'},
+    'i2c_backend': 'emulator',
+}
+
+CONFIG_NAME = 'config.json'
+
+# Run ahead of every script, so its import of the module finds the config
+SCRIPT_PREAMBLE = '''
+import sys
+sys.argv = ["my_weather_logging", "%s", "phant.json"]
+''' % CONFIG_NAME
+
+PACKAGE_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def write_config(directory, **overrides):
+    # CONFIG with overrides, as config.json in directory; returns its path
+    path = os.path.join(directory, CONFIG_NAME)
+    with open(path, 'w') as config_file:
+        json.dump(dict(CONFIG, **overrides), config_file)
+    return path
+
+
+def run_python(arguments, directory, timeout=60):
+    """Runs the interpreter with arguments in directory, with this tree first
+    on its path. Raises AssertionError with the end of stderr if it fails;
+    otherwise returns the CompletedProcess (text output)."""
+    env = dict(os.environ)
+    # under systemd the module logs to the journal, which needs python3-systemd
+    env.pop('INVOCATION_ID', None)
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [PACKAGE_ROOT, env.get('PYTHONPATH')]))
+    result = subprocess.run(
+        [sys.executable] + list(arguments),
+        cwd=directory,
+        env=env,
+        capture_output=True,
+        text=True,
+        timeout=timeout,
+    )
+    if result.returncode != 0:
+        raise AssertionError(result.stderr[-2000:])
+    return result
+
+
+def run_weather_script(script, python_options=(), timeout=60, **config):
+    """Runs script after SCRIPT_PREAMBLE in a temporary directory holding
+    config.json (CONFIG updated with config); returns the CompletedProcess."""
+    with tempfile.TemporaryDirectory() as directory:
+        write_config(directory, **config)
+        arguments = list(python_options) + ['-c', SCRIPT_PREAMBLE + script]
+        return run_python(arguments, directory, timeout)
+
+
+def last_json_line(result):
+    # scripts report their results as JSON on the last line of stdout
+    return json.loads(result.stdout.splitlines()[-1])
@@ -8,6 +8,7 @@ import time
 from Adafruit_LED_Backpack import SevenSegment
 
 import timetemp3
+from timetemp3.display import write_display_changes
 from timetemp3.constants import (
     DIGIT_1,
     DIGIT_2,
@@ -53,6 +54,15 @@ def get_time_digits(now, hour_mode=DEFAULT_CLOCK_HOUR_MODE_12_OR_24, toggle_colo
     return digits
 
 
+# Wake this long after a second boundary so the new second is seen
+CLOCK_SECOND_EDGE_MARGIN = 1 / 500
+
+
+def seconds_until_next_second(now):
+    # everything shown (digits and colon) only changes on a second boundary
+    return 1.0 - now.microsecond / 1000000.0 + CLOCK_SECOND_EDGE_MARGIN
+
+
 def display_time_digits(
     time_digits, sleep_duration=DEFAULT_CLOCK_DISPLAY_SLEEP_DURATION, display_handle=None
 ):
@@ -67,9 +77,9 @@ def display_time_digits(
         segment.set_digit(DIGIT_4, time_digits[DIGIT_4])
         segment.set_colon(time_digits[DIGIT_COLON])
 
-        # Write the display buffer to the hardware.  This must be called to
-        # update the actual display LEDs.
-        segment.write_display()
+        # Write the display buffer to the hardware.  Only bytes that changed
+        # since the previous frame go out on the I2C bus.
+        write_display_changes(segment)
 
         # sleep_duration should be less than 1 second to prevent colon jittering
         time.sleep(sleep_duration)
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# This file is covered by the LICENSE file in the root of this project.
+
+#  - low overhead timing of hot-path functions
+#    - each wrapped function feeds a fixed-memory, log-bucketed latency sketch
+#    - p50/p95/p99/max are summarized to the log every few minutes
+#    - functions can be wrapped at import and timed only once enabled
+
+import functools
+import logging
+import math
+import threading
+import time
+from array import array
+
+# Relative error of reported percentiles, and the range of durations tracked
+DEFAULT_RELATIVE_ACCURACY = 0.02
+DEFAULT_MIN_SECONDS = 1e-6
+DEFAULT_MAX_SECONDS = 3600.0
+
+DEFAULT_SUMMARY_MINUTES = 15
+
+SUMMARY_QUANTILES = (0.5, 0.95, 0.99)
+
+
+class LatencySketch:
+    """Histogram with logarithmically spaced buckets, so every quantile it
+    reports is within relative_accuracy of the true value. Durations below
+    min_seconds or above max_seconds land in the first or last bucket."""
+
+    def __init__(
+        self,
+        relative_accuracy=DEFAULT_RELATIVE_ACCURACY,
+        min_seconds=DEFAULT_MIN_SECONDS,
+        max_seconds=DEFAULT_MAX_SECONDS,
+    ):
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.min_seconds = min_seconds
+        bucket_count = int(math.ceil(math.log(max_seconds / min_seconds) / self._log_gamma)) + 1
+        self.buckets = array('Q', bytes(8 * bucket_count))
+        self.count = 0
+        self.max = 0.0
+
+    def _index(self, seconds):
+        if seconds <= self.min_seconds:
+            return 0
+        index = int(math.ceil(math.log(seconds / self.min_seconds) / self._log_gamma))
+        return min(index, len(self.buckets) - 1)
+
+    def add(self, seconds):
+        self.buckets[self._index(seconds)] += 1
+        self.count += 1
+        if seconds > self.max:
+            self.max = seconds
+
+    def quantile(self, q):
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        seen = 0
+        for index, bucket_count in enumerate(self.buckets):
+            seen += bucket_count
+            if seen > rank:
+                break
+        if index == 0:
+            return min(self.min_seconds, self.max)
+        if index == len(self.buckets) - 1:
+            # the overflow bucket has no upper bound
+            return self.max
+        # midpoint (in relative terms) of the bucket, never past the largest seen
+        value = self.min_seconds * self.gamma ** index * 2 / (1 + self.gamma)
+        return min(value, self.max)
+
+    def clear(self):
+        for index in range(len(self.buckets)):
+            self.buckets[index] = 0
+        self.count = 0
+        self.max = 0.0
+
+
+class Timings:
+    """Latency sketches by name. Wrapped functions are timed only while
+    enabled, so a daemon can wrap them where they are defined and switch
+    timing on from its config later."""
+
+    def __init__(self, enabled=True, **sketch_options):
+        self.enabled = enabled
+        self.sketch_options = sketch_options
+        self._lock = threading.Lock()
+        self._sketches = {}
+
+    def sketch(self, name):
+        with self._lock:
+            sketch = self._sketches.get(name)
+            if sketch is None:
+                sketch = self._sketches[name] = LatencySketch(**self.sketch_options)
+            return sketch
+
+    def record(self, name, seconds):
+        sketch = self.sketch(name)
+        with self._lock:
+            sketch.add(seconds)
+
+    def wrap(self, name, function):
+        sketch = self.sketch(name)
+        lock = self._lock
+        perf_counter = time.perf_counter
+
+        @functools.wraps(function)
+        def timed(*args, **kwargs):
+            if not self.enabled:
+                return function(*args, **kwargs)
+            start = perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                elapsed = perf_counter() - start
+                with lock:
+                    sketch.add(elapsed)
+
+        return timed
+
+    def timed(self, function):
+        # decorator form of wrap, under the function's name
+        return self.wrap(function.__name__, function)
+
+    def summary(self, reset=False):
+        # {name: {'count': n, 'p50': s, 'p95': s, 'p99': s, 'max': s}}
+        result = {}
+        with self._lock:
+            for name, sketch in sorted(self._sketches.items()):
+                stats = {'count': sketch.count, 'max': sketch.max if sketch.count else None}
+                for q in SUMMARY_QUANTILES:
+                    stats['p%d' % round(q * 100)] = sketch.quantile(q)
+                result[name] = stats
+                if reset:
+                    sketch.clear()
+        return result
+
+
+def format_summary(summary):
+    lines = []
+    for name, stats in summary.items():
+        if not stats['count']:
+            continue
+        lines.append(
+            '%s: n=%d p50=%.2fms p95=%.2fms p99=%.2fms max=%.2fms'
+            % (
+                name,
+                stats['count'],
+                1000 * stats['p50'],
+                1000 * stats['p95'],
+                1000 * stats['p99'],
+                1000 * stats['max'],
+            )
+        )
+    return lines
+
+
+class TimingReporter(threading.Thread):
+    """Logs, then resets, the timings every interval_seconds."""
+
+    def __init__(self, timings, interval_seconds, logger=None):
+        super().__init__(name='timing_reporter', daemon=True)
+        self.timings = timings
+        self.interval_seconds = interval_seconds
+        self.logger = logger or logging.getLogger(__name__)
+        self._stopping = threading.Event()
+
+    def report(self):
+        lines = format_summary(self.timings.summary(reset=True))
+        for line in lines:
+            self.logger.info('Timing %s' % line)
+
+    def run(self):
+        while not self._stopping.wait(self.interval_seconds):
+            self.report()
+
+    def stop(self):
+        self._stopping.set()
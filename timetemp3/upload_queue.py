@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# This file is covered by the LICENSE file in the root of this project.
+
+#  - durable store-and-forward queue for rows bound for the phant server
+#    - rows are appended as JSON lines; the consumed offset lives alongside
+#    - fsync is batched to go easy on SD cards
+#    - rows the server refuses are set aside in a dead-letter file
+
+import json
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger('weather_logger')
+
+# Defaults for how many appended rows / seconds may pass before an fsync
+DEFAULT_FSYNC_ROWS = 12
+DEFAULT_FSYNC_SECONDS = 5 * 60
+
+# Defaults for how fast a backlog is replayed, and retry wait when server is down
+DEFAULT_DRAIN_ROWS_PER_SECOND = 1.0
+DEFAULT_DRAIN_RETRY_SECONDS = 60
+
+
+class RowRejected(Exception):
+    """Raised by send_row(s) when the server refused a row, so sending it
+    again cannot help. accepted is how many rows before it were accepted."""
+
+    def __init__(self, reason='', accepted=0):
+        super().__init__(reason)
+        self.accepted = accepted
+
+
+class UploadQueue:
+    def __init__(
+        self,
+        path,
+        fields,
+        fsync_rows=DEFAULT_FSYNC_ROWS,
+        fsync_seconds=DEFAULT_FSYNC_SECONDS,
+    ):
+        self.path = path
+        self.offset_path = path + '.offset'
+        self.rejected_path = path + '.rejected'
+        self.fields = tuple(fields)
+        self.fsync_rows = fsync_rows
+        self.fsync_seconds = fsync_seconds
+
+        self._lock = threading.Lock()
+        self._unsynced_rows = 0
+        self._last_fsync = time.monotonic()
+        self._file = open(self.path, 'a', encoding='utf-8')
+        self._offset = self._read_offset()
+        self._acked_since_save = 0
+
+    def _read_offset(self):
+        try:
+            with open(self.offset_path, encoding='utf-8') as offset_file:
+                offset = int(offset_file.read().strip() or 0)
+        except (FileNotFoundError, ValueError):
+            offset = 0
+        # a queue file truncated behind our back restarts from the beginning
+        if offset > os.path.getsize(self.path):
+            offset = 0
+        return offset
+
+    def _save_offset(self):
+        tmp_path = self.offset_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as offset_file:
+            offset_file.write('%d\n' % self._offset)
+            offset_file.flush()
+            os.fsync(offset_file.fileno())
+        os.replace(tmp_path, self.offset_path)
+        self._acked_since_save = 0
+
+    def _size(self):
+        return os.fstat(self._file.fileno()).st_size
+
+    def _sync(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._unsynced_rows = 0
+        self._last_fsync = time.monotonic()
+
+    def append(self, row):
+        record = {field: row.get(field) for field in self.fields}
+        line = json.dumps(record, separators=(',', ':')) + '\n'
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+            self._unsynced_rows += 1
+            elapsed = time.monotonic() - self._last_fsync
+            if self._unsynced_rows >= self.fsync_rows or elapsed >= self.fsync_seconds:
+                self._sync()
+
+    def peek(self, max_rows=1):
+        # returns [(offset_after_row, row), ...] without consuming them
+        rows = []
+        with self._lock:
+            self._file.flush()
+            with open(self.path, encoding='utf-8') as queue_file:
+                queue_file.seek(self._offset)
+                offset = self._offset
+                while len(rows) < max_rows:
+                    line = queue_file.readline()
+                    # stop at end of file or at a row torn by a crash mid-write
+                    if not line.endswith('\n'):
+                        break
+                    offset += len(line.encode('utf-8'))
+                    try:
+                        rows.append((offset, json.loads(line)))
+                    except json.decoder.JSONDecodeError:
+                        if rows:
+                            break
+                        # unreadable row at head can never be sent, so step over it
+                        self._offset = offset
+        return rows
+
+    def ack(self, offset):
+        with self._lock:
+            self._offset = max(self._offset, offset)
+            self._acked_since_save += 1
+            self._file.flush()
+            if self._offset >= self._size():
+                # fully drained: reclaim the space and start over
+                self._file.truncate(0)
+                self._file.seek(0)
+                self._sync()
+                self._offset = 0
+                self._save_offset()
+            elif self._acked_since_save >= self.fsync_rows:
+                # a crash before this replays a few rows rather than losing any
+                self._save_offset()
+
+    def reject(self, offset, row, reason):
+        # consume a row the server will never take, keeping it for inspection
+        record = {'rejected_at': time.time(), 'reason': reason, 'row': row}
+        with open(self.rejected_path, 'a', encoding='utf-8') as rejected_file:
+            rejected_file.write(json.dumps(record, separators=(',', ':')) + '\n')
+            rejected_file.flush()
+            os.fsync(rejected_file.fileno())
+        self.ack(offset)
+
+    def __len__(self):
+        with self._lock:
+            self._file.flush()
+            with open(self.path, 'rb') as queue_file:
+                queue_file.seek(self._offset)
+                return sum(1 for line in queue_file if line.endswith(b'\n'))
+
+    def is_empty(self):
+        with self._lock:
+            self._file.flush()
+            return self._offset >= self._size()
+
+    def close(self):
+        with self._lock:
+            self._sync()
+            self._save_offset()
+            self._file.close()
+
+
+class QueueDrainer(threading.Thread):
+    """Replays queued rows in order through send_row(row), which returns True
+    once the server has accepted a row, False to try again later, or raises
+    RowRejected if the server refused it (the row is then set aside).
+
+    If send_rows(rows) is given, up to batch_rows rows are handed over at a
+    time and it returns how many of them, from the front, were accepted.
+    """
+
+    def __init__(
+        self,
+        upload_queue,
+        send_row,
+        rows_per_second=DEFAULT_DRAIN_ROWS_PER_SECOND,
+        retry_seconds=DEFAULT_DRAIN_RETRY_SECONDS,
+        send_rows=None,
+        batch_rows=1,
+    ):
+        super().__init__(name='upload_queue_drainer', daemon=True)
+        self.upload_queue = upload_queue
+        self.send_row = send_row
+        self.send_rows = send_rows
+        self.batch_rows = batch_rows
+        self.row_interval = 1.0 / rows_per_second if rows_per_second else 0
+        self.retry_seconds = retry_seconds
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+
+    def notify(self):
+        self._wakeup.set()
+
+    def stop(self):
+        self._stopping.set()
+        self._wakeup.set()
+
+    def _wait(self, timeout):
+        self._wakeup.wait(timeout)
+        self._wakeup.clear()
+
+    def _send(self, rows):
+        if self.send_rows is not None:
+            return self.send_rows(rows)
+        sent = 0
+        for row in rows:
+            try:
+                if not self.send_row(row):
+                    break
+            except RowRejected as e:
+                e.accepted = sent
+                raise
+            sent += 1
+        return sent
+
+    def run(self):
+        while not self._stopping.is_set():
+            rows = self.upload_queue.peek(self.batch_rows)
+            if not rows:
+                self._wait(None)
+                continue
+
+            rejected = None
+            try:
+                sent = self._send([row for _, row in rows])
+            except RowRejected as e:
+                sent = e.accepted
+                rejected = e
+            if sent:
+                self.upload_queue.ack(rows[sent - 1][0])
+                if self.row_interval:
+                    self._stopping.wait(self.row_interval * sent)
+            if rejected is not None:
+                # retrying would hold up every row behind it for good
+                offset, row = rows[sent]
+                logger.error(
+                    "Row rejected by server (%s); moved to %s"
+                    % (rejected, self.upload_queue.rejected_path)
+                )
+                self.upload_queue.reject(offset, row, str(rejected))
+            elif sent < len(rows):
+                # server still not answering; leave rows at head of queue
+                self._stopping.wait(self.retry_seconds)